@@ -1,6 +1,7 @@
 import streamlit as st
 from modules.auth import autenticar_usuario, mostrar_login
-from modules.database import inicializar_bd
+from modules.database import descartar_render, inicializar_bd, iniciar_ejecucion, iniciar_render, reportar_n_mas_1
+from modules.migraciones import verificar_esquema
 from modules.grupos import modulo_conformacion_grupo
 from modules.socios import modulo_afiliacion_socios
 from modules.reuniones import modulo_reuniones
@@ -12,7 +13,7 @@ from modules.cierre_ciclo import modulo_cierre_ciclo
 from modules.reportes import modulo_reportes
 from modules.actas import modulo_actas
 from utils.helpers import mostrar_dashboard_principal
-from modules.admin import modulo_gestion_promotores, modulo_gestion_distritos, modulo_gestion_directiva  # NUEVA IMPORTACIÓN
+from modules.admin import modulo_gestion_promotores, modulo_gestion_distritos, modulo_gestion_directiva, mostrar_panel_consultas  # NUEVA IMPORTACIÓN
 
 def main():
     # Configuración de la página
@@ -23,9 +24,15 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Nueva corrida del script: reiniciar el memo de lecturas
+    iniciar_ejecucion()
+    
     # Inicializar base de datos
     inicializar_bd()
     
+    # No operar sobre una base con migraciones pendientes
+    verificar_esquema()
+    
     # Sistema de autenticación
     if 'autenticado' not in st.session_state:
         st.session_state.autenticado = False
@@ -97,6 +104,9 @@ def mostrar_aplicacion_principal():
             del st.session_state[key]
         st.rerun()
     
+    # Acumular métricas de consultas de esta página
+    iniciar_render(seleccion)
+    
     # Routing según selección
     if seleccion == "📊 Dashboard":
         mostrar_dashboard_principal()
@@ -128,6 +138,13 @@ def mostrar_aplicacion_principal():
         modulo_actas()
     elif "Configuración" in seleccion:
         st.info("Módulo de configuración - En desarrollo")
+    
+    # Detector de consultas N+1 (solo en modo desarrollo)
+    reportar_n_mas_1()
+    
+    # Panel de consultas de la página (solo ADMIN)
+    mostrar_panel_consultas()
+    descartar_render()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
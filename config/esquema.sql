@@ -0,0 +1,434 @@
+-- =============================================================================
+-- ESQUEMA DE LA BASE DE DATOS - SISTEMA GAPC
+-- =============================================================================
+-- DDL en dialecto MySQL. modules/motor_sqlite.py lo traduce a SQLite al abrir una
+-- base local (crear_esquema_sqlite), por lo que se mantiene un subconjunto portable:
+--   * claves "INT AUTO_INCREMENT PRIMARY KEY"
+--   * restricciones UNIQUE en línea, índices con CREATE INDEX aparte
+--   * sin ENUM, sin ON UPDATE, sin ';' dentro de textos
+-- Los datos básicos (distritos, roles, estados...) los inserta inicializar_bd().
+
+-- -----------------------------------------------------------------------------
+-- Catálogos
+-- -----------------------------------------------------------------------------
+
+CREATE TABLE distrito (
+    id_distrito INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_distrito VARCHAR(100) NOT NULL,
+    municipio VARCHAR(100)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE frecuencia (
+    id_frecuencia INT AUTO_INCREMENT PRIMARY KEY,
+    tipo_frecuencia VARCHAR(50) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE roles (
+    id_rol INT AUTO_INCREMENT PRIMARY KEY,
+    tipo_rol VARCHAR(50) NOT NULL,
+    funcion VARCHAR(255)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE estado_directiva (
+    id_estadodirectiva INT AUTO_INCREMENT PRIMARY KEY,
+    clave VARCHAR(20) NOT NULL,
+    estado VARCHAR(50) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE estado_del_prestamo (
+    id_estadoprestamo INT AUTO_INCREMENT PRIMARY KEY,
+    estados VARCHAR(50) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE tipo_de_movimiento_de_caja (
+    id_tipomovimiento INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_movimiento VARCHAR(50) NOT NULL,
+    descripcion VARCHAR(255)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -----------------------------------------------------------------------------
+-- Estructura organizativa
+-- -----------------------------------------------------------------------------
+
+CREATE TABLE promotores (
+    id_promotor INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    apellido VARCHAR(100) NOT NULL,
+    tele VARCHAR(20),
+    direccion VARCHAR(255),
+    id_distrito INT,
+    activo TINYINT(1) NOT NULL DEFAULT 1
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE grupos (
+    id_grupo INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_grupo VARCHAR(150) NOT NULL,
+    id_distrito INT,
+    fecha_creacion DATE,
+    id_promotor INT,
+    id_frecuencia INT,
+    hora_reunion TIME,
+    lugar_reunion VARCHAR(255),
+    dia_reunion VARCHAR(20),
+    meta_social TEXT,
+    otras_reglas TEXT,
+    estado VARCHAR(20) NOT NULL DEFAULT 'ACTIVO'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE socios (
+    id_socio INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    apellido VARCHAR(100) NOT NULL,
+    telefono VARCHAR(20),
+    direccion VARCHAR(255),
+    id_grupo INT,
+    id_distrito INT,
+    estado VARCHAR(20) NOT NULL DEFAULT 'ACTIVO',
+    activo TINYINT(1) NOT NULL DEFAULT 1,
+    observaciones TEXT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE usuarios (
+    id_usuario INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    passwordhash VARCHAR(255) NOT NULL,
+    rol_sistema VARCHAR(20) NOT NULL,
+    id_promotor INT,
+    id_socio INT,
+    activo TINYINT(1) NOT NULL DEFAULT 1,
+    UNIQUE (username)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE directiva_grupo (
+    id_directiva INT AUTO_INCREMENT PRIMARY KEY,
+    id_socio INT NOT NULL,
+    id_grupo INT NOT NULL,
+    id_rol INT NOT NULL,
+    fecha_inicio DATE,
+    fecha_fin DATE,
+    estado VARCHAR(20)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE directiva_de_grupo (
+    id_directiva INT AUTO_INCREMENT PRIMARY KEY,
+    id_socio INT NOT NULL,
+    id_grupo INT NOT NULL,
+    id_rol INT NOT NULL,
+    fecha_inicio DATE,
+    fecha_fin DATE,
+    id_estado_directiva INT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE reglas_grupo (
+    id_regla INT AUTO_INCREMENT PRIMARY KEY,
+    id_grupo INT NOT NULL,
+    cantidad_multa DECIMAL(12,2) NOT NULL DEFAULT 0,
+    interes DECIMAL(6,2) NOT NULL DEFAULT 0,
+    montomax_prestamo DECIMAL(12,2) NOT NULL DEFAULT 0,
+    unprestamo_alavez TINYINT(1) NOT NULL DEFAULT 0,
+    fecha_inicio_ciclo DATE,
+    fecha_fin_ciclo DATE,
+    duracion_ciclo_meses INT,
+    UNIQUE (id_grupo)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -----------------------------------------------------------------------------
+-- Reuniones y asistencia
+-- -----------------------------------------------------------------------------
+
+CREATE TABLE sesion (
+    id_sesion INT AUTO_INCREMENT PRIMARY KEY,
+    id_grupo INT NOT NULL,
+    fecha_sesion DATE NOT NULL,
+    total_presentes INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE reuniones (
+    id_reunion INT AUTO_INCREMENT PRIMARY KEY,
+    id_grupo INT NOT NULL,
+    fecha DATE,
+    hora TIME,
+    lugar VARCHAR(255),
+    estado VARCHAR(20)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE asistencia (
+    id_asistencia INT AUTO_INCREMENT PRIMARY KEY,
+    id_sesion INT NOT NULL,
+    id_socio INT NOT NULL,
+    presencial TINYINT(1) NOT NULL DEFAULT 0,
+    justificacion_ausencia VARCHAR(255),
+    UNIQUE (id_sesion, id_socio)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE multa (
+    id_multa INT AUTO_INCREMENT PRIMARY KEY,
+    id_sesion INT,
+    id_socio INT NOT NULL,
+    monto_a_pagar DECIMAL(12,2) NOT NULL DEFAULT 0,
+    monto_pagado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    fecha_pago_real DATE,
+    fecha_vencimiento DATE,
+    motivo VARCHAR(255),
+    UNIQUE (id_sesion, id_socio, motivo)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -----------------------------------------------------------------------------
+-- Ahorro y caja
+-- -----------------------------------------------------------------------------
+
+CREATE TABLE ahorro (
+    id_ahorro INT AUTO_INCREMENT PRIMARY KEY,
+    id_sesion INT NOT NULL,
+    saldo_apertura DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total_ingresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+    saldo_cierre DECIMAL(12,2) NOT NULL DEFAULT 0,
+    firma_tesorera VARCHAR(150),
+    firma_presidenta VARCHAR(150)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE ahorro_detalle (
+    id_ahorro_detalle INT AUTO_INCREMENT PRIMARY KEY,
+    id_socio INT NOT NULL,
+    id_ahorro INT NOT NULL,
+    saldo_ahorro DECIMAL(12,2) NOT NULL DEFAULT 0,
+    saldo_ingresado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    otras_actividades DECIMAL(12,2) NOT NULL DEFAULT 0,
+    saldo_final DECIMAL(12,2) NOT NULL DEFAULT 0,
+    UNIQUE (id_ahorro, id_socio)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Saldo actual de ahorro de cada socio (saldo_final de su registro en
+-- ahorro_detalle de la sesión más reciente). Lo mantiene modules/ahorros.py
+-- en cada escritura de ahorro; se reconstruye con:
+-- python -m scripts.reconstruir_saldos
+CREATE TABLE saldo_socio (
+    id_socio INT NOT NULL PRIMARY KEY,
+    saldo_actual DECIMAL(12,2) NOT NULL DEFAULT 0,
+    id_ahorro_detalle INT,
+    fecha_actualizacion DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE caja (
+    id_caja INT AUTO_INCREMENT PRIMARY KEY,
+    id_sesion INT NOT NULL,
+    saldo_apertura DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total_ingresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total_egresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+    saldo_cierre DECIMAL(12,2) NOT NULL DEFAULT 0,
+    firma_tesorera VARCHAR(150),
+    firma_presidenta VARCHAR(150)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Cabecera del libro de cada grupo: saldo de cierre del último registro de
+-- ahorro y de caja (por fecha de sesión). La mantiene modules/caja.py en cada
+-- escritura de ahorro o caja; se reconstruye con: python -m scripts.reconstruir_saldos
+CREATE TABLE saldo_grupo (
+    id_grupo INT NOT NULL PRIMARY KEY,
+    id_ahorro INT,
+    saldo_ahorro DECIMAL(12,2) NOT NULL DEFAULT 0,
+    id_caja INT,
+    saldo_caja DECIMAL(12,2) NOT NULL DEFAULT 0,
+    fecha_actualizacion DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE movimiento_de_caja (
+    id_movimiento INT AUTO_INCREMENT PRIMARY KEY,
+    id_caja INT NOT NULL,
+    id_tipomovimiento INT NOT NULL,
+    id_socio INT,
+    monto DECIMAL(12,2) NOT NULL DEFAULT 0,
+    descripcion VARCHAR(255),
+    hora_registro DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -----------------------------------------------------------------------------
+-- Préstamos y pagos
+-- -----------------------------------------------------------------------------
+
+CREATE TABLE prestamo (
+    id_prestamo INT AUTO_INCREMENT PRIMARY KEY,
+    id_socio INT NOT NULL,
+    id_grupo INT,
+    fecha_solicitud DATE,
+    monto_solicitado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    plazo_meses INT NOT NULL DEFAULT 1,
+    proposito VARCHAR(255),
+    id_estado_prestamo INT NOT NULL DEFAULT 1,
+    id_sesion_aprobacion INT,
+    fecha_aprobacion DATETIME,
+    fecha_desembolso DATETIME,
+    fecha_vencimiento DATETIME,
+    motivo_rechazo VARCHAR(255)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE detalles_pagos (
+    id_pago INT AUTO_INCREMENT PRIMARY KEY,
+    id_prestamo INT NOT NULL,
+    id_socio INT,
+    fecha_programada DATE,
+    capital_programado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    interes_programado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total_programado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    cuota_mensual DECIMAL(12,2) NOT NULL DEFAULT 0,
+    capital_pagado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    interes_pagado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    mora_pagada DECIMAL(12,2) NOT NULL DEFAULT 0,
+    interes DECIMAL(12,2) NOT NULL DEFAULT 0,
+    fecha_pago DATE,
+    total_pagado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    observaciones VARCHAR(255)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -----------------------------------------------------------------------------
+-- Moras y alertas
+-- -----------------------------------------------------------------------------
+
+-- Una alerta por (grupo, préstamo, tipo): modules/moras.py la inserta o la
+-- actualiza (y reabre) en vez de duplicarla en cada detección.
+CREATE TABLE alertas (
+    id_alerta INT AUTO_INCREMENT PRIMARY KEY,
+    id_grupo INT,
+    id_prestamo INT,
+    tipo VARCHAR(20) NOT NULL DEFAULT 'GENERAL',
+    titulo VARCHAR(150) NOT NULL,
+    descripcion TEXT,
+    nivel VARCHAR(10) NOT NULL DEFAULT 'MEDIO',
+    fecha_alerta DATETIME,
+    fecha_recordatorio DATE,
+    resuelta TINYINT(1) NOT NULL DEFAULT 0,
+    fecha_resolucion DATETIME,
+    UNIQUE (id_grupo, id_prestamo, tipo)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE seguimiento_moras (
+    id_seguimiento INT AUTO_INCREMENT PRIMARY KEY,
+    id_socio INT NOT NULL,
+    id_prestamo INT NOT NULL,
+    fecha_contacto DATE,
+    metodo_contacto VARCHAR(50),
+    resultado_contacto VARCHAR(100),
+    detalles_contacto TEXT,
+    proximo_seguimiento DATE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE planes_pago_mora (
+    id_plan INT AUTO_INCREMENT PRIMARY KEY,
+    id_prestamo INT NOT NULL,
+    plazo_meses INT,
+    cuota_mensual DECIMAL(12,2),
+    fecha_inicio_plan DATE,
+    condiciones TEXT,
+    incluye_multas TINYINT(1) NOT NULL DEFAULT 0,
+    fecha_creacion DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE refinanciaciones (
+    id_refinanciacion INT AUTO_INCREMENT PRIMARY KEY,
+    id_prestamo INT NOT NULL,
+    fecha_refinanciacion DATE,
+    nuevo_plazo INT,
+    nueva_tasa_interes DECIMAL(6,2),
+    nueva_cuota_mensual DECIMAL(12,2),
+    motivo VARCHAR(255),
+    condiciones TEXT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Cartera de cada préstamo: estado, vencimiento y saldo pendiente (monto menos
+-- capital pagado). La mantiene modules/moras.py en cada pago o cambio de estado;
+-- se reconstruye con: python -m scripts.reconstruir_saldos
+CREATE TABLE cartera_prestamo (
+    id_prestamo INT NOT NULL PRIMARY KEY,
+    id_socio INT NOT NULL,
+    id_grupo INT NOT NULL,
+    id_estado_prestamo INT NOT NULL,
+    fecha_vencimiento DATETIME,
+    saldo_pendiente DECIMAL(12,2) NOT NULL DEFAULT 0,
+    fecha_actualizacion DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Foto diaria de la cartera en riesgo por grupo (los totales por distrito se
+-- suman de estas filas). La escribe moras.refrescar_cartera_diaria, desde
+-- scripts/barrido_moras.py cada noche.
+CREATE TABLE cartera_mora_diaria (
+    fecha DATE NOT NULL,
+    id_grupo INT NOT NULL,
+    id_distrito INT,
+    prestamos_activos INT NOT NULL DEFAULT 0,
+    prestamos_mora INT NOT NULL DEFAULT 0,
+    saldo_activo DECIMAL(12,2) NOT NULL DEFAULT 0,
+    saldo_mora DECIMAL(12,2) NOT NULL DEFAULT 0,
+    mora_1_15 INT NOT NULL DEFAULT 0,
+    mora_16_30 INT NOT NULL DEFAULT 0,
+    mora_31_60 INT NOT NULL DEFAULT 0,
+    mora_mas_60 INT NOT NULL DEFAULT 0,
+    fecha_actualizacion DATETIME,
+    PRIMARY KEY (fecha, id_grupo)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -----------------------------------------------------------------------------
+-- Cierre de ciclo y actas
+-- -----------------------------------------------------------------------------
+
+CREATE TABLE cierre_de_ciclo (
+    id_ciclo INT AUTO_INCREMENT PRIMARY KEY,
+    id_grupo INT NOT NULL,
+    fecha_cierre DATE,
+    total_ahorro_grupo DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total_ganancia_grupo DECIMAL(12,2) NOT NULL DEFAULT 0,
+    saldo_cierre_caja DECIMAL(12,2) NOT NULL DEFAULT 0,
+    firma_presidenta VARCHAR(150),
+    firma_secretaria VARCHAR(150),
+    firma_tesorera VARCHAR(150)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE detalle_cierre_de_ciclo (
+    id_detalle_cierre INT AUTO_INCREMENT PRIMARY KEY,
+    id_ciclo INT NOT NULL,
+    id_socio INT NOT NULL,
+    saldo_final_ahorrado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    porcion_fondo_grupo DECIMAL(12,2) NOT NULL DEFAULT 0,
+    retiro_final DECIMAL(12,2) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE actas_reunion (
+    id_acta INT AUTO_INCREMENT PRIMARY KEY,
+    id_sesion INT NOT NULL,
+    temas_tratados TEXT,
+    acuerdos TEXT,
+    firma_presidenta VARCHAR(150),
+    firma_secretaria VARCHAR(150),
+    firma_tesorera VARCHAR(150),
+    fecha_creacion DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE actas_prestamo (
+    id_acta INT AUTO_INCREMENT PRIMARY KEY,
+    id_prestamo INT NOT NULL,
+    firma_solicitante VARCHAR(150),
+    firma_presidenta VARCHAR(150),
+    firma_tesorera VARCHAR(150),
+    fecha_creacion DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -----------------------------------------------------------------------------
+-- Índices
+-- -----------------------------------------------------------------------------
+
+CREATE INDEX idx_socios_grupo ON socios (id_grupo);
+CREATE INDEX idx_grupos_promotor ON grupos (id_promotor);
+CREATE INDEX idx_grupos_distrito ON grupos (id_distrito);
+CREATE INDEX idx_sesion_grupo_fecha ON sesion (id_grupo, fecha_sesion);
+CREATE INDEX idx_asistencia_socio ON asistencia (id_socio);
+CREATE INDEX idx_multa_socio ON multa (id_socio);
+CREATE INDEX idx_multa_sesion ON multa (id_sesion, id_socio);
+CREATE INDEX idx_ahorro_sesion ON ahorro (id_sesion);
+CREATE INDEX idx_ahorro_detalle_socio ON ahorro_detalle (id_socio, id_ahorro_detalle);
+CREATE INDEX idx_caja_sesion ON caja (id_sesion);
+CREATE INDEX idx_movimiento_caja ON movimiento_de_caja (id_caja);
+CREATE INDEX idx_prestamo_socio_estado ON prestamo (id_socio, id_estado_prestamo);
+CREATE INDEX idx_detalles_pagos_prestamo ON detalles_pagos (id_prestamo, fecha_programada);
+CREATE INDEX idx_alertas_grupo_estado ON alertas (id_grupo, resuelta, fecha_alerta);
+CREATE INDEX idx_cartera_prestamo_grupo ON cartera_prestamo (id_grupo, id_estado_prestamo);
+CREATE INDEX idx_cartera_mora_diaria_grupo ON cartera_mora_diaria (id_grupo, fecha);
+CREATE INDEX idx_cartera_mora_diaria_distrito ON cartera_mora_diaria (id_distrito, fecha);
@@ -1,5 +1,5 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, ejecutar_consulta_cacheada, ejecutar_consulta_memo, obtener_metricas_render
 from datetime import datetime
 import hashlib  # AGREGAR ESTA IMPORTACIÓN
 
@@ -337,7 +337,7 @@ def obtener_promotores():
 
 def obtener_distritos():
     """Obtener lista de distritos"""
-    resultado = ejecutar_consulta("SELECT id_distrito, nombre_distrito FROM distrito")
+    resultado = ejecutar_consulta_cacheada("SELECT id_distrito, nombre_distrito FROM distrito")
     if resultado:
         return [(row['id_distrito'], row['nombre_distrito']) for row in resultado]
     return []
@@ -602,7 +602,7 @@ def obtener_todos_distritos():
 def contar_promotores_por_distrito(id_distrito):
     """Contar cuántos promotores tiene un distrito"""
     try:
-        resultado = ejecutar_consulta(
+        resultado = ejecutar_consulta_memo(
             "SELECT COUNT(*) as total FROM promotores WHERE id_distrito = %s",
             (id_distrito,)
         )
@@ -613,7 +613,7 @@ def contar_promotores_por_distrito(id_distrito):
 def contar_grupos_por_distrito(id_distrito):
     """Contar cuántos grupos tiene un distrito"""
     try:
-        resultado = ejecutar_consulta(
+        resultado = ejecutar_consulta_memo(
             "SELECT COUNT(*) as total FROM grupos WHERE id_distrito = %s",
             (id_distrito,)
         )
@@ -1132,7 +1132,7 @@ def obtener_socios_activos():
 
 def obtener_roles_directiva():
     """Obtener lista de roles de directiva"""
-    return ejecutar_consulta("SELECT id_rol, tipo_rol, funcion FROM roles ORDER BY id_rol")
+    return ejecutar_consulta_cacheada("SELECT id_rol, tipo_rol, funcion FROM roles ORDER BY id_rol")
 
 def editar_directivo(id_directiva):
     """Editar directivo existente"""
@@ -1290,4 +1290,60 @@ def eliminar_directivo(id_directiva):
     with col_btn2:
         if st.button("❌ Cancelar", key=f"cancel_eliminar_directivo_{id_directiva}"):
             del st.session_state.eliminar_directiva_id
-            st.rerun()
\ No newline at end of file
+            st.rerun()
+# =============================================================================
+# PANEL DE MONITOREO DE CONSULTAS (SOLO ADMIN)
+# =============================================================================
+
+def mostrar_panel_consultas():
+    """Mostrar costo en consultas de la página actual y de los últimos renders"""
+    
+    if st.session_state.rol != "ADMIN":
+        return
+    
+    metricas = obtener_metricas_render()
+    if not metricas:
+        return
+    
+    # Historial de los últimos renders para comparar páginas
+    historial = st.session_state.setdefault('historial_renders', [])
+    historial.append({
+        'Página': metricas['pagina'],
+        'Consultas': metricas['total_consultas'],
+        'Tiempo BD (ms)': round(metricas['total_ms'], 1),
+        'Render (ms)': round(metricas['duracion_render_ms'], 1)
+    })
+    del historial[:-20]
+    
+    with st.expander(f"🛠️ Consultas de esta página: {metricas['total_consultas']} "
+                     f"({metricas['total_ms']:,.1f} ms)"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("🔢 Consultas", metricas['total_consultas'])
+        col2.metric("⏱️ Tiempo en BD", f"{metricas['total_ms']:,.1f} ms")
+        col3.metric("📄 Filas", metricas['total_filas'])
+        
+        st.write("**Por origen:**")
+        st.dataframe([
+            {
+                'Origen': r['origen'],
+                'Llamadas': r['llamadas'],
+                'Tiempo (ms)': round(r['ms'], 1),
+                'Filas': r['filas']
+            }
+            for r in metricas['por_origen']
+        ], use_container_width=True)
+        
+        st.write("**Consultas más lentas:**")
+        lentas = sorted(metricas['consultas'], key=lambda c: c['ms'], reverse=True)[:10]
+        st.dataframe([
+            {
+                'Tiempo (ms)': round(c['ms'], 1),
+                'Tipo': c['tipo'],
+                'Origen': c['origen'],
+                'SQL': c['sql']
+            }
+            for c in lentas
+        ], use_container_width=True)
+        
+        st.write("**Últimos renders:**")
+        st.dataframe(list(reversed(historial)), use_container_width=True)
@@ -1,10 +1,13 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, ejecutar_consulta_memo, ejecutar_lote, en_transaccion, transaccion
 from datetime import datetime
 from modules.reuniones import obtener_reuniones_recientes, obtener_total_socios_grupo
+from modules.caja import actualizar_saldo_grupo, obtener_saldo_grupo
+from modules.migraciones import exigir_migracion
 from decimal import Decimal
 import pandas as pd
 import tempfile
+from utils.exportadores import generar_pdf_consolidado_comprobantes, generar_zip_comprobantes_ahorro
 import os
 
 def modulo_ahorros():
@@ -147,19 +150,15 @@ def registrar_aportes():
         
         if submitted:
             if total_ingresos > 0:
-                # Guardar cada aporte individual
-                for id_socio, datos in aportes_registrados.items():
-                    if datos['aporte_ahorro'] > 0 or datos['otros_ingresos'] > 0:
-                        guardar_aporte_individual(
-                            id_socio, id_ahorro, float(datos['saldo_anterior']),
-                            float(datos['aporte_ahorro']), float(datos['otros_ingresos']), float(datos['saldo_final'])
-                        )
-                
-                # Actualizar totales en registro de ahorro
-                actualizar_totales_ahorro(id_ahorro, float(total_ingresos), float(saldo_proyectado))
-                
-                st.success("✅ Todos los aportes han sido guardados exitosamente")
-                st.rerun()
+                # Guardar los aportes en lote
+                aportes_con_monto = {
+                    id_socio: datos for id_socio, datos in aportes_registrados.items()
+                    if datos['aporte_ahorro'] > 0 or datos['otros_ingresos'] > 0
+                }
+                # Detalle y totales del registro de ahorro en una sola transacción
+                if guardar_aportes_lote(id_ahorro, aportes_con_monto, total_ingresos, saldo_proyectado):
+                    st.success("✅ Todos los aportes han sido guardados exitosamente")
+                    st.rerun()
                 
                 # Generar comprobantes opcionales
                 if st.checkbox("🖨️ Generar comprobantes individuales"):
@@ -307,95 +306,214 @@ def estado_ahorros():
 
 def obtener_ultimo_saldo_cierre(id_grupo):
     """Obtener el último saldo de cierre de ahorro del grupo"""
-    query = """
-        SELECT a.saldo_cierre 
-        FROM ahorro a
-        JOIN sesion s ON a.id_sesion = s.id_sesion
-        WHERE s.id_grupo = %s
-        ORDER BY s.fecha_sesion DESC
-        LIMIT 1
-    """
-    
-    resultado = ejecutar_consulta(query, (id_grupo,))
-    return Decimal(str(resultado[0]['saldo_cierre'])) if resultado else Decimal('0.0')
+    resultado = ejecutar_consulta_memo(
+        "SELECT saldo_ahorro FROM saldo_grupo WHERE id_grupo = %s",
+        (id_grupo,)
+    )
+    if resultado:
+        return Decimal(str(resultado[0]['saldo_ahorro']))
+    # Sin fila en saldo_grupo (o error de lectura): calcular desde ahorro
+    return Decimal(str(obtener_saldo_grupo(id_grupo)['saldo_ahorro']))
 
 def crear_registro_ahorro(id_sesion, saldo_apertura):
-    """Crear registro inicial de ahorro para una sesión"""
+    """Crear registro inicial de ahorro para una sesión (y saldo_grupo, en la misma transacción)"""
     query = """
         INSERT INTO ahorro (id_sesion, saldo_apertura, total_ingresos, saldo_cierre, firma_tesorera, firma_presidenta)
         VALUES (%s, %s, 0, %s, '', '')
     """
-    return ejecutar_comando(query, (id_sesion, saldo_apertura, saldo_apertura))
+    try:
+        with transaccion():
+            id_ahorro = ejecutar_comando(query, (id_sesion, saldo_apertura, saldo_apertura))
+            actualizar_saldo_grupo(id_sesion=id_sesion)
+        return id_ahorro
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error creando registro de ahorro: {e}")
+        return None
 
 def obtener_socios_con_saldo_actual(id_grupo, id_ahorro):
-    """Obtener socios con su saldo actual de ahorro"""
+    """Obtener socios con su saldo actual de ahorro (una sola consulta)"""
     
-    # Primero obtener todos los socios del grupo
-    socios = ejecutar_consulta(
-        "SELECT id_socio, nombre, apellido FROM socios WHERE id_grupo = %s ORDER BY apellido, nombre",
-        (id_grupo,)
-    )
+    # Saldo actual desde saldo_socio; tiene_registro indica si ya aportó
+    # en esta sesión (id_ahorro)
+    query = """
+        SELECT 
+            s.id_socio,
+            s.nombre,
+            s.apellido,
+            COALESCE(ss.saldo_actual, 0) as saldo_actual,
+            EXISTS(
+                SELECT 1 FROM ahorro_detalle r 
+                WHERE r.id_socio = s.id_socio AND r.id_ahorro = %s
+            ) as tiene_registro
+        FROM socios s
+        LEFT JOIN saldo_socio ss ON ss.id_socio = s.id_socio
+        WHERE s.id_grupo = %s
+        ORDER BY s.apellido, s.nombre
+    """
     
-    resultado = []
+    socios = ejecutar_consulta(query, (id_ahorro, id_grupo))
     for socio in socios:
-        # Buscar último saldo del socio
-        ultimo_saldo = ejecutar_consulta("""
-            SELECT saldo_final 
-            FROM ahorro_detalle 
-            WHERE id_socio = %s 
-            ORDER BY id_ahorro_detalle DESC 
-            LIMIT 1
-        """, (socio['id_socio'],))
-        
-        saldo_actual = ultimo_saldo[0]['saldo_final'] if ultimo_saldo else 0
-        
-        # Verificar si ya tiene registro en esta sesión
-        registro_actual = ejecutar_consulta(
-            "SELECT * FROM ahorro_detalle WHERE id_socio = %s AND id_ahorro = %s",
-            (socio['id_socio'], id_ahorro)
-        )
-        
-        resultado.append({
-            **socio,
-            'saldo_actual': saldo_actual,
-            'tiene_registro': bool(registro_actual)
-        })
+        socio['tiene_registro'] = bool(socio['tiene_registro'])
     
-    return resultado
+    return socios
 
 def guardar_aporte_individual(id_socio, id_ahorro, saldo_anterior, aporte_ahorro, otros_ingresos, saldo_final):
-    """Guardar aporte individual de un socio"""
-    
-    # Verificar si ya existe registro
-    existe = ejecutar_consulta(
-        "SELECT id_ahorro_detalle FROM ahorro_detalle WHERE id_socio = %s AND id_ahorro = %s",
-        (id_socio, id_ahorro)
+    """Guardar aporte individual de un socio (y su saldo_socio, en la misma transacción)"""
+    
+    try:
+        with transaccion():
+            # Verificar si ya existe registro
+            existe = ejecutar_consulta(
+                "SELECT id_ahorro_detalle FROM ahorro_detalle WHERE id_socio = %s AND id_ahorro = %s",
+                (id_socio, id_ahorro)
+            )
+            
+            if existe:
+                # Actualizar registro existente
+                query = """
+                    UPDATE ahorro_detalle 
+                    SET saldo_ahorro = %s, saldo_ingresado = %s, otras_actividades = %s, saldo_final = %s
+                    WHERE id_socio = %s AND id_ahorro = %s
+                """
+                resultado = ejecutar_comando(query, (saldo_anterior, aporte_ahorro, otros_ingresos, saldo_final, id_socio, id_ahorro))
+            else:
+                # Crear nuevo registro
+                query = """
+                    INSERT INTO ahorro_detalle (id_socio, id_ahorro, saldo_ahorro, saldo_ingresado, otras_actividades, saldo_final)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """
+                resultado = ejecutar_comando(query, (id_socio, id_ahorro, saldo_anterior, aporte_ahorro, otros_ingresos, saldo_final))
+            
+            actualizar_saldos_socio(ids_socios=[id_socio])
+        return resultado
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error guardando aporte: {e}")
+        return None
+
+def guardar_aportes_lote(id_ahorro, aportes, total_ingresos, saldo_cierre):
+    """Guardar los aportes de la sesión y los totales del registro de ahorro.
+
+    Un único INSERT multi-fila con ON DUPLICATE KEY UPDATE (requiere el índice
+    UNIQUE (id_ahorro, id_socio) de ahorro_detalle), el saldo_socio de los
+    socios afectados y el UPDATE del encabezado, en la misma transacción.
+    """
+    filas = [
+        (
+            id_socio, id_ahorro, float(datos['saldo_anterior']), float(datos['aporte_ahorro']),
+            float(datos['otros_ingresos']), float(datos['saldo_final'])
+        )
+        for id_socio, datos in aportes.items()
+    ]
+    
+    try:
+        # Sin la clave única el upsert insertaría duplicados en silencio
+        exigir_migracion('012_ahorro_detalle_unico')
+        with transaccion():
+            ejecutar_lote("""
+                INSERT INTO ahorro_detalle (id_socio, id_ahorro, saldo_ahorro, saldo_ingresado, otras_actividades, saldo_final)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    saldo_ahorro = VALUES(saldo_ahorro), 
+                    saldo_ingresado = VALUES(saldo_ingresado), 
+                    otras_actividades = VALUES(otras_actividades), 
+                    saldo_final = VALUES(saldo_final)
+            """, filas)
+            actualizar_saldos_socio(ids_socios=aportes.keys())
+            # Directo (sin actualizar_totales_ahorro): un error aquí revierte los aportes
+            ejecutar_comando(QUERY_ACTUALIZAR_TOTALES_AHORRO, (float(total_ingresos), float(saldo_cierre), id_ahorro))
+            actualizar_saldo_grupo(id_ahorro=id_ahorro)
+        return True
+    except Exception as e:
+        st.error(f"❌ Error guardando aportes: {e}")
+        return False
+
+# =============================================================================
+# SALDO ACTUAL POR SOCIO (TABLA saldo_socio)
+# =============================================================================
+# saldo_socio guarda el saldo_final del registro de ahorro_detalle de la
+# sesión más reciente de cada socio (por fecha_sesion, como las lecturas que
+# reemplaza), para que las lecturas del saldo actual sean por clave primaria.
+# Toda escritura sobre ahorro_detalle debe llamar a actualizar_saldos_socio()
+# dentro de su misma transacción.
+
+QUERY_ACTUALIZAR_SALDOS = """
+    INSERT INTO saldo_socio (id_socio, saldo_actual, id_ahorro_detalle, fecha_actualizacion)
+    SELECT s.id_socio, COALESCE(ad.saldo_final, 0), ad.id_ahorro_detalle, NOW()
+    FROM socios s
+    LEFT JOIN ahorro_detalle ad ON ad.id_ahorro_detalle = (
+        SELECT ad2.id_ahorro_detalle
+        FROM ahorro_detalle ad2
+        JOIN ahorro a ON ad2.id_ahorro = a.id_ahorro
+        JOIN sesion se ON a.id_sesion = se.id_sesion
+        WHERE ad2.id_socio = s.id_socio
+        ORDER BY se.fecha_sesion DESC, ad2.id_ahorro_detalle DESC
+        LIMIT 1
     )
-    
-    if existe:
-        # Actualizar registro existente
-        query = """
-            UPDATE ahorro_detalle 
-            SET saldo_ahorro = %s, saldo_ingresado = %s, otras_actividades = %s, saldo_final = %s
-            WHERE id_socio = %s AND id_ahorro = %s
-        """
-        return ejecutar_comando(query, (saldo_anterior, aporte_ahorro, otros_ingresos, saldo_final, id_socio, id_ahorro))
+    WHERE {filtro}
+    ON DUPLICATE KEY UPDATE 
+        saldo_actual = VALUES(saldo_actual), 
+        id_ahorro_detalle = VALUES(id_ahorro_detalle), 
+        fecha_actualizacion = VALUES(fecha_actualizacion)
+"""
+
+def actualizar_saldos_socio(id_grupo=None, ids_socios=None):
+    """Recalcular saldo_socio de una lista de socios, de un grupo o de todos"""
+    if ids_socios is not None:
+        ids_socios = list(ids_socios)
+        if not ids_socios:
+            return
+        filtro = "s.id_socio IN (" + ", ".join(["%s"] * len(ids_socios)) + ")"
+        params = ids_socios
+    elif id_grupo is not None:
+        filtro = "s.id_grupo = %s"
+        params = [id_grupo]
     else:
-        # Crear nuevo registro
-        query = """
-            INSERT INTO ahorro_detalle (id_socio, id_ahorro, saldo_ahorro, saldo_ingresado, otras_actividades, saldo_final)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        return ejecutar_comando(query, (id_socio, id_ahorro, saldo_anterior, aporte_ahorro, otros_ingresos, saldo_final))
+        filtro = "1 = 1"
+        params = []
+    
+    ejecutar_comando(QUERY_ACTUALIZAR_SALDOS.format(filtro=filtro), tuple(params))
+
+def reconstruir_saldos_socio(id_grupo=None):
+    """Reconstruir saldo_socio desde ahorro_detalle (todo o un grupo)"""
+    with transaccion():
+        if id_grupo is None:
+            ejecutar_comando("DELETE FROM saldo_socio")
+        else:
+            ejecutar_comando(
+                "DELETE FROM saldo_socio WHERE id_socio IN (SELECT id_socio FROM socios WHERE id_grupo = %s)",
+                (id_grupo,)
+            )
+        actualizar_saldos_socio(id_grupo=id_grupo)
+    
+    if id_grupo is None:
+        return ejecutar_consulta("SELECT COUNT(*) as total FROM saldo_socio")[0]['total']
+    return ejecutar_consulta(
+        "SELECT COUNT(*) as total FROM saldo_socio ss JOIN socios s ON ss.id_socio = s.id_socio WHERE s.id_grupo = %s",
+        (id_grupo,)
+    )[0]['total']
+
+QUERY_ACTUALIZAR_TOTALES_AHORRO = """
+    UPDATE ahorro 
+    SET total_ingresos = %s, saldo_cierre = %s 
+    WHERE id_ahorro = %s
+"""
 
 def actualizar_totales_ahorro(id_ahorro, total_ingresos, saldo_cierre):
-    """Actualizar totales en el registro principal de ahorro"""
-    query = """
-        UPDATE ahorro 
-        SET total_ingresos = %s, saldo_cierre = %s 
-        WHERE id_ahorro = %s
-    """
-    return ejecutar_comando(query, (total_ingresos, saldo_cierre, id_ahorro))
+    """Actualizar totales en el registro principal de ahorro (y saldo_grupo, en la misma transacción)"""
+    try:
+        with transaccion():
+            resultado = ejecutar_comando(QUERY_ACTUALIZAR_TOTALES_AHORRO, (total_ingresos, saldo_cierre, id_ahorro))
+            actualizar_saldo_grupo(id_ahorro=id_ahorro)
+        return resultado
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error actualizando totales de ahorro: {e}")
+        return None
 
 def actualizar_firmas_ahorro(id_sesion, firma_tesorera, firma_presidenta):
     """Actualizar firmas en el registro de ahorro"""
@@ -518,7 +636,7 @@ def generar_comprobantes_individuales(id_ahorro):
     
     # Generar archivo consolidado
     st.markdown("---")
-    if st.button("📦 Generar Archivo Consolidado de Todos los Comprobantes"):
+    if st.button("📦 Generar Comprobantes en PDF (ZIP y Consolidado)"):
         generar_archivo_consolidado_comprobantes(detalles_socios, sesion)
 
 def generar_acta_cierre_ahorro(id_sesion):
@@ -663,42 +781,38 @@ def obtener_estado_ahorros_grupo_por_sesion(id_sesion):
     return ejecutar_consulta(query, (id_sesion,))
 
 def generar_archivo_consolidado_comprobantes(detalles_socios, datos_sesion):
-    """Generar archivo consolidado con todos los comprobantes"""
-    
-    contenido_consolidado = f"""
-    COMPROBANTES CONSOLIDADOS DE AHORRO
-    ====================================
-    
-    Grupo: {datos_sesion['nombre_grupo']}
-    Fecha de reunión: {datos_sesion['fecha_sesion'].strftime('%d/%m/%Y')}
-    Fecha de emisión: {datetime.now().strftime('%d/%m/%Y %H:%M')}
-    
-    """
-    
-    for socio in detalles_socios:
-        contenido_consolidado += f"""
-        --- COMPROBANTE INDIVIDUAL ---
-        Socio: {socio['nombre']} {socio['apellido']}
-        Saldo Anterior: ${socio['saldo_anterior']:,.2f}
-        Aporte Actual: ${socio['aporte_actual']:,.2f}
-        Otros Ingresos: ${socio['otros_ingresos']:,.2f}
-        TOTAL AHORRO: ${socio['saldo_final']:,.2f}
-        
-        """
-    
-    contenido_consolidado += f"""
-    RESUMEN GENERAL:
-    ----------------
-    Total Socios: {len(detalles_socios)}
-    Total Ahorro Grupo: ${sum(socio['saldo_final'] for socio in detalles_socios):,.2f}
-    """
-    
-    st.download_button(
-        label="📦 Descargar Archivo Consolidado",
-        data=contenido_consolidado,
-        file_name=f"comprobantes_consolidados_{datos_sesion['nombre_grupo']}_{datetime.now().strftime('%Y%m%d')}.txt",
-        mime="text/plain"
-    )
+    """Generar el PDF consolidado y el ZIP con un PDF por socio"""
+    
+    sufijo = f"{datos_sesion['nombre_grupo']}_{datetime.now().strftime('%Y%m%d')}"
+    
+    try:
+        # Archivos temporales en disco: al generarlos no se acumula un PDF por socio en memoria
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta_zip = os.path.join(directorio, "comprobantes.zip")
+            ruta_pdf = os.path.join(directorio, "consolidado.pdf")
+            with st.spinner("Generando comprobantes..."):
+                generar_zip_comprobantes_ahorro(datos_sesion, detalles_socios, ruta_zip)
+                generar_pdf_consolidado_comprobantes(datos_sesion, detalles_socios, ruta_pdf)
+            
+            # st.download_button lee el archivo completo y lo guarda en memoria
+            # para servirlo: la descarga ocupa el tamaño del ZIP y del PDF
+            col1, col2 = st.columns(2)
+            with col1, open(ruta_zip, 'rb') as archivo_zip:
+                st.download_button(
+                    label="📦 Descargar Comprobantes Individuales (ZIP)",
+                    data=archivo_zip,
+                    file_name=f"comprobantes_ahorro_{sufijo}.zip",
+                    mime="application/zip"
+                )
+            with col2, open(ruta_pdf, 'rb') as archivo_pdf:
+                st.download_button(
+                    label="📄 Descargar Archivo Consolidado (PDF)",
+                    data=archivo_pdf,
+                    file_name=f"comprobantes_consolidados_{sufijo}.pdf",
+                    mime="application/pdf"
+                )
+    except Exception as e:
+        st.error(f"❌ Error generando comprobantes: {e}")
 
 # Reutilizar funciones de reuniones
 from modules.reuniones import obtener_reuniones_recientes, obtener_total_socios_grupo
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from mysql.connector import Error
+from modules.database import ejecutar_consulta, ejecutar_comando, en_transaccion, transaccion
 from datetime import datetime
 
 def modulo_caja():
@@ -209,53 +210,49 @@ def obtener_socios_grupo(id_grupo):
     return ejecutar_consulta(query, (id_grupo,))
 
 def obtener_o_crear_caja(id_grupo, fecha):
-    """Obtener o crear registro de caja para una fecha"""
+    """Obtener o crear registro de caja para una fecha (con su saldo_grupo, en una transacción)"""
     
-    # Buscar sesión para esta fecha
-    sesion = ejecutar_consulta(
-        "SELECT id_sesion FROM sesion WHERE id_grupo = %s AND fecha_sesion = %s",
-        (id_grupo, fecha)
-    )
-    
-    if not sesion:
-        # Crear sesión para esta fecha
-        id_sesion = ejecutar_comando(
-            "INSERT INTO sesion (id_grupo, fecha_sesion, total_presentes) VALUES (%s, %s, 0)",
-            (id_grupo, fecha)
-        )
-    else:
-        id_sesion = sesion[0]['id_sesion']
-    
-    # Buscar caja para esta sesión
-    caja = ejecutar_consulta("SELECT id_caja FROM caja WHERE id_sesion = %s", (id_sesion,))
-    
-    if not caja:
-        # Obtener último saldo de caja
-        ultimo_saldo = obtener_ultimo_saldo_caja(id_grupo)
-        
-        # Crear nueva caja
-        id_caja = ejecutar_comando("""
-            INSERT INTO caja (id_sesion, saldo_apertura, total_ingresos, total_egresos, saldo_cierre, firma_tesorera, firma_presidenta)
-            VALUES (%s, %s, 0, 0, %s, '', '')
-        """, (id_sesion, ultimo_saldo, ultimo_saldo))
-        
+    try:
+        with transaccion():
+            # Buscar sesión para esta fecha
+            sesion = ejecutar_consulta(
+                "SELECT id_sesion FROM sesion WHERE id_grupo = %s AND fecha_sesion = %s",
+                (id_grupo, fecha)
+            )
+            
+            if not sesion:
+                # Crear sesión para esta fecha
+                id_sesion = ejecutar_comando(
+                    "INSERT INTO sesion (id_grupo, fecha_sesion, total_presentes) VALUES (%s, %s, 0)",
+                    (id_grupo, fecha)
+                )
+            else:
+                id_sesion = sesion[0]['id_sesion']
+            
+            # Buscar caja para esta sesión
+            caja = ejecutar_consulta("SELECT id_caja FROM caja WHERE id_sesion = %s", (id_sesion,))
+            if caja:
+                return caja[0]['id_caja']
+            
+            # Obtener último saldo de caja
+            ultimo_saldo = obtener_ultimo_saldo_caja(id_grupo)
+            
+            # Crear nueva caja
+            id_caja = ejecutar_comando("""
+                INSERT INTO caja (id_sesion, saldo_apertura, total_ingresos, total_egresos, saldo_cierre, firma_tesorera, firma_presidenta)
+                VALUES (%s, %s, 0, 0, %s, '', '')
+            """, (id_sesion, ultimo_saldo, ultimo_saldo))
+            actualizar_saldo_grupo(id_grupo=id_grupo)
         return id_caja
-    else:
-        return caja[0]['id_caja']
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error creando registro de caja: {e}")
+        return None
 
 def obtener_ultimo_saldo_caja(id_grupo):
     """Obtener el último saldo de caja del grupo"""
-    query = """
-        SELECT c.saldo_cierre 
-        FROM caja c
-        JOIN sesion s ON c.id_sesion = s.id_sesion
-        WHERE s.id_grupo = %s
-        ORDER BY s.fecha_sesion DESC
-        LIMIT 1
-    """
-    
-    resultado = ejecutar_consulta(query, (id_grupo,))
-    return resultado[0]['saldo_cierre'] if resultado else 0
+    return obtener_saldo_grupo(id_grupo)['saldo_caja']
 
 def registrar_movimiento_caja(id_caja, tipo, id_socio, monto, descripcion):
     """Registrar movimiento de caja"""
@@ -271,37 +268,140 @@ def registrar_movimiento_caja(id_caja, tipo, id_socio, monto, descripcion):
     return ejecutar_comando(query, (id_caja, id_tipomovimiento, id_socio, monto, descripcion, datetime.now()))
 
 def actualizar_totales_caja(id_caja):
-    """Actualizar totales en el registro de caja"""
-    
-    # Calcular totales
-    total_ingresos = ejecutar_consulta("""
-        SELECT COALESCE(SUM(monto), 0) as total 
-        FROM movimiento_de_caja 
-        WHERE id_caja = %s AND id_tipomovimiento IN (1,2,4,5)
-    """, (id_caja,))[0]['total']
-    
-    total_egresos = ejecutar_consulta("""
-        SELECT COALESCE(SUM(monto), 0) as total 
-        FROM movimiento_de_caja 
-        WHERE id_caja = %s AND id_tipomovimiento IN (3,6,7)
-    """, (id_caja,))[0]['total']
+    """Actualizar totales en el registro de caja (y saldo_grupo, en la misma transacción)"""
     
-    # Obtener saldo apertura
-    saldo_apertura = ejecutar_consulta("SELECT saldo_apertura FROM caja WHERE id_caja = %s", (id_caja,))[0]['saldo_apertura']
-    
-    # Calcular saldo cierre
-    saldo_cierre = saldo_apertura + total_ingresos - total_egresos
+    try:
+        with transaccion():
+            # Calcular totales
+            total_ingresos = ejecutar_consulta("""
+                SELECT COALESCE(SUM(monto), 0) as total 
+                FROM movimiento_de_caja 
+                WHERE id_caja = %s AND id_tipomovimiento IN (1,2,4,5)
+            """, (id_caja,))[0]['total']
+            
+            total_egresos = ejecutar_consulta("""
+                SELECT COALESCE(SUM(monto), 0) as total 
+                FROM movimiento_de_caja 
+                WHERE id_caja = %s AND id_tipomovimiento IN (3,6,7)
+            """, (id_caja,))[0]['total']
+            
+            # Obtener saldo apertura
+            saldo_apertura = ejecutar_consulta("SELECT saldo_apertura FROM caja WHERE id_caja = %s", (id_caja,))[0]['saldo_apertura']
+            
+            # Calcular saldo cierre
+            saldo_cierre = saldo_apertura + total_ingresos - total_egresos
+            
+            # Actualizar caja
+            query = """
+                UPDATE caja 
+                SET total_ingresos = %s, total_egresos = %s, saldo_cierre = %s 
+                WHERE id_caja = %s
+            """
+            
+            resultado = ejecutar_comando(query, (total_ingresos, total_egresos, saldo_cierre, id_caja))
+            actualizar_saldo_grupo(id_caja=id_caja)
+        return resultado
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error actualizando totales de caja: {e}")
+        return None
+
+def obtener_saldo_disponible(id_grupo):
+    """Obtener saldo disponible en caja"""
+    return obtener_saldo_grupo(id_grupo)['saldo_caja']
+
+# =============================================================================
+# SALDOS ACTUALES DEL GRUPO (TABLA saldo_grupo)
+# =============================================================================
+# saldo_grupo guarda, por grupo, el saldo de cierre del último registro de
+# ahorro y de caja (última sesión por fecha; a igual fecha, el ID mayor). Toda
+# escritura sobre ahorro o caja debe llamar a actualizar_saldo_grupo() dentro
+# de su misma transacción; las lecturas del saldo actual son por clave primaria.
+
+QUERY_SALDO_GRUPO_CALCULADO = """
+    SELECT g.id_grupo, ua.id_ahorro, COALESCE(ua.saldo_cierre, 0) as saldo_ahorro,
+           uc.id_caja, COALESCE(uc.saldo_cierre, 0) as saldo_caja, NOW() as fecha_actualizacion
+    FROM grupos g
+    LEFT JOIN ahorro ua ON ua.id_ahorro = (
+        SELECT a.id_ahorro
+        FROM ahorro a
+        JOIN sesion s ON a.id_sesion = s.id_sesion
+        WHERE s.id_grupo = g.id_grupo
+        ORDER BY s.fecha_sesion DESC, a.id_ahorro DESC
+        LIMIT 1
+    )
+    LEFT JOIN caja uc ON uc.id_caja = (
+        SELECT c.id_caja
+        FROM caja c
+        JOIN sesion s ON c.id_sesion = s.id_sesion
+        WHERE s.id_grupo = g.id_grupo
+        ORDER BY s.fecha_sesion DESC, c.id_caja DESC
+        LIMIT 1
+    )
+    WHERE {filtro}
+"""
+
+QUERY_ACTUALIZAR_SALDO_GRUPO = """
+    INSERT INTO saldo_grupo (id_grupo, id_ahorro, saldo_ahorro, id_caja, saldo_caja, fecha_actualizacion)
+""" + QUERY_SALDO_GRUPO_CALCULADO + """
+    ON DUPLICATE KEY UPDATE 
+        id_ahorro = VALUES(id_ahorro), 
+        saldo_ahorro = VALUES(saldo_ahorro), 
+        id_caja = VALUES(id_caja), 
+        saldo_caja = VALUES(saldo_caja), 
+        fecha_actualizacion = VALUES(fecha_actualizacion)
+"""
+
+def actualizar_saldo_grupo(id_grupo=None, id_sesion=None, id_ahorro=None, id_caja=None):
+    """Recalcular saldo_grupo del grupo indicado (directamente o por sesión, ahorro o caja)"""
+    if id_grupo is not None:
+        filtro, params = "g.id_grupo = %s", (id_grupo,)
+    elif id_sesion is not None:
+        filtro, params = "g.id_grupo = (SELECT id_grupo FROM sesion WHERE id_sesion = %s)", (id_sesion,)
+    elif id_ahorro is not None:
+        filtro = """g.id_grupo = (
+            SELECT s.id_grupo FROM ahorro a JOIN sesion s ON a.id_sesion = s.id_sesion WHERE a.id_ahorro = %s
+        )"""
+        params = (id_ahorro,)
+    elif id_caja is not None:
+        filtro = """g.id_grupo = (
+            SELECT s.id_grupo FROM caja c JOIN sesion s ON c.id_sesion = s.id_sesion WHERE c.id_caja = %s
+        )"""
+        params = (id_caja,)
+    else:
+        filtro, params = "1 = 1", ()
     
-    # Actualizar caja
-    query = """
-        UPDATE caja 
-        SET total_ingresos = %s, total_egresos = %s, saldo_cierre = %s 
-        WHERE id_caja = %s
+    ejecutar_comando(QUERY_ACTUALIZAR_SALDO_GRUPO.format(filtro=filtro), params)
+
+def obtener_saldo_grupo(id_grupo):
+    """Saldos actuales de ahorro y caja del grupo (lectura por clave primaria).
+
+    Si el grupo no tiene fila en saldo_grupo o la lectura falla, los calcula
+    desde ahorro y caja; si eso también falla lanza Error: un saldo 0 inventado
+    se arrastraría como saldo de apertura.
     """
+    resultado = ejecutar_consulta(
+        "SELECT saldo_ahorro, saldo_caja FROM saldo_grupo WHERE id_grupo = %s",
+        (id_grupo,)
+    )
+    if resultado:
+        return resultado[0]
     
-    return ejecutar_comando(query, (total_ingresos, total_egresos, saldo_cierre, id_caja))
+    resultado = ejecutar_consulta(QUERY_SALDO_GRUPO_CALCULADO.format(filtro="g.id_grupo = %s"), (id_grupo,))
+    if resultado is None:
+        raise Error(msg=f"No se pudo obtener el saldo del grupo {id_grupo}")
+    return resultado[0] if resultado else {'saldo_ahorro': 0, 'saldo_caja': 0}
 
-def obtener_saldo_disponible(id_grupo):
-    """Obtener saldo disponible en caja"""
-    ultima_caja = obtener_ultimo_estado_caja(id_grupo)
-    return ultima_caja[0]['saldo_cierre'] if ultima_caja else 0
\ No newline at end of file
+def reconstruir_saldos_grupo(id_grupo=None):
+    """Reconstruir saldo_grupo desde ahorro y caja (todo o un grupo)"""
+    with transaccion():
+        if id_grupo is None:
+            ejecutar_comando("DELETE FROM saldo_grupo")
+        else:
+            ejecutar_comando("DELETE FROM saldo_grupo WHERE id_grupo = %s", (id_grupo,))
+        actualizar_saldo_grupo(id_grupo=id_grupo)
+    
+    if id_grupo is None:
+        return ejecutar_consulta("SELECT COUNT(*) as total FROM saldo_grupo")[0]['total']
+    return ejecutar_consulta("SELECT COUNT(*) as total FROM saldo_grupo WHERE id_grupo = %s", (id_grupo,))[0]['total']
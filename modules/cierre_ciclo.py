@@ -1,8 +1,11 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, ejecutar_consulta_cacheada, transaccion
 from datetime import datetime, timedelta
 import pandas as pd
 from utils.exportadores import generar_pdf_acta_cierre
+from modules.ahorros import actualizar_saldos_socio
+from modules.caja import obtener_saldo_grupo
+from modules.moras import actualizar_cartera_prestamos
 
 def modulo_cierre_ciclo():
     """Módulo principal para el cierre de ciclo"""
@@ -384,7 +387,7 @@ def obtener_info_ciclo_actual(id_grupo):
         FROM reglas_grupo
         WHERE id_grupo = %s
     """
-    resultado = ejecutar_consulta(query, (id_grupo,))
+    resultado = ejecutar_consulta_cacheada(query, (id_grupo,))
     return resultado[0] if resultado else None
 
 def verificar_reuniones_pendientes(id_grupo):
@@ -466,22 +469,11 @@ def obtener_socios_con_ahorro(id_grupo):
             s.id_socio,
             s.nombre,
             s.apellido,
-            COALESCE((
-                SELECT saldo_final 
-                FROM ahorro_detalle ad 
-                JOIN ahorro a ON ad.id_ahorro = a.id_ahorro 
-                JOIN sesion se ON a.id_sesion = se.id_sesion 
-                WHERE ad.id_socio = s.id_socio 
-                ORDER BY se.fecha_sesion DESC 
-                LIMIT 1
-            ), 0) as ahorro_individual
+            ss.saldo_actual as ahorro_individual
         FROM socios s
+        JOIN saldo_socio ss ON ss.id_socio = s.id_socio
         WHERE s.id_grupo = %s
-        AND s.id_socio IN (
-            SELECT DISTINCT id_socio 
-            FROM ahorro_detalle 
-            WHERE saldo_final > 0
-        )
+        AND ss.saldo_actual > 0
     """
     return ejecutar_consulta(query, (id_grupo,))
 
@@ -686,52 +678,47 @@ def guardar_acta_cierre(id_grupo, grupo_info, datos_ciclo, distribucion, firma_p
 
 def obtener_saldo_caja_actual(id_grupo):
     """Obtener saldo actual de caja"""
-    query = """
-        SELECT saldo_cierre 
-        FROM caja c
-        JOIN sesion s ON c.id_sesion = s.id_sesion
-        WHERE s.id_grupo = %s
-        ORDER BY s.fecha_sesion DESC
-        LIMIT 1
-    """
-    resultado = ejecutar_consulta(query, (id_grupo,))
-    return resultado[0]['saldo_cierre'] if resultado else 0
+    return obtener_saldo_grupo(id_grupo)['saldo_caja']
 
 def ejecutar_cierre_definitivo(id_grupo):
     """Ejecutar el cierre definitivo del ciclo"""
     
     try:
-        # 1. Marcar ciclo como cerrado en reglas
-        ejecutar_comando("""
-            UPDATE reglas_grupo 
-            SET fecha_fin_ciclo = %s 
-            WHERE id_grupo = %s
-        """, (datetime.now().date(), id_grupo))
+        # Todo el cierre se confirma en un solo commit (o se revierte completo)
+        with transaccion():
+            # 1. Marcar ciclo como cerrado en reglas
+            ejecutar_comando("""
+                UPDATE reglas_grupo 
+                SET fecha_fin_ciclo = %s 
+                WHERE id_grupo = %s
+            """, (datetime.now().date(), id_grupo))
         
-        # 2. Crear nuevo ciclo (iniciar nuevo período)
-        nuevo_ciclo_inicio = datetime.now().date()
-        nuevo_ciclo_fin = nuevo_ciclo_inicio + timedelta(days=180)  # 6 meses
+            # 2. Crear nuevo ciclo (iniciar nuevo período)
+            nuevo_ciclo_inicio = datetime.now().date()
+            nuevo_ciclo_fin = nuevo_ciclo_inicio + timedelta(days=180)  # 6 meses
         
-        ejecutar_comando("""
-            UPDATE reglas_grupo 
-            SET fecha_inicio_ciclo = %s, fecha_fin_ciclo = %s 
-            WHERE id_grupo = %s
-        """, (nuevo_ciclo_inicio, nuevo_ciclo_fin, id_grupo))
+            ejecutar_comando("""
+                UPDATE reglas_grupo 
+                SET fecha_inicio_ciclo = %s, fecha_fin_ciclo = %s 
+                WHERE id_grupo = %s
+            """, (nuevo_ciclo_inicio, nuevo_ciclo_fin, id_grupo))
         
-        # 3. Resetear saldos de ahorro para nuevo ciclo
-        ejecutar_comando("""
-            UPDATE ahorro_detalle 
-            SET saldo_ahorro = 0, saldo_ingresado = 0, otras_actividades = 0, saldo_final = 0
-            WHERE id_socio IN (SELECT id_socio FROM socios WHERE id_grupo = %s)
-        """, (id_grupo,))
+            # 3. Resetear saldos de ahorro para nuevo ciclo
+            ejecutar_comando("""
+                UPDATE ahorro_detalle 
+                SET saldo_ahorro = 0, saldo_ingresado = 0, otras_actividades = 0, saldo_final = 0
+                WHERE id_socio IN (SELECT id_socio FROM socios WHERE id_grupo = %s)
+            """, (id_grupo,))
+            actualizar_saldos_socio(id_grupo=id_grupo)
         
-        # 4. Archivar préstamos del ciclo anterior
-        ejecutar_comando("""
-            UPDATE prestamo 
-            SET id_estado_prestamo = 4  -- Marcado como pagado/cerrado
-            WHERE id_socio IN (SELECT id_socio FROM socios WHERE id_grupo = %s)
-            AND id_estado_prestamo IN (2, 5)  -- Aprobado o En Mora
-        """, (id_grupo,))
+            # 4. Archivar préstamos del ciclo anterior
+            ejecutar_comando("""
+                UPDATE prestamo 
+                SET id_estado_prestamo = 4  -- Marcado como pagado/cerrado
+                WHERE id_socio IN (SELECT id_socio FROM socios WHERE id_grupo = %s)
+                AND id_estado_prestamo IN (2, 5)  -- Aprobado o En Mora
+            """, (id_grupo,))
+            actualizar_cartera_prestamos(id_grupo=id_grupo)
         
         return True
         
@@ -1,119 +1,675 @@
-import mysql.connector
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 import streamlit as st
 from mysql.connector import Error
+from mysql.connector import pooling
+
+from modules.motor_sqlite import MEMORIA, conectar_sqlite, es_insert_simple
+
+# =============================================================================
+# CONFIGURACIÓN DEL MOTOR
+# =============================================================================
+# motor = "mysql" (por defecto, pool de conexiones) o "sqlite" (base local con
+# el esquema de config/esquema.sql, para pruebas y benchmarks sin red).
+
+RUTA_ESQUEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "esquema.sql")
+
+_config_manual = None
+
+def configurar_bd(**config):
+    """Configurar la base de datos sin st.secrets (scripts, pruebas, benchmarks).
+
+    Ejemplo:  configurar_bd(motor="sqlite", ruta="bench.db")
+    """
+    global _config_manual, _pool, _log_lentas, _ids_lote_consecutivos
+    _config_manual = dict(config)
+    _pool = None
+    _log_lentas = None
+    _ids_lote_consecutivos = None
+    invalidar_cache()
+
+def _config_bd():
+    """Configuración activa: la de configurar_bd() o st.secrets["db"]"""
+    if _config_manual is not None:
+        return _config_manual
+    return st.secrets["db"]
+
+def motor_bd():
+    """Motor de base de datos configurado ("mysql" o "sqlite")"""
+    return _config_bd().get("motor", "mysql")
+
+# =============================================================================
+# POOL DE CONEXIONES
+# =============================================================================
+
+POOL_SIZE_DEFECTO = 5
+POOL_ESPERA_DEFECTO = 10  # segundos esperando una conexión libre antes de fallar
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obtener_pool():
+    """Obtener el pool de conexiones compartido por todo el proceso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = _config_bd()
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="pool_sgi",
+                    pool_size=int(config.get("pool_size", POOL_SIZE_DEFECTO)),
+                    pool_reset_session=True,
+                    host=config["host"],
+                    user=config["user"],
+                    password=config["password"],
+                    database=config["database"],
+                    charset='utf8'
+                )
+    return _pool
+
+def _tomar_conexion_pool():
+    """Tomar una conexión del pool, esperando (pool_timeout segundos) si está lleno"""
+    limite = time.monotonic() + float(_config_bd().get("pool_timeout", POOL_ESPERA_DEFECTO))
+    espera = 0.01
+    while True:
+        try:
+            return obtener_pool().get_connection()
+        except pooling.PoolError:
+            if time.monotonic() >= limite:
+                raise
+            time.sleep(espera)
+            espera = min(espera * 2, 0.25)
+
+def liberar_conexion(conn, deshacer=False):
+    """Devolver la conexión al pool (con rollback si hubo error) sin ocultar el error original"""
+    if deshacer:
+        try:
+            conn.rollback()
+        except Error:
+            pass
+    try:
+        conn.close()
+    except Error:
+        pass
 
 def conectar_bd():
-    """Establecer conexión con la base de datos"""
+    """Obtener una conexión del pool (liberar_conexion() o conn.close() la devuelven al pool)"""
+    if motor_bd() == "sqlite":
+        try:
+            return conectar_sqlite(_config_bd().get("ruta", MEMORIA), RUTA_ESQUEMA)
+        except Error as e:
+            st.error(f"❌ Error de conexión a la base de datos: {e}")
+            return None
+    
+    try:
+        conn = _tomar_conexion_pool()
+    except pooling.PoolError as e:
+        st.error(f"❌ No hay conexiones disponibles en el pool: {e}")
+        return None
+    except Error as e:
+        st.error(f"❌ Error de conexión a la base de datos: {e}")
+        return None
+    
+    # Verificar que la conexión siga viva; reconectar si quedó obsoleta
     try:
-        conn = mysql.connector.connect(
-            host=st.secrets["db"]["host"],
-            user=st.secrets["db"]["user"],
-            password=st.secrets["db"]["password"],
-            database=st.secrets["db"]["database"],
-            charset='utf8'
-        )
+        try:
+            conn.ping(reconnect=True, attempts=2, delay=0)
+        except Error:
+            conn.reconnect(attempts=2, delay=0)
         return conn
     except Error as e:
+        liberar_conexion(conn)
         st.error(f"❌ Error de conexión a la base de datos: {e}")
         return None
 
+# =============================================================================
+# TRANSACCIONES (UNIDAD DE TRABAJO)
+# =============================================================================
+
+_contexto = threading.local()
+
+def _conexion_transaccion():
+    """Conexión de la transacción activa en este hilo (o None)"""
+    return getattr(_contexto, 'conn', None)
+
+def en_transaccion():
+    """Si este hilo está dentro de un bloque transaccion().
+
+    Las funciones que atrapan sus errores (st.error y retorno None/False)
+    deben relanzarlos cuando corren anidadas: si no, la transacción exterior
+    confirmaría el trabajo a medias.
+    """
+    return _conexion_transaccion() is not None
+
+@contextmanager
+def transaccion():
+    """Ejecutar varias sentencias en una sola conexión con un único commit.
+
+    Dentro del bloque, ejecutar_consulta y ejecutar_comando usan la conexión
+    de la transacción y los errores se propagan para que se haga rollback.
+    Las transacciones anidadas se integran a la exterior.
+    """
+    conn_activa = _conexion_transaccion()
+    if conn_activa is not None:
+        yield conn_activa
+        return
+    
+    conn = conectar_bd()
+    if conn is None:
+        raise Error("No se pudo obtener una conexión para la transacción")
+    
+    _contexto.conn = conn
+    _contexto.tablas_escritas = set()
+    confirmada = False
+    try:
+        yield conn
+        conn.commit()
+        confirmada = True
+    finally:
+        tablas_escritas = _contexto.tablas_escritas
+        _contexto.conn = None
+        _contexto.tablas_escritas = set()
+        liberar_conexion(conn, deshacer=not confirmada)
+        if confirmada and tablas_escritas:
+            invalidar_cache(tablas_escritas)
+
+# =============================================================================
+# CACHÉ DE CONSULTAS
+# =============================================================================
+
+CACHE_TTL_DEFECTO = 300  # segundos
+CACHE_MAX_ENTRADAS = 256
+
+_cache = OrderedDict()  # clave -> (expira, tablas_leidas, resultado)
+_cache_lock = threading.Lock()
+_version_cache = 0
+
+_RE_TABLAS_LECTURA = re.compile(r'\b(?:FROM|JOIN)\s+`?(\w+)`?', re.IGNORECASE)
+_RE_TABLA_ESCRITURA = re.compile(
+    r'^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?',
+    re.IGNORECASE
+)
+
+def _tablas_leidas(query):
+    """Tablas que lee una consulta (FROM / JOIN)"""
+    return frozenset(tabla.lower() for tabla in _RE_TABLAS_LECTURA.findall(query))
+
+def _tabla_escrita(query):
+    """Tabla que modifica un comando INSERT / UPDATE / DELETE"""
+    coincidencia = _RE_TABLA_ESCRITURA.match(query)
+    return coincidencia.group(1).lower() if coincidencia else None
+
+def invalidar_cache(tablas=None):
+    """Eliminar del caché las consultas que leen alguna de las tablas (todas si no se indican)"""
+    global _version_cache
+    with _cache_lock:
+        _version_cache += 1
+        if tablas is None:
+            _cache.clear()
+            return
+        tablas = {tabla.lower() for tabla in tablas}
+        for clave in [c for c, entrada in _cache.items() if entrada[1] & tablas]:
+            del _cache[clave]
+
+def _registrar_escritura(query):
+    """Invalidar el caché de la tabla escrita (al confirmar, si hay transacción activa)"""
+    tabla = _tabla_escrita(query)
+    if not tabla:
+        return
+    _limpiar_memo()
+    if _conexion_transaccion() is not None:
+        _contexto.tablas_escritas.add(tabla)
+    else:
+        invalidar_cache([tabla])
+
+def ejecutar_consulta_cacheada(query, params=None, ttl=CACHE_TTL_DEFECTO):
+    """Ejecutar SELECT usando el caché compartido entre sesiones (TTL + LRU).
+
+    Las entradas se invalidan cuando ejecutar_comando / ejecutar_lote escriben
+    en alguna tabla que la consulta lee; el TTL acota cambios hechos fuera de la app.
+    """
+    if _conexion_transaccion() is not None:
+        return ejecutar_consulta(query, params)
+    
+    clave = (' '.join(query.split()), tuple(params or ()))
+    ahora = time.monotonic()
+    
+    with _cache_lock:
+        entrada = _cache.get(clave)
+        if entrada and entrada[0] > ahora:
+            _cache.move_to_end(clave)
+            return [dict(fila) for fila in entrada[2]]
+        version = _version_cache
+    
+    resultado = ejecutar_consulta(query, params)
+    if resultado is None:
+        return None
+    
+    with _cache_lock:
+        # No guardar si hubo una escritura mientras se ejecutaba la consulta
+        if version == _version_cache:
+            _cache[clave] = (ahora + ttl, _tablas_leidas(query), resultado)
+            _cache.move_to_end(clave)
+            while len(_cache) > CACHE_MAX_ENTRADAS:
+                _cache.popitem(last=False)
+    
+    return [dict(fila) for fila in resultado]
+
+# =============================================================================
+# MEMO POR EJECUCIÓN (UNA CORRIDA DEL SCRIPT)
+# =============================================================================
+
+def iniciar_ejecucion():
+    """Iniciar el memo de lecturas de esta corrida del script (llamar al inicio de cada rerun).
+
+    También descarta las métricas de un render anterior que no terminó (st.stop,
+    st.rerun o una excepción), para que no se sigan acumulando en este hilo.
+    """
+    _contexto.memo = {}
+    descartar_render()
+
+def _limpiar_memo():
+    """Descartar las lecturas memorizadas tras una escritura propia"""
+    if getattr(_contexto, 'memo', None):
+        _contexto.memo = {}
+
+def ejecutar_consulta_memo(query, params=None):
+    """Ejecutar SELECT reutilizando el resultado si ya se ejecutó en esta corrida.
+
+    Sin iniciar_ejecucion() (p. ej. fuera de Streamlit) se comporta igual que ejecutar_consulta.
+    """
+    memo = getattr(_contexto, 'memo', None)
+    if memo is None or _conexion_transaccion() is not None:
+        return ejecutar_consulta(query, params)
+    
+    clave = (' '.join(query.split()), tuple(params or ()))
+    if clave not in memo:
+        resultado = ejecutar_consulta(query, params)
+        if resultado is None:
+            return None
+        memo[clave] = resultado
+    return [dict(fila) for fila in memo[clave]]
+
+# =============================================================================
+# INSTRUMENTACIÓN DE CONSULTAS
+# =============================================================================
+
+UMBRAL_CONSULTA_LENTA_MS = 500
+ARCHIVO_CONSULTAS_LENTAS = "consultas_lentas.log"
+
+_log_lentas = None
+
+def _obtener_log_lentas():
+    """Logger del archivo de consultas lentas (umbral y ruta desde st.secrets["db"])"""
+    global _log_lentas
+    if _log_lentas is None:
+        config = _config_bd()
+        umbral = float(config.get("slow_query_ms", UMBRAL_CONSULTA_LENTA_MS))
+        logger = logging.getLogger("sgi.consultas_lentas")
+        if not logger.handlers:
+            manejador = logging.FileHandler(
+                config.get("slow_query_log", ARCHIVO_CONSULTAS_LENTAS), encoding="utf-8", delay=True
+            )
+            manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(manejador)
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False
+        _log_lentas = (logger, umbral)
+    return _log_lentas
+
+def _origen_llamada():
+    """Módulo.función:línea del primer llamador fuera de este archivo"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return "desconocido"
+    modulo = frame.f_globals.get("__name__", "?")
+    return f"{modulo}.{frame.f_code.co_name}:{frame.f_lineno}"
+
+def _registrar_metrica(tipo, query, inicio, filas):
+    """Registrar duración, filas y origen de una sentencia en el render actual"""
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    sql = ' '.join(query.split())
+    origen = _origen_llamada()
+    
+    render = getattr(_contexto, 'render', None)
+    if render is not None:
+        render['consultas'].append({
+            'tipo': tipo,
+            'sql': sql,
+            'origen': origen,
+            'ms': duracion_ms,
+            'filas': filas
+        })
+    
+    logger, umbral = _obtener_log_lentas()
+    if duracion_ms >= umbral:
+        logger.warning("%.1f ms | %s | %s filas | %s", duracion_ms, origen, filas, sql)
+
+def iniciar_render(pagina):
+    """Comenzar desde cero a acumular las métricas de consultas de una página"""
+    _contexto.render = {'pagina': pagina, 'inicio': time.perf_counter(), 'consultas': []}
+
+def descartar_render():
+    """Dejar de acumular métricas (al terminar de mostrar la página)"""
+    _contexto.render = None
+
+def obtener_metricas_render():
+    """Resumen de las consultas del render actual agrupadas por origen"""
+    render = getattr(_contexto, 'render', None)
+    if render is None:
+        return None
+    
+    por_origen = {}
+    for consulta in render['consultas']:
+        resumen = por_origen.setdefault(consulta['origen'], {
+            'origen': consulta['origen'], 'llamadas': 0, 'ms': 0.0, 'filas': 0
+        })
+        resumen['llamadas'] += 1
+        resumen['ms'] += consulta['ms']
+        resumen['filas'] += consulta['filas'] or 0
+    
+    return {
+        'pagina': render['pagina'],
+        'total_consultas': len(render['consultas']),
+        'total_ms': sum(c['ms'] for c in render['consultas']),
+        'total_filas': sum(c['filas'] or 0 for c in render['consultas']),
+        'duracion_render_ms': (time.perf_counter() - render['inicio']) * 1000,
+        'por_origen': sorted(por_origen.values(), key=lambda r: r['ms'], reverse=True),
+        'consultas': render['consultas']
+    }
+
+# =============================================================================
+# DETECTOR DE CONSULTAS N+1 (MODO DESARROLLO)
+# =============================================================================
+
+UMBRAL_N_MAS_1 = 5
+
+_RE_LITERALES = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+
+def _forma_sentencia(sql):
+    """Forma normalizada de una sentencia (literales y listas de parámetros colapsados)"""
+    forma = _RE_LITERALES.sub('?', sql)
+    return _RE_LISTAS.sub('(?)', forma)
+
+def detectar_n_mas_1(umbral=None, consultas=None):
+    """Sentencias con la misma forma ejecutadas más de `umbral` veces en el render actual"""
+    if umbral is None:
+        umbral = int(_config_bd().get("n1_umbral", UMBRAL_N_MAS_1))
+    if consultas is None:
+        render = getattr(_contexto, 'render', None)
+        consultas = render['consultas'] if render else []
+    
+    por_forma = {}
+    for consulta in consultas:
+        grupo = por_forma.setdefault(_forma_sentencia(consulta['sql']), {'veces': 0, 'origenes': {}})
+        grupo['veces'] += 1
+        grupo['origenes'][consulta['origen']] = grupo['origenes'].get(consulta['origen'], 0) + 1
+    
+    return [
+        {'sql': forma, 'veces': grupo['veces'], 'origenes': grupo['origenes']}
+        for forma, grupo in sorted(por_forma.items(), key=lambda item: -item[1]['veces'])
+        if grupo['veces'] > umbral
+    ]
+
+def _describir_n_mas_1(hallazgos):
+    """Texto legible de los hallazgos N+1"""
+    lineas = []
+    for hallazgo in hallazgos:
+        origenes = ', '.join(f"{origen} (x{veces})" for origen, veces in hallazgo['origenes'].items())
+        lineas.append(f"{hallazgo['veces']} ejecuciones de: {hallazgo['sql']} | desde: {origenes}")
+    return '\n'.join(lineas)
+
+@contextmanager
+def sin_n_mas_1(umbral=UMBRAL_N_MAS_1):
+    """Verificar que el bloque no ejecute consultas N+1; lanza AssertionError si las hay.
+
+    Uso en pruebas:  with sin_n_mas_1(3): obtener_socios_con_saldo_actual(1, 1)
+    """
+    render_anterior = getattr(_contexto, 'render', None)
+    iniciar_render('sin_n_mas_1')
+    try:
+        yield
+        hallazgos = detectar_n_mas_1(umbral)
+    finally:
+        _contexto.render = render_anterior
+    
+    if hallazgos:
+        raise AssertionError("Consultas N+1 detectadas:\n" + _describir_n_mas_1(hallazgos))
+
+def reportar_n_mas_1():
+    """Mostrar y registrar los patrones N+1 del render si el modo desarrollo está activo"""
+    if not _config_bd().get("detectar_n1", False):
+        return
+    
+    hallazgos = detectar_n_mas_1()
+    if hallazgos:
+        descripcion = _describir_n_mas_1(hallazgos)
+        logging.getLogger("sgi.n_mas_1").warning(descripcion)
+        st.warning(f"⚠️ Posibles consultas N+1 en esta página:\n\n```\n{descripcion}\n```")
+
+# =============================================================================
+# EJECUCIÓN DE CONSULTAS
+# =============================================================================
+
+def _consultar_en(conn, query, params):
+    """Ejecutar un SELECT en una conexión y registrar su métrica"""
+    inicio = time.perf_counter()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(query, params or ())
+    resultado = cursor.fetchall()
+    cursor.close()
+    _registrar_metrica('consulta', query, inicio, len(resultado))
+    return resultado
+
+def _comandar_en(conn, query, params, contar_filas=False):
+    """Ejecutar un INSERT/UPDATE/DELETE en una conexión (sin commit) y registrar su métrica.
+
+    Retorna el ID generado, o las filas afectadas si contar_filas.
+    """
+    inicio = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute(query, params or ())
+    id_generado = cursor.lastrowid
+    filas_afectadas = cursor.rowcount
+    cursor.close()
+    _registrar_metrica('comando', query, inicio, filas_afectadas)
+    return filas_afectadas if contar_filas else id_generado
+
 def ejecutar_consulta(query, params=None):
     """Ejecutar consulta SELECT y retornar resultados"""
+    conn_tx = _conexion_transaccion()
+    if conn_tx is not None:
+        return _consultar_en(conn_tx, query, params)
+    
+    conn = conectar_bd()
+    if conn is None:
+        return None
+    
+    exito = False
     try:
-        conn = conectar_bd()
-        if conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            resultado = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return resultado
+        resultado = _consultar_en(conn, query, params)
+        exito = True
+        return resultado
     except Error as e:
         st.error(f"❌ Error en consulta: {e}")
-    return None
+        return None
+    finally:
+        liberar_conexion(conn, deshacer=not exito)
+
+def ejecutar_comando(query, params=None, contar_filas=False):
+    """Ejecutar comando INSERT, UPDATE, DELETE.
 
-def ejecutar_comando(query, params=None):
-    """Ejecutar comando INSERT, UPDATE, DELETE"""
+    Retorna el ID generado (o, con contar_filas=True, las filas afectadas,
+    p. ej. las realmente insertadas por un INSERT IGNORE); None si falla.
+    """
+    conn_tx = _conexion_transaccion()
+    if conn_tx is not None:
+        # El commit lo hace transaccion() al salir del bloque
+        id_generado = _comandar_en(conn_tx, query, params, contar_filas)
+        _registrar_escritura(query)
+        return id_generado
+    
+    conn = conectar_bd()
+    if conn is None:
+        return None
+    
+    exito = False
     try:
-        conn = conectar_bd()
-        if conn:
+        id_generado = _comandar_en(conn, query, params, contar_filas)
+        conn.commit()
+        exito = True
+    except Error as e:
+        st.error(f"❌ Error ejecutando comando: {e}")
+        return None
+    finally:
+        liberar_conexion(conn, deshacer=not exito)
+    
+    _registrar_escritura(query)
+    return id_generado
+
+_ids_lote_consecutivos = None
+
+def _lote_genera_ids_consecutivos(conn):
+    """Si un INSERT multi-fila recibe IDs consecutivos (no con innodb_autoinc_lock_mode = 2)"""
+    global _ids_lote_consecutivos
+    if _ids_lote_consecutivos is None:
+        if motor_bd() == "sqlite":
+            _ids_lote_consecutivos = True
+        else:
             cursor = conn.cursor()
-            cursor.execute(query, params or ())
-            conn.commit()
-            id_generado = cursor.lastrowid
+            cursor.execute("SELECT @@innodb_autoinc_lock_mode")
+            _ids_lote_consecutivos = int(cursor.fetchone()[0]) != 2
             cursor.close()
-            conn.close()
-            return id_generado
+    return _ids_lote_consecutivos
+
+def _ejecutar_lote_en(conn, query, filas):
+    """Ejecutar executemany en una conexión y obtener los IDs generados (solo INSERT simple)"""
+    inicio = time.perf_counter()
+    insert_simple = es_insert_simple(query)
+    ids = []
+    cursor = conn.cursor()
+    if insert_simple and not _lote_genera_ids_consecutivos(conn):
+        # Modo intercalado: los IDs de un INSERT multi-fila pueden tener huecos
+        for fila in filas:
+            cursor.execute(query, fila)
+            ids.append(cursor.lastrowid)
+    else:
+        cursor.executemany(query, filas)
+        if insert_simple:
+            primer_id, insertadas = cursor.lastrowid, cursor.rowcount
+            if not primer_id or insertadas != len(filas):
+                cursor.close()
+                raise Error(msg=f"El lote insertó {insertadas} de {len(filas)} filas")
+            # Sin IGNORE ni ON DUPLICATE KEY cada fila recibe el siguiente ID
+            ids = list(range(primer_id, primer_id + len(filas)))
+    cursor.close()
+    _registrar_metrica('lote', query, inicio, len(filas))
+    _registrar_escritura(query)
+    return ids
+
+def ejecutar_lote(query, filas):
+    """Ejecutar un INSERT/UPDATE para muchas filas en una sola transacción.
+
+    Los INSERT se envían como un único INSERT multi-fila (executemany).
+    Retorna la lista de IDs generados por un INSERT simple (vacía para
+    UPDATE, INSERT IGNORE y ON DUPLICATE KEY UPDATE) o None si falla.
+    """
+    filas = [tuple(fila) for fila in filas]
+    if not filas:
+        return []
+    
+    conn_tx = _conexion_transaccion()
+    if conn_tx is not None:
+        return _ejecutar_lote_en(conn_tx, query, filas)
+    
+    try:
+        with transaccion() as conn:
+            return _ejecutar_lote_en(conn, query, filas)
     except Error as e:
-        st.error(f"❌ Error ejecutando comando: {e}")
+        st.error(f"❌ Error ejecutando lote: {e}")
     return None
 
 def inicializar_bd():
     """Inicializar tablas necesarias si no existen"""
+    conn = conectar_bd()
+    if conn is None:
+        return
+    
+    exito = False
     try:
-        conn = conectar_bd()
-        if conn:
-            cursor = conn.cursor()
-            
-            # Verificar si existen datos básicos
-            cursor.execute("SELECT COUNT(*) as count FROM distrito")
-            resultado = cursor.fetchone()
-            
-            if resultado[0] == 0:
-                # Insertar datos básicos con IDs explícitos
-                datos_iniciales = [
-                    # Distritos
-                    "INSERT INTO distrito (id_distrito, nombre_distrito, municipio) VALUES (1, 'Distrito Central', 'Tegucigalpa')",
-                    "INSERT INTO distrito (id_distrito, nombre_distrito, municipio) VALUES (2, 'Distrito Norte', 'San Pedro Sula')",
-                    "INSERT INTO distrito (id_distrito, nombre_distrito, municipio) VALUES (3, 'Distrito Sur', 'Choluteca')",
-                    
-                    # Frecuencias
-                    "INSERT INTO frecuencia (tipo_frecuencia) VALUES ('Semanal')",
-                    "INSERT INTO frecuencia (tipo_frecuencia) VALUES ('Quincenal')",
-                    "INSERT INTO frecuencia (tipo_frecuencia) VALUES ('Mensual')",
-                    
-                    # Roles de directiva
-                    "INSERT INTO roles (id_rol, tipo_rol, funcion) VALUES (1, 'Presidente/a', 'Dirige las reuniones y representa al grupo')",
-                    "INSERT INTO roles (id_rol, tipo_rol, funcion) VALUES (2, 'Tesorero/a', 'Administra el dinero y lleva registros')",
-                    "INSERT INTO roles (id_rol, tipo_rol, funcion) VALUES (3, 'Secretario/a', 'Lleva actas y control de documentos')",
-                    
-                    # Estados de directiva
-                    "INSERT INTO estado_directiva (id_estadodirectiva, clave, estado) VALUES (1, 'ACTIVO', 'Activo')",
-                    "INSERT INTO estado_directiva (id_estadodirectiva, clave, estado) VALUES (2, 'INACTIVO', 'Inactivo')",
-                    
-                    # Estados de préstamo
-                    "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (1, 'Pendiente')",
-                    "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (2, 'Aprobado')",
-                    "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (3, 'Rechazado')",
-                    "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (4, 'Pagado')",
-                    "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (5, 'Mora')",
-                    
-                    # Tipos de movimiento de caja
-                    "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (1, 'Ahorro', 'Aportes de ahorro de socios')",
-                    "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (2, 'Préstamo', 'Desembolso de préstamo')",
-                    "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (3, 'Pago Préstamo', 'Pago de cuota de préstamo')",
-                    "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (4, 'Multa', 'Multa por inasistencia o mora')",
-                    "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (5, 'Otros Ingresos', 'Ingresos por actividades especiales')",
-                    "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (6, 'Gastos Operativos', 'Gastos administrativos del grupo')",
-                    "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (7, 'Devolución', 'Devolución de fondos')",
-                    
-                    # Promotor por defecto
-                    "INSERT INTO promotores (id_promotor, nombre, apellido, tele, direccion, id_distrito) VALUES (1, 'Promotor', 'Demo', 99999999, 'Dirección demo', 1)"
-                ]
+        cursor = conn.cursor()
+        
+        # Verificar si existen datos básicos
+        cursor.execute("SELECT COUNT(*) as count FROM distrito")
+        resultado = cursor.fetchone()
+        
+        if resultado[0] == 0:
+            # Insertar datos básicos con IDs explícitos
+            datos_iniciales = [
+                # Distritos
+                "INSERT INTO distrito (id_distrito, nombre_distrito, municipio) VALUES (1, 'Distrito Central', 'Tegucigalpa')",
+                "INSERT INTO distrito (id_distrito, nombre_distrito, municipio) VALUES (2, 'Distrito Norte', 'San Pedro Sula')",
+                "INSERT INTO distrito (id_distrito, nombre_distrito, municipio) VALUES (3, 'Distrito Sur', 'Choluteca')",
                 
-                for comando in datos_iniciales:
-                    try:
-                        cursor.execute(comando)
-                    except Error as e:
-                        # Si ya existe el registro, ignorar el error
-                        if "Duplicate entry" not in str(e):
-                            st.warning(f"Advertencia al insertar datos: {e}")
+                # Frecuencias
+                "INSERT INTO frecuencia (tipo_frecuencia) VALUES ('Semanal')",
+                "INSERT INTO frecuencia (tipo_frecuencia) VALUES ('Quincenal')",
+                "INSERT INTO frecuencia (tipo_frecuencia) VALUES ('Mensual')",
                 
-                conn.commit()
-                st.success("✅ Base de datos inicializada con datos básicos")
+                # Roles de directiva
+                "INSERT INTO roles (id_rol, tipo_rol, funcion) VALUES (1, 'Presidente/a', 'Dirige las reuniones y representa al grupo')",
+                "INSERT INTO roles (id_rol, tipo_rol, funcion) VALUES (2, 'Tesorero/a', 'Administra el dinero y lleva registros')",
+                "INSERT INTO roles (id_rol, tipo_rol, funcion) VALUES (3, 'Secretario/a', 'Lleva actas y control de documentos')",
+                
+                # Estados de directiva
+                "INSERT INTO estado_directiva (id_estadodirectiva, clave, estado) VALUES (1, 'ACTIVO', 'Activo')",
+                "INSERT INTO estado_directiva (id_estadodirectiva, clave, estado) VALUES (2, 'INACTIVO', 'Inactivo')",
+                
+                # Estados de préstamo
+                "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (1, 'Pendiente')",
+                "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (2, 'Aprobado')",
+                "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (3, 'Rechazado')",
+                "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (4, 'Pagado')",
+                "INSERT INTO estado_del_prestamo (id_estadoprestamo, estados) VALUES (5, 'Mora')",
+                
+                # Tipos de movimiento de caja
+                "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (1, 'Ahorro', 'Aportes de ahorro de socios')",
+                "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (2, 'Préstamo', 'Desembolso de préstamo')",
+                "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (3, 'Pago Préstamo', 'Pago de cuota de préstamo')",
+                "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (4, 'Multa', 'Multa por inasistencia o mora')",
+                "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (5, 'Otros Ingresos', 'Ingresos por actividades especiales')",
+                "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (6, 'Gastos Operativos', 'Gastos administrativos del grupo')",
+                "INSERT INTO tipo_de_movimiento_de_caja (id_tipomovimiento, nombre_movimiento, descripcion) VALUES (7, 'Devolución', 'Devolución de fondos')",
+                
+                # Promotor por defecto
+                "INSERT INTO promotores (id_promotor, nombre, apellido, tele, direccion, id_distrito) VALUES (1, 'Promotor', 'Demo', 99999999, 'Dirección demo', 1)"
+            ]
             
-            cursor.close()
-            conn.close()
+            for comando in datos_iniciales:
+                try:
+                    cursor.execute(comando)
+                except Error as e:
+                    # Si ya existe el registro, ignorar el error
+                    if "Duplicate entry" not in str(e):
+                        st.warning(f"Advertencia al insertar datos: {e}")
             
+            conn.commit()
+            invalidar_cache()
+            st.success("✅ Base de datos inicializada con datos básicos")
+        
+        cursor.close()
+        exito = True
     except Error as e:
-        st.error(f"❌ Error inicializando BD: {e}")
\ No newline at end of file
+        st.error(f"❌ Error inicializando BD: {e}")
+    finally:
+        liberar_conexion(conn, deshacer=not exito)
\ No newline at end of file
@@ -1,5 +1,5 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, ejecutar_consulta_cacheada
 from datetime import datetime
 import pandas as pd
 
@@ -218,14 +218,14 @@ def configuracion_reglas():
 
 def obtener_distritos():
     """Obtener lista de distritos"""
-    resultado = ejecutar_consulta("SELECT id_distrito, nombre_distrito FROM distrito")
+    resultado = ejecutar_consulta_cacheada("SELECT id_distrito, nombre_distrito FROM distrito")
     if resultado:
         return [(row['id_distrito'], row['nombre_distrito']) for row in resultado]
     return []
 
 def obtener_frecuencias():
     """Obtener lista de frecuencias"""
-    resultado = ejecutar_consulta("SELECT `id_frecuencia`, `tipo_frecuencia` FROM `frecuencia`")
+    resultado = ejecutar_consulta_cacheada("SELECT `id_frecuencia`, `tipo_frecuencia` FROM `frecuencia`")
     if resultado:
         return [(row['id_frecuencia'], row['tipo_frecuencia']) for row in resultado]
     return []
@@ -246,14 +246,14 @@ def obtener_grupos_con_nombres():
 
 def obtener_roles_directiva():
     """Obtener roles de directiva"""
-    resultado = ejecutar_consulta("SELECT id_rol, tipo_rol FROM roles")
+    resultado = ejecutar_consulta_cacheada("SELECT id_rol, tipo_rol FROM roles")
     if resultado:
         return [(row['id_rol'], row['tipo_rol']) for row in resultado]
     return []
 
 def obtener_estados_directiva():
     """Obtener estados de directiva"""
-    resultado = ejecutar_consulta("SELECT id_estadodirectiva, estado FROM estado_directiva")
+    resultado = ejecutar_consulta_cacheada("SELECT id_estadodirectiva, estado FROM estado_directiva")
     if resultado:
         return [(row['id_estadodirectiva'], row['estado']) for row in resultado]
     return []
@@ -488,7 +488,7 @@ def asignar_directiva(id_socio, id_grupo, id_rol, fecha_inicio, fecha_fin, id_es
 
 def obtener_reglas_grupo(id_grupo):
     """Obtener reglas actuales del grupo"""
-    resultado = ejecutar_consulta("SELECT * FROM reglas_grupo WHERE id_grupo = %s", (id_grupo,))
+    resultado = ejecutar_consulta_cacheada("SELECT * FROM reglas_grupo WHERE id_grupo = %s", (id_grupo,))
     if resultado:
         return resultado[0]  # Devolver el primer registro
     return None
@@ -0,0 +1,269 @@
+import re
+
+import streamlit as st
+from mysql.connector import Error
+
+from modules.database import RUTA_ESQUEMA, ejecutar_comando, ejecutar_consulta, motor_bd, transaccion
+from modules.motor_sqlite import traducir_ddl
+
+# =============================================================================
+# MIGRACIONES DEL ESQUEMA
+# =============================================================================
+# config/esquema.sql describe el esquema actual y crea las bases nuevas. Las
+# bases ya desplegadas se ponen al día con:
+#   python -m scripts.migrar                 # usa st.secrets["db"]
+#   python -m scripts.migrar --sqlite bench.db
+#
+# Cada migración se reconoce por el estado real del esquema ("aplicada"), sin
+# tabla de control: una base creada desde esquema.sql ya las tiene todas. Las
+# sentencias usan el subconjunto portable (CREATE INDEX, ADD COLUMN); las
+# tablas nuevas se crean con su CREATE TABLE de esquema.sql. "bloqueo" es una
+# consulta que cuenta filas que impiden aplicarla (p. ej. duplicados que una
+# clave única rechazaría): la migración no borra datos por su cuenta.
+# "reconstruir" lista las tablas materializadas que scripts.migrar recalcula
+# (con scripts.reconstruir_saldos) después de crearlas.
+#
+# Una sentencia también puede ser un par (ya_hecha, sql): se omite si
+# ya_hecha() es verdadero. En MySQL cada DDL confirma solo, así una migración
+# que falló a medias se retoma sin repetir los pasos aplicados.
+#
+# La app no arranca con migraciones pendientes (verificar_esquema).
+
+# -----------------------------------------------------------------------------
+# Inspección del esquema (MySQL o SQLite)
+# -----------------------------------------------------------------------------
+
+def _contar(query, params):
+    """Ejecutar un COUNT(*) as total; un error de consulta se propaga"""
+    resultado = ejecutar_consulta(query, params)
+    if resultado is None:
+        raise Error(msg="No se pudo inspeccionar el esquema de la base de datos")
+    return resultado[0]['total']
+
+def existe_tabla(tabla):
+    """Si la tabla existe en la base configurada"""
+    if motor_bd() == "sqlite":
+        return _contar("SELECT COUNT(*) as total FROM sqlite_master WHERE type = 'table' AND name = %s", (tabla,)) > 0
+    return _contar("""
+        SELECT COUNT(*) as total FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (tabla,)) > 0
+
+def existe_columna(tabla, columna):
+    """Si la tabla tiene la columna"""
+    if motor_bd() == "sqlite":
+        return _contar("SELECT COUNT(*) as total FROM pragma_table_info(%s) WHERE name = %s", (tabla, columna)) > 0
+    return _contar("""
+        SELECT COUNT(*) as total FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (tabla, columna)) > 0
+
+def existe_indice(tabla, columnas, unico=False):
+    """Si la tabla tiene un índice (único, si se pide) con exactamente esas columnas en ese orden"""
+    if motor_bd() == "sqlite":
+        filas = ejecutar_consulta("""
+            SELECT il.name as indice, il."unique" as unico, ii.name as columna
+            FROM pragma_index_list(%s) il, pragma_index_info(il.name) ii
+            ORDER BY il.name, ii.seqno
+        """, (tabla,))
+    else:
+        filas = ejecutar_consulta("""
+            SELECT INDEX_NAME as indice, NON_UNIQUE = 0 as unico, COLUMN_NAME as columna
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """, (tabla,))
+    if filas is None:
+        raise Error(msg="No se pudo inspeccionar el esquema de la base de datos")
+
+    indices = {}
+    for fila in filas:
+        indice = indices.setdefault(fila['indice'], {'unico': bool(fila['unico']), 'columnas': []})
+        indice['columnas'].append(fila['columna'].lower())
+
+    buscadas = [columna.lower() for columna in columnas]
+    return any(
+        indice['columnas'] == buscadas and (indice['unico'] or not unico)
+        for indice in indices.values()
+    )
+
+def sentencia_esquema(inicio):
+    """Sentencia de config/esquema.sql que empieza con `inicio` (p. ej. "CREATE TABLE saldo_socio"),
+    en el dialecto del motor configurado"""
+    with open(RUTA_ESQUEMA, encoding="utf-8") as archivo:
+        ddl = "\n".join(linea for linea in archivo.read().splitlines() if not linea.strip().startswith("--"))
+
+    patron = re.compile(r"^" + r"\s+".join(map(re.escape, inicio.split())) + r"\b", re.IGNORECASE)
+    for sentencia in ddl.split(";"):
+        sql = sentencia.strip()
+        if patron.match(sql):
+            return traducir_ddl(sql)[0] if motor_bd() == "sqlite" else sql
+    raise ValueError(f"No se encontró en esquema.sql: {inicio}")
+
+# -----------------------------------------------------------------------------
+# Migraciones (en orden)
+# -----------------------------------------------------------------------------
+
+def _pasos_hechos(pasos):
+    """Si todos los pasos (ya_hecha, sql) ya están aplicados"""
+    return all(ya_hecha() for ya_hecha, _ in pasos)
+
+_PASOS_ALERTAS_PRESTAMO = [
+    (lambda: existe_columna('alertas', 'id_prestamo'),
+     "ALTER TABLE alertas ADD COLUMN id_prestamo INT"),
+    (lambda: existe_columna('alertas', 'tipo'),
+     "ALTER TABLE alertas ADD COLUMN tipo VARCHAR(20) NOT NULL DEFAULT 'GENERAL'"),
+    (lambda: existe_indice('alertas', ['id_grupo', 'id_prestamo', 'tipo'], unico=True),
+     "CREATE UNIQUE INDEX uq_alertas_grupo_prestamo_tipo ON alertas (id_grupo, id_prestamo, tipo)"),
+    (lambda: existe_indice('alertas', ['id_grupo', 'resuelta', 'fecha_alerta']),
+     "CREATE INDEX idx_alertas_grupo_estado ON alertas (id_grupo, resuelta, fecha_alerta)"),
+]
+
+MIGRACIONES = [
+    {
+        'nombre': '012_ahorro_detalle_unico',
+        'descripcion': "Clave única (id_ahorro, id_socio) en ahorro_detalle para el upsert de aportes",
+        'aplicada': lambda: existe_indice('ahorro_detalle', ['id_ahorro', 'id_socio'], unico=True),
+        'bloqueo': ("""
+            SELECT COUNT(*) as total FROM (
+                SELECT id_ahorro, id_socio FROM ahorro_detalle
+                GROUP BY id_ahorro, id_socio HAVING COUNT(*) > 1
+            ) duplicados
+        """, "socios con más de un aporte en el mismo registro de ahorro; "
+             "consolidarlos antes de crear la clave única"),
+        'sentencias': [
+            "CREATE UNIQUE INDEX uq_ahorro_detalle_socio ON ahorro_detalle (id_ahorro, id_socio)",
+        ],
+    },
+    {
+        'nombre': '013_saldo_socio',
+        'descripcion': "Tabla saldo_socio (saldo actual de cada socio), reconstruida desde ahorro_detalle",
+        'aplicada': lambda: existe_tabla('saldo_socio'),
+        'tablas': ['saldo_socio'],
+        'reconstruir': ['saldo_socio'],
+    },
+    {
+        'nombre': '014_saldo_grupo',
+        'descripcion': "Tabla saldo_grupo (saldos actuales de ahorro y caja), reconstruida desde ahorro y caja",
+        'aplicada': lambda: existe_tabla('saldo_grupo'),
+        'tablas': ['saldo_grupo'],
+        'reconstruir': ['saldo_grupo'],
+    },
+    {
+        'nombre': '016_asistencia_unica',
+        'descripcion': "Clave única (id_sesion, id_socio) en asistencia para inicializarla con INSERT IGNORE",
+        'aplicada': lambda: existe_indice('asistencia', ['id_sesion', 'id_socio'], unico=True),
+        'bloqueo': ("""
+            SELECT COUNT(*) as total FROM (
+                SELECT id_sesion, id_socio FROM asistencia
+                GROUP BY id_sesion, id_socio HAVING COUNT(*) > 1
+            ) duplicados
+        """, "socios con más de un registro de asistencia en la misma sesión; "
+             "dejar uno por socio antes de crear la clave única"),
+        'sentencias': [
+            "CREATE UNIQUE INDEX uq_asistencia_sesion_socio ON asistencia (id_sesion, id_socio)",
+        ],
+    },
+    {
+        'nombre': '020_multa_unica',
+        'descripcion': "Clave única (id_sesion, id_socio, motivo) en multa para no repetir multas",
+        'aplicada': lambda: existe_indice('multa', ['id_sesion', 'id_socio', 'motivo'], unico=True),
+        'bloqueo': ("""
+            SELECT COUNT(*) as total FROM (
+                SELECT id_sesion, id_socio, motivo FROM multa
+                GROUP BY id_sesion, id_socio, motivo HAVING COUNT(*) > 1
+            ) duplicados
+        """, "socios con la misma multa (sesión y motivo) repetida; revisar los pagos "
+             "y dejar una por socio antes de crear la clave única"),
+        'sentencias': [
+            "CREATE UNIQUE INDEX uq_multa_sesion_socio_motivo ON multa (id_sesion, id_socio, motivo)",
+        ],
+    },
+    {
+        'nombre': '024_cartera',
+        'descripcion': "Tablas cartera_prestamo y cartera_mora_diaria, con cartera_prestamo reconstruida desde prestamo y detalles_pagos",
+        'aplicada': lambda: existe_tabla('cartera_prestamo') and existe_tabla('cartera_mora_diaria'),
+        'tablas': ['cartera_prestamo', 'cartera_mora_diaria'],
+        'sentencias': [
+            "CREATE INDEX idx_cartera_prestamo_grupo ON cartera_prestamo (id_grupo, id_estado_prestamo)",
+            "CREATE INDEX idx_cartera_mora_diaria_grupo ON cartera_mora_diaria (id_grupo, fecha)",
+            "CREATE INDEX idx_cartera_mora_diaria_distrito ON cartera_mora_diaria (id_distrito, fecha)",
+        ],
+        'reconstruir': ['cartera_prestamo'],
+    },
+    {
+        'nombre': '025_alertas_prestamo',
+        'descripcion': "Columnas id_prestamo y tipo en alertas, con clave única (id_grupo, id_prestamo, tipo) para el upsert",
+        'aplicada': lambda: _pasos_hechos(_PASOS_ALERTAS_PRESTAMO),
+        # Las alertas existentes quedan con id_prestamo NULL y tipo 'GENERAL':
+        # no chocan con la clave única (NULL no se repite)
+        'sentencias': _PASOS_ALERTAS_PRESTAMO,
+    },
+]
+
+def obtener_migracion(nombre):
+    """Migración por nombre"""
+    return next(migracion for migracion in MIGRACIONES if migracion['nombre'] == nombre)
+
+def migraciones_pendientes():
+    """Migraciones que la base configurada todavía no tiene"""
+    return [migracion for migracion in MIGRACIONES if not migracion['aplicada']()]
+
+def aplicar_migracion(migracion):
+    """Aplicar una migración; lanza ValueError si hay datos que la bloquean"""
+    if migracion.get('bloqueo'):
+        query, motivo = migracion['bloqueo']
+        total = _contar(query, ())
+        if total:
+            raise ValueError(f"{migracion['nombre']}: {total:,} {motivo}")
+
+    # Dentro de transaccion() los errores se propagan (en MySQL cada DDL confirma solo)
+    with transaccion():
+        for tabla in migracion.get('tablas', []):
+            ejecutar_comando(sentencia_esquema(f"CREATE TABLE {tabla}"))
+        for sentencia in migracion.get('sentencias', []):
+            if isinstance(sentencia, tuple):
+                ya_hecha, sql = sentencia
+                if ya_hecha():
+                    continue
+            else:
+                sql = sentencia
+            ejecutar_comando(sql)
+
+# -----------------------------------------------------------------------------
+# Verificación al arrancar
+# -----------------------------------------------------------------------------
+
+_esquema_verificado = False
+
+def verificar_esquema():
+    """Detener la app si la base tiene migraciones pendientes (se comprueba una vez por proceso)"""
+    global _esquema_verificado
+    if _esquema_verificado:
+        return
+
+    try:
+        pendientes = migraciones_pendientes()
+    except Error as e:
+        st.error(f"❌ No se pudo verificar el esquema de la base de datos: {e}")
+        st.stop()
+
+    if pendientes:
+        lista = "\n".join(f"- {m['nombre']}: {m['descripcion']}" for m in pendientes)
+        st.error(
+            "❌ La base de datos tiene migraciones pendientes. Ejecute "
+            f"`python -m scripts.migrar` antes de usar la aplicación:\n\n{lista}"
+        )
+        st.stop()
+
+    _esquema_verificado = True
+
+_migraciones_confirmadas = set()
+
+def exigir_migracion(nombre):
+    """Lanzar un error si la migración no está aplicada (para escrituras que dependen de ella)"""
+    if _esquema_verificado or nombre in _migraciones_confirmadas:
+        return
+    if not obtener_migracion(nombre)['aplicada']():
+        raise Error(msg=f"Falta la migración {nombre}; ejecute: python -m scripts.migrar")
+    _migraciones_confirmadas.add(nombre)
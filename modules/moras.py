@@ -1,5 +1,5 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, ejecutar_lote, en_transaccion, transaccion
 from datetime import datetime, timedelta
 import pandas as pd
 import plotly.graph_objects as go
@@ -157,7 +157,7 @@ def alertas_activas():
         
         # Botón para limpiar alertas resueltas
         if st.button("🗑️ Limpiar Alertas Resueltas"):
-            limpiar_alertas_resueltas()
+            limpiar_alertas_resueltas(st.session_state.id_grupo)
             st.rerun()
     else:
         st.success("✅ No hay alertas activas")
@@ -192,6 +192,17 @@ def reportes_mora():
         # Gráficos de evolución
         st.markdown("### 📈 Evolución de la Mora")
         
+        # Tasa de mora y saldo en mora según las fotos diarias de la cartera
+        if stats['evolucion_mora']:
+            df_evolucion = pd.DataFrame(stats['evolucion_mora'])
+            fig_evolucion = px.line(df_evolucion, x='fecha', y='tasa_mora', markers=True,
+                                    title='Tasa de Mora (últimos 90 días)',
+                                    labels={'fecha': 'Fecha', 'tasa_mora': 'Tasa de Mora (%)'},
+                                    hover_data=['prestamos_mora', 'saldo_mora'])
+            st.plotly_chart(fig_evolucion, use_container_width=True)
+        else:
+            st.info("ℹ️ Aún no hay fotos diarias de la cartera (las genera el barrido nocturno de moras)")
+        
         # Gráfico de distribución de días en mora
         if stats['distribucion_dias_mora']:
             df_dias = pd.DataFrame(stats['distribucion_dias_mora'])
@@ -226,37 +237,146 @@ def reportes_mora():
 # FUNCIONES AUXILIARES - MORAS (TODAS IMPLEMENTADAS)
 # =============================================================================
 
+TIPO_ALERTA_MORA = 'MORA'
+# Motivo de la multa por mora: incluye el préstamo, porque la clave única
+# (id_sesion, id_socio, motivo) de multa admite una sola multa por motivo
+MOTIVO_MULTA_MORA = "Mora por préstamo #{} vencido"
+TIPO_ALERTA_SEGUIMIENTO = 'SEGUIMIENTO'
+LOTE_LIMPIEZA_ALERTAS = 500  # filas por DELETE al limpiar alertas resueltas
+
+# Alerta de un préstamo (el grupo se toma del socio). Con la clave única
+# (id_grupo, id_prestamo, tipo) una alerta repetida se actualiza y se reabre.
+# Sin grupo no se guarda: con id_grupo NULL la clave única no detecta la
+# repetida. Parámetros: tipo, titulo, descripcion, nivel, fecha_alerta,
+# fecha_recordatorio, id_prestamo.
+QUERY_GUARDAR_ALERTA_PRESTAMO = """
+    INSERT INTO alertas (
+        id_grupo, id_prestamo, tipo, titulo, descripcion, nivel,
+        fecha_alerta, fecha_recordatorio, resuelta
+    )
+    SELECT s.id_grupo, p.id_prestamo, %s, %s, %s, %s, %s, %s, 0
+    FROM prestamo p
+    JOIN socios s ON p.id_socio = s.id_socio
+    WHERE p.id_prestamo = %s AND s.id_grupo IS NOT NULL
+    ON DUPLICATE KEY UPDATE 
+        titulo = VALUES(titulo), 
+        descripcion = VALUES(descripcion), 
+        nivel = VALUES(nivel), 
+        fecha_alerta = VALUES(fecha_alerta), 
+        fecha_recordatorio = VALUES(fecha_recordatorio), 
+        resuelta = 0, 
+        fecha_resolucion = NULL
+"""
+
 def ejecutar_deteccion_moras(id_grupo):
     """Ejecutar detección automática de moras"""
+    try:
+        return detectar_moras_grupo(id_grupo)
+    except Exception as e:
+        st.error(f"❌ Error en la detección de moras: {e}")
+        return None
+
+def detectar_moras_grupo(id_grupo):
+    """Detección de moras de un grupo, sin interfaz (los errores se propagan).
+
+    Lee los préstamos vencidos una vez y, en una sola transacción, los marca
+    en mora con un UPDATE, inserta sus multas y sus alertas en lote. Solo se
+    multan los préstamos que siguen aprobados al bloquearlos (FOR UPDATE): si
+    el barrido u otra sesión los marcó antes, no se multan dos veces; tampoco
+    los que ya tienen su multa en la última sesión. Retorna el resumen (con
+    las multas realmente insertadas) o None si no hay préstamos vencidos.
+    """
     
-    # Obtener préstamos con pagos vencidos
-    prestamos_vencidos = obtener_prestamos_vencidos(id_grupo)
+    ahora = datetime.now()
+    fecha_vencimiento_multa = ahora + timedelta(days=15)  # 15 días para pagar multa
     
-    if not prestamos_vencidos:
-        return None
+    with transaccion():
+        # Préstamos con pagos vencidos (dentro de la transacción: un error aquí se propaga)
+        prestamos_vencidos = obtener_prestamos_vencidos(id_grupo)
+        
+        if not prestamos_vencidos:
+            return None
+        
+        # Bloquear los que siguen aprobados (una detección concurrente espera
+        # aquí y después ya no los ve en estado 2), junto con el monto de multa
+        # del grupo, la última sesión (a la que se asocian las multas) y si el
+        # préstamo ya tiene su multa en esa sesión (el INSERT IGNORE la omitiría)
+        prefijo_motivo, sufijo_motivo = MOTIVO_MULTA_MORA.split("{}")
+        bloqueados = ejecutar_consulta("""
+            SELECT 
+                p.id_prestamo,
+                (SELECT cantidad_multa FROM reglas_grupo WHERE id_grupo = %s) as cantidad_multa,
+                u.id_sesion,
+                EXISTS(
+                    SELECT 1 FROM multa m
+                    WHERE m.id_sesion = u.id_sesion AND m.id_socio = p.id_socio
+                    AND m.motivo = CONCAT(%s, p.id_prestamo, %s)
+                ) as multado
+            FROM prestamo p
+            LEFT JOIN (
+                SELECT id_sesion FROM sesion WHERE id_grupo = %s ORDER BY fecha_sesion DESC LIMIT 1
+            ) u ON 1 = 1
+            WHERE p.id_estado_prestamo = 2 AND p.id_prestamo IN (""" + ", ".join(["%s"] * len(prestamos_vencidos)) + """)
+            FOR UPDATE
+        """, (id_grupo, prefijo_motivo, sufijo_motivo, id_grupo) + tuple(prestamo['id_prestamo'] for prestamo in prestamos_vencidos))
+        
+        if not bloqueados:
+            return None
+        
+        ids_bloqueados = {fila['id_prestamo'] for fila in bloqueados}
+        ids_multados = {fila['id_prestamo'] for fila in bloqueados if fila['multado']}
+        prestamos_vencidos = [p for p in prestamos_vencidos if p['id_prestamo'] in ids_bloqueados]
+        monto_multa = bloqueados[0]['cantidad_multa'] or 0
+        id_sesion = bloqueados[0]['id_sesion']
+        
+        # Marcar préstamos como en mora
+        ids_prestamos = [prestamo['id_prestamo'] for prestamo in prestamos_vencidos]
+        ejecutar_comando(
+            "UPDATE prestamo SET id_estado_prestamo = 5 WHERE id_estado_prestamo = 2 AND id_prestamo IN ("
+            + ", ".join(["%s"] * len(ids_prestamos)) + ")",
+            tuple(ids_prestamos)
+        )
+        actualizar_cartera_prestamos(ids_prestamos)
+        
+        # Multas por mora (solo las que no existen: el resumen cuenta las insertadas)
+        multas_aplicadas = []
+        prestamos_a_multar = [p for p in prestamos_vencidos if p['id_prestamo'] not in ids_multados]
+        if monto_multa > 0 and id_sesion and prestamos_a_multar:
+            ejecutar_lote("""
+                INSERT IGNORE INTO multa (
+                    id_sesion, id_socio, monto_a_pagar, monto_pagado,
+                    fecha_pago_real, fecha_vencimiento, motivo
+                ) VALUES (%s, %s, %s, 0, NULL, %s, %s)
+            """, [
+                (
+                    id_sesion, prestamo['id_socio'], monto_multa, fecha_vencimiento_multa,
+                    MOTIVO_MULTA_MORA.format(prestamo['id_prestamo'])
+                )
+                for prestamo in prestamos_a_multar
+            ])
+            multas_aplicadas = [
+                {'socio': f"{prestamo['nombre']} {prestamo['apellido']}", 'monto_multa': monto_multa}
+                for prestamo in prestamos_a_multar
+            ]
+        
+        # Alertas (una por préstamo: si ya existe se actualiza)
+        ejecutar_lote(QUERY_GUARDAR_ALERTA_PRESTAMO, [
+            (
+                TIPO_ALERTA_MORA,
+                f"Préstamo en Mora - {prestamo['dias_vencido']} días",
+                f"Préstamo #{prestamo['id_prestamo']} lleva {prestamo['dias_vencido']} días en mora",
+                "ALTO" if prestamo['dias_vencido'] > 30 else "MEDIO",
+                ahora,
+                None,
+                prestamo['id_prestamo']
+            )
+            for prestamo in prestamos_vencidos
+        ])
     
-    prestamos_afectados = []
-    multas_aplicadas = []
-    
-    for prestamo in prestamos_vencidos:
-        # Marcar préstamo como en mora
-        if marcar_prestamo_mora(prestamo['id_prestamo']):
-            prestamos_afectados.append({
-                'socio': f"{prestamo['nombre']} {prestamo['apellido']}",
-                'dias_mora': prestamo['dias_vencido']
-            })
-        
-        # Aplicar multa por mora
-        monto_multa = calcular_multa_mora(prestamo['id_prestamo'], id_grupo)
-        if monto_multa > 0:
-            if aplicar_multa_mora(prestamo['id_prestamo'], monto_multa):
-                multas_aplicadas.append({
-                    'socio': f"{prestamo['nombre']} {prestamo['apellido']}",
-                    'monto_multa': monto_multa
-                })
-        
-        # Generar alerta
-        generar_alerta_mora(prestamo['id_prestamo'], prestamo['dias_vencido'])
+    prestamos_afectados = [
+        {'socio': f"{prestamo['nombre']} {prestamo['apellido']}", 'dias_mora': prestamo['dias_vencido']}
+        for prestamo in prestamos_vencidos
+    ]
     
     return {
         'prestamos_mora': len(prestamos_afectados),
@@ -266,10 +386,11 @@ def ejecutar_deteccion_moras(id_grupo):
     }
 
 def obtener_prestamos_vencidos(id_grupo):
-    """Obtener préstamos con pagos vencidos"""
+    """Obtener préstamos aprobados vencidos con saldo pendiente"""
     query = """
         SELECT 
             p.id_prestamo,
+            p.id_socio,
             s.nombre,
             s.apellido,
             p.fecha_vencimiento,
@@ -281,16 +402,24 @@ def obtener_prestamos_vencidos(id_grupo):
         WHERE s.id_grupo = %s
         AND p.id_estado_prestamo = 2  -- Aprobado (no en mora aún)
         AND p.fecha_vencimiento < CURDATE()
-        AND (p.monto_solicitado - COALESCE(SUM(dp.capital_pagado), 0)) > 0
-        GROUP BY p.id_prestamo
-        HAVING dias_vencido > 0
+        GROUP BY p.id_prestamo, p.id_socio, s.nombre, s.apellido, p.fecha_vencimiento, p.monto_solicitado
+        HAVING saldo_pendiente > 0 AND dias_vencido > 0
     """
     return ejecutar_consulta(query, (id_grupo,))
 
 def marcar_prestamo_mora(id_prestamo):
-    """Marcar préstamo como en mora"""
+    """Marcar préstamo como en mora (y su cartera, en la misma transacción)"""
     query = "UPDATE prestamo SET id_estado_prestamo = 5 WHERE id_prestamo = %s"
-    return ejecutar_comando(query, (id_prestamo,))
+    try:
+        with transaccion():
+            ejecutar_comando(query, (id_prestamo,))
+            actualizar_cartera_prestamos([id_prestamo])
+        return True
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error marcando el préstamo en mora: {e}")
+        return False
 
 def calcular_multa_mora(id_prestamo, id_grupo):
     """Calcular monto de multa por mora"""
@@ -307,64 +436,52 @@ def calcular_multa_mora(id_prestamo, id_grupo):
 
 def aplicar_multa_mora(id_prestamo, monto_multa):
     """Aplicar multa por mora a un préstamo"""
-    # Obtener información del préstamo
-    prestamo_info = ejecutar_consulta(
-        "SELECT id_socio FROM prestamo WHERE id_prestamo = %s",
-        (id_prestamo,)
-    )
+    # Socio del préstamo y última sesión de su grupo
+    prestamo_info = ejecutar_consulta("""
+        SELECT 
+            p.id_socio,
+            (SELECT se.id_sesion 
+             FROM sesion se 
+             WHERE se.id_grupo = so.id_grupo 
+             ORDER BY se.fecha_sesion DESC 
+             LIMIT 1) as id_sesion
+        FROM prestamo p
+        JOIN socios so ON p.id_socio = so.id_socio
+        WHERE p.id_prestamo = %s
+    """, (id_prestamo,))
     
-    if not prestamo_info:
+    if not prestamo_info or not prestamo_info[0]['id_sesion']:
         return False
     
     id_socio = prestamo_info[0]['id_socio']
+    id_sesion = prestamo_info[0]['id_sesion']
     
-    # Obtener última sesión
-    ultima_sesion = ejecutar_consulta("""
-        SELECT id_sesion 
-        FROM sesion 
-        WHERE id_grupo = (SELECT id_grupo FROM socios WHERE id_socio = %s)
-        ORDER BY fecha_sesion DESC 
-        LIMIT 1
-    """, (id_socio,))
-    
-    if not ultima_sesion:
-        return False
-    
-    id_sesion = ultima_sesion[0]['id_sesion']
-    
-    # Crear registro de multa
+    # Crear registro de multa (id_multa lo genera la base de datos); si el
+    # préstamo ya tiene su multa de mora en esa sesión no se inserta y retorna 0
     query = """
-        INSERT INTO multa (
+        INSERT IGNORE INTO multa (
             id_sesion, id_socio, monto_a_pagar, monto_pagado,
             fecha_pago_real, fecha_vencimiento, motivo
-        ) VALUES (%s, %s, %s, 0, NULL, %s, 'Mora por préstamo vencido')
+        ) VALUES (%s, %s, %s, 0, NULL, %s, %s)
     """
     
     fecha_vencimiento = datetime.now() + timedelta(days=15)  # 15 días para pagar multa
     
     return ejecutar_comando(
         query,
-        (id_sesion, id_socio, monto_multa, fecha_vencimiento)
+        (id_sesion, id_socio, monto_multa, fecha_vencimiento, MOTIVO_MULTA_MORA.format(id_prestamo)),
+        contar_filas=True
     )
 
 def generar_alerta_mora(id_prestamo, dias_vencido):
-    """Generar alerta por préstamo en mora"""
-    query = """
-        INSERT INTO alertas (
-            id_grupo, titulo, descripcion, nivel, fecha_alerta, resuelta
-        ) VALUES (
-            (SELECT id_grupo FROM socios WHERE id_socio = (SELECT id_socio FROM prestamo WHERE id_prestamo = %s)),
-            %s, %s, %s, %s, 0
-        )
-    """
-    
+    """Generar (o actualizar) la alerta de mora del préstamo"""
     titulo = f"Préstamo en Mora - {dias_vencido} días"
     descripcion = f"Préstamo #{id_prestamo} lleva {dias_vencido} días en mora"
     nivel = "ALTO" if dias_vencido > 30 else "MEDIO"
     
     return ejecutar_comando(
-        query,
-        (id_prestamo, titulo, descripcion, nivel, datetime.now())
+        QUERY_GUARDAR_ALERTA_PRESTAMO,
+        (TIPO_ALERTA_MORA, titulo, descripcion, nivel, datetime.now(), None, id_prestamo)
     )
 
 def obtener_prestamos_en_mora(id_grupo):
@@ -478,22 +595,13 @@ def guardar_registro_contacto(id_prestamo, fecha_contacto, metodo_contacto, resu
     )
 
 def generar_alerta_seguimiento(id_prestamo, fecha_seguimiento, motivo):
-    """Generar alerta para próximo seguimiento"""
-    query = """
-        INSERT INTO alertas (
-            id_grupo, titulo, descripcion, nivel, fecha_alerta, fecha_recordatorio, resuelta
-        ) VALUES (
-            (SELECT id_grupo FROM socios WHERE id_socio = (SELECT id_socio FROM prestamo WHERE id_prestamo = %s)),
-            %s, %s, 'MEDIO', %s, %s, 0
-        )
-    """
-    
+    """Generar (o actualizar) la alerta de próximo seguimiento del préstamo"""
     titulo = f"Seguimiento de Mora - Préstamo #{id_prestamo}"
     descripcion = f"Recordatorio para seguimiento: {motivo}"
     
     return ejecutar_comando(
-        query,
-        (id_prestamo, titulo, descripcion, datetime.now(), fecha_seguimiento)
+        QUERY_GUARDAR_ALERTA_PRESTAMO,
+        (TIPO_ALERTA_SEGUIMIENTO, titulo, descripcion, 'MEDIO', datetime.now(), fecha_seguimiento, id_prestamo)
     )
 
 def crear_plan_pago_mora(id_prestamo):
@@ -572,17 +680,10 @@ def crear_plan_pago_mora(id_prestamo):
         if st.form_submit_button("💾 Crear Plan de Pago"):
             if crear_plan_pago_bd(id_prestamo, nuevo_plazo_meses, nueva_cuota_mensual, fecha_inicio_plan, condiciones_plan, incluir_multas):
                 st.success("✅ Plan de pago creado exitosamente")
-                
-                # Actualizar estado del préstamo
-                ejecutar_comando(
-                    "UPDATE prestamo SET id_estado_prestamo = 6 WHERE id_prestamo = %s",
-                    (id_prestamo,)
-                )  # 6 = En plan de pago especial
-                
                 st.info("📝 El préstamo ha sido marcado como 'En plan de pago especial'")
 
 def crear_plan_pago_bd(id_prestamo, plazo_meses, cuota_mensual, fecha_inicio, condiciones, incluir_multas):
-    """Guardar plan de pago en base de datos"""
+    """Guardar plan de pago y pasar el préstamo a plan de pago especial (con su cartera) en una transacción"""
     
     query = """
         INSERT INTO planes_pago_mora (
@@ -591,10 +692,23 @@ def crear_plan_pago_bd(id_prestamo, plazo_meses, cuota_mensual, fecha_inicio, co
         ) VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
     
-    return ejecutar_comando(
-        query,
-        (id_prestamo, plazo_meses, cuota_mensual, fecha_inicio, condiciones, incluir_multas, datetime.now())
-    )
+    try:
+        with transaccion():
+            id_plan = ejecutar_comando(
+                query,
+                (id_prestamo, plazo_meses, cuota_mensual, fecha_inicio, condiciones, incluir_multas, datetime.now())
+            )
+            ejecutar_comando(
+                "UPDATE prestamo SET id_estado_prestamo = 6 WHERE id_prestamo = %s",
+                (id_prestamo,)
+            )  # 6 = En plan de pago especial
+            actualizar_cartera_prestamos([id_prestamo])
+        return id_plan
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error creando el plan de pago: {e}")
+        return None
 
 def obtener_alertas_activas(id_grupo):
     """Obtener alertas activas del grupo"""
@@ -617,123 +731,143 @@ def resolver_alerta(id_alerta):
     query = "UPDATE alertas SET resuelta = 1, fecha_resolucion = %s WHERE id_alerta = %s"
     return ejecutar_comando(query, (datetime.now(), id_alerta))
 
-def limpiar_alertas_resueltas():
-    """Eliminar alertas resueltas antiguas"""
-    query = "DELETE FROM alertas WHERE resuelta = 1 AND fecha_alerta < %s"
+def limpiar_alertas_resueltas(id_grupo=None, lote=LOTE_LIMPIEZA_ALERTAS):
+    """Eliminar alertas resueltas antiguas (de un grupo o de todos) en lotes acotados.
+
+    Cada lote es un DELETE por clave primaria con su propio commit, así la
+    tabla nunca queda bloqueada por un borrado largo. Si un lote falla se
+    detiene (el error ya se mostró). Retorna las eliminadas.
+    """
     fecha_limite = datetime.now() - timedelta(days=30)  # 30 días
-    return ejecutar_comando(query, (fecha_limite,))
+    filtro, params = "resuelta = 1 AND fecha_alerta < %s", (fecha_limite,)
+    if id_grupo is not None:
+        filtro, params = "id_grupo = %s AND " + filtro, (id_grupo,) + params
+    
+    eliminadas = 0
+    while True:
+        ids_alertas = [
+            fila['id_alerta'] for fila in ejecutar_consulta(
+                f"SELECT id_alerta FROM alertas WHERE {filtro} ORDER BY id_alerta LIMIT %s",
+                params + (lote,)
+            ) or []
+        ]
+        if not ids_alertas:
+            break
+        borradas = ejecutar_comando(
+            "DELETE FROM alertas WHERE id_alerta IN (" + ", ".join(["%s"] * len(ids_alertas)) + ")",
+            tuple(ids_alertas),
+            contar_filas=True
+        )
+        if borradas is None:
+            break
+        eliminadas += borradas
+        if len(ids_alertas) < lote:
+            break
+    return eliminadas
 
-def obtener_estadisticas_mora(id_grupo):
-    """Obtener estadísticas de mora del grupo - FUNCIÓN MEJORADA"""
-    
-    # Obtener datos básicos
-    total_prestamos = ejecutar_consulta("""
-        SELECT COUNT(*) as total
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo IN (2, 5)
-    """, (id_grupo,))[0]['total']
-    
-    prestamos_mora = ejecutar_consulta("""
-        SELECT COUNT(*) as total
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo = 5
-    """, (id_grupo,))[0]['total']
-    
-    # Calcular tasa de mora
-    tasa_mora = (prestamos_mora / total_prestamos * 100) if total_prestamos > 0 else 0
-    
-    # Monto total en mora
-    monto_mora = ejecutar_consulta("""
-        SELECT COALESCE(SUM(p.monto_solicitado - COALESCE(SUM(dp.capital_pagado), 0)), 0) as total
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        LEFT JOIN `detalles_pagos` dp ON p.id_prestamo = dp.id_prestamo
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo = 5
-        GROUP BY p.id_prestamo
-    """, (id_grupo,))
-    
-    monto_total_mora = sum(item['total'] for item in monto_mora) if monto_mora else 0
-    
-    # Socios en mora
-    socios_en_mora = ejecutar_consulta("""
-        SELECT COUNT(DISTINCT p.id_socio) as total
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo = 5
-    """, (id_grupo,))[0]['total']
+RANGOS_DIAS_MORA = [(15, '1-15 días'), (30, '16-30 días'), (60, '31-60 días')]
+ETIQUETAS_ESTADO_MORA = {2: 'Al día', 5: 'En mora', 6: 'Plan de pago'}
+
+COLUMNAS_EVOLUCION_MORA = [
+    'fecha', 'prestamos_activos', 'prestamos_mora', 'saldo_activo', 'saldo_mora',
+    'mora_1_15', 'mora_16_30', 'mora_31_60', 'mora_mas_60'
+]
+COLUMNAS_CARTERA_MORA = [
+    'id_prestamo', 'id_socio', 'nombre', 'apellido', 'id_estado_prestamo', 'dias_mora', 'saldo_pendiente'
+]
+
+def obtener_estadisticas_mora(id_grupo, dias_evolucion=90):
+    """Obtener estadísticas de mora del grupo.
+
+    Una sola consulta trae las fotos diarias de cartera_mora_diaria del grupo
+    (para la evolución y la tendencia) y una fila por préstamo activo, en mora
+    o en plan de pago desde cartera_prestamo; las estadísticas se arman en memoria.
+    """
     
-    # Socios con mayor mora
-    socios_mayor_mora = ejecutar_consulta("""
+    # Las fotos van primero: en SQLite el tipo DATE de fecha se toma del primer SELECT
+    filas = ejecutar_consulta("""
+        SELECT 
+            'evolucion' as fila,
+            d.fecha, d.prestamos_activos, d.prestamos_mora, d.saldo_activo, d.saldo_mora,
+            d.mora_1_15, d.mora_16_30, d.mora_31_60, d.mora_mas_60,
+            NULL as id_prestamo, NULL as id_socio, NULL as nombre, NULL as apellido,
+            NULL as id_estado_prestamo, NULL as dias_mora, NULL as saldo_pendiente
+        FROM cartera_mora_diaria d
+        WHERE d.id_grupo = %s AND d.fecha >= %s
+        UNION ALL
         SELECT 
+            'prestamo',
+            NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL,
+            cp.id_prestamo,
+            cp.id_socio,
             s.nombre,
             s.apellido,
-            MAX(DATEDIFF(CURDATE(), p.fecha_vencimiento)) as dias_mora,
-            (p.monto_solicitado - COALESCE(SUM(dp.capital_pagado), 0)) as monto_mora
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        LEFT JOIN `detalles_pagos` dp ON p.id_prestamo = dp.id_prestamo
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo = 5
-        GROUP BY p.id_prestamo, s.id_socio
-        ORDER BY dias_mora DESC
-        LIMIT 5
-    """, (id_grupo,))
+            cp.id_estado_prestamo,
+            DATEDIFF(CURDATE(), cp.fecha_vencimiento),
+            cp.saldo_pendiente
+        FROM cartera_prestamo cp
+        JOIN socios s ON cp.id_socio = s.id_socio
+        WHERE cp.id_grupo = %s AND cp.id_estado_prestamo IN (2, 5, 6)
+        ORDER BY fila, fecha
+    """, (id_grupo, datetime.now().date() - timedelta(days=dias_evolucion), id_grupo)) or []
+    
+    evolucion_mora = _calcular_tasas_evolucion([
+        {columna: fila[columna] for columna in COLUMNAS_EVOLUCION_MORA}
+        for fila in filas if fila['fila'] == 'evolucion'
+    ])
+    prestamos = [
+        {columna: fila[columna] for columna in COLUMNAS_CARTERA_MORA}
+        for fila in filas if fila['fila'] == 'prestamo'
+    ]
+    
+    en_mora = [p for p in prestamos if p['id_estado_prestamo'] == 5]
+    total_prestamos = sum(1 for p in prestamos if p['id_estado_prestamo'] in (2, 5))
     
-    # Distribución de días en mora
-    distribucion_dias_mora = ejecutar_consulta("""
-        SELECT 
-            CASE 
-                WHEN dias_mora <= 15 THEN '1-15 días'
-                WHEN dias_mora <= 30 THEN '16-30 días'
-                WHEN dias_mora <= 60 THEN '31-60 días'
-                ELSE 'Más de 60 días'
-            END as rango,
-            COUNT(*) as cantidad
-        FROM (
-            SELECT DATEDIFF(CURDATE(), p.fecha_vencimiento) as dias_mora
-            FROM prestamo p
-            JOIN socios s ON p.id_socio = s.id_socio
-            WHERE s.id_grupo = %s AND p.id_estado_prestamo = 5
-        ) as moras
-        GROUP BY rango
-        ORDER BY 
-            CASE rango
-                WHEN '1-15 días' THEN 1
-                WHEN '16-30 días' THEN 2
-                WHEN '31-60 días' THEN 3
-                ELSE 4
-            END
-    """, (id_grupo,))
+    # Calcular tasa de mora
+    tasa_mora = (len(en_mora) / total_prestamos * 100) if total_prestamos > 0 else 0
+    
+    monto_total_mora = sum(p['saldo_pendiente'] for p in en_mora)
+    socios_en_mora = len({p['id_socio'] for p in en_mora})
+    
+    # Préstamos con mayor mora
+    socios_mayor_mora = [
+        {'nombre': p['nombre'], 'apellido': p['apellido'], 'dias_mora': p['dias_mora'], 'monto_mora': p['saldo_pendiente']}
+        for p in sorted(en_mora, key=lambda p: p['dias_mora'] or 0, reverse=True)[:5]
+    ]
+    
+    # Distribución de días en mora (solo rangos con préstamos, en orden)
+    conteo_rangos = {}
+    for p in en_mora:
+        rango = next(
+            (etiqueta for limite, etiqueta in RANGOS_DIAS_MORA if p['dias_mora'] is not None and p['dias_mora'] <= limite),
+            'Más de 60 días'
+        )
+        conteo_rangos[rango] = conteo_rangos.get(rango, 0) + 1
+    distribucion_dias_mora = [
+        {'rango': rango, 'cantidad': conteo_rangos[rango]}
+        for rango in [etiqueta for _, etiqueta in RANGOS_DIAS_MORA] + ['Más de 60 días']
+        if rango in conteo_rangos
+    ]
     
     # Estado de préstamos
-    estado_prestamos = ejecutar_consulta("""
-        SELECT 
-            CASE 
-                WHEN p.id_estado_prestamo = 2 THEN 'Al día'
-                WHEN p.id_estado_prestamo = 5 THEN 'En mora'
-                WHEN p.id_estado_prestamo = 6 THEN 'Plan de pago'
-                ELSE 'Otro'
-            END as estado,
-            COUNT(*) as cantidad
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo IN (2, 5, 6)
-        GROUP BY estado
-    """, (id_grupo,))
-    
-    # Tendencia (simplificada)
-    tendencia = "ESTABLE"
-    if tasa_mora > 10:
-        tendencia = "ALTA"
-    elif tasa_mora < 5:
-        tendencia = "BAJA"
+    conteo_estados = {}
+    for p in prestamos:
+        conteo_estados[p['id_estado_prestamo']] = conteo_estados.get(p['id_estado_prestamo'], 0) + 1
+    estado_prestamos = [
+        {'estado': etiqueta, 'cantidad': conteo_estados[id_estado]}
+        for id_estado, etiqueta in ETIQUETAS_ESTADO_MORA.items()
+        if id_estado in conteo_estados
+    ]
+    
+    # Tendencia respecto de las fotos diarias anteriores
+    tendencia = calcular_tendencia_mora(tasa_mora, evolucion_mora)
     
     return {
         'tasa_mora': tasa_mora,
         'monto_total_mora': monto_total_mora,
         'socios_en_mora': socios_en_mora,
         'tendencia_mora': tendencia,
+        'evolucion_mora': evolucion_mora,
         'socios_mayor_mora': socios_mayor_mora,
         'distribucion_dias_mora': distribucion_dias_mora,
         'estado_prestamos': estado_prestamos
@@ -809,4 +943,160 @@ def exportar_reporte_mora(stats, id_grupo):
         data=contenido,
         file_name=f"reporte_moras_{nombre_grupo}_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
         mime="text/plain"
-    )
\ No newline at end of file
+    )
+# =============================================================================
+# CARTERA EN RIESGO (TABLAS cartera_prestamo Y cartera_mora_diaria)
+# =============================================================================
+# cartera_prestamo guarda, por préstamo, su estado, vencimiento y saldo
+# pendiente. Toda escritura que cambie el estado de un préstamo o registre un
+# pago debe llamar a actualizar_cartera_prestamos() con los IDs afectados; así
+# la foto diaria (cartera_mora_diaria) se arma sin recorrer detalles_pagos.
+
+VARIACION_TENDENCIA_MORA = 1.0  # puntos de tasa de mora para considerar un cambio
+DIAS_REFERENCIA_TENDENCIA = 30  # la tendencia compara con la foto de hace ~30 días
+
+QUERY_ACTUALIZAR_CARTERA_PRESTAMOS = """
+    INSERT INTO cartera_prestamo (
+        id_prestamo, id_socio, id_grupo, id_estado_prestamo,
+        fecha_vencimiento, saldo_pendiente, fecha_actualizacion
+    )
+    SELECT 
+        p.id_prestamo, p.id_socio, s.id_grupo, p.id_estado_prestamo, p.fecha_vencimiento,
+        p.monto_solicitado - COALESCE((
+            SELECT SUM(dp.capital_pagado) FROM detalles_pagos dp WHERE dp.id_prestamo = p.id_prestamo
+        ), 0),
+        NOW()
+    FROM prestamo p
+    JOIN socios s ON p.id_socio = s.id_socio
+    WHERE {filtro}
+    ON DUPLICATE KEY UPDATE 
+        id_socio = VALUES(id_socio), 
+        id_grupo = VALUES(id_grupo), 
+        id_estado_prestamo = VALUES(id_estado_prestamo), 
+        fecha_vencimiento = VALUES(fecha_vencimiento), 
+        saldo_pendiente = VALUES(saldo_pendiente), 
+        fecha_actualizacion = VALUES(fecha_actualizacion)
+"""
+
+QUERY_REFRESCAR_CARTERA_DIARIA = """
+    INSERT INTO cartera_mora_diaria (
+        fecha, id_grupo, id_distrito, prestamos_activos, prestamos_mora,
+        saldo_activo, saldo_mora, mora_1_15, mora_16_30, mora_31_60, mora_mas_60,
+        fecha_actualizacion
+    )
+    SELECT 
+        %s, g.id_grupo, g.id_distrito,
+        COUNT(cp.id_prestamo),
+        COALESCE(SUM(CASE WHEN cp.id_estado_prestamo = 5 THEN 1 ELSE 0 END), 0),
+        COALESCE(SUM(cp.saldo_pendiente), 0),
+        COALESCE(SUM(CASE WHEN cp.id_estado_prestamo = 5 THEN cp.saldo_pendiente ELSE 0 END), 0),
+        COALESCE(SUM(CASE WHEN cp.id_estado_prestamo = 5 AND DATEDIFF(%s, cp.fecha_vencimiento) <= 15 THEN 1 ELSE 0 END), 0),
+        COALESCE(SUM(CASE WHEN cp.id_estado_prestamo = 5 AND DATEDIFF(%s, cp.fecha_vencimiento) BETWEEN 16 AND 30 THEN 1 ELSE 0 END), 0),
+        COALESCE(SUM(CASE WHEN cp.id_estado_prestamo = 5 AND DATEDIFF(%s, cp.fecha_vencimiento) BETWEEN 31 AND 60 THEN 1 ELSE 0 END), 0),
+        COALESCE(SUM(CASE WHEN cp.id_estado_prestamo = 5 AND DATEDIFF(%s, cp.fecha_vencimiento) > 60 THEN 1 ELSE 0 END), 0),
+        NOW()
+    FROM grupos g
+    LEFT JOIN cartera_prestamo cp ON cp.id_grupo = g.id_grupo AND cp.id_estado_prestamo IN (2, 5)
+    WHERE {filtro}
+    GROUP BY g.id_grupo, g.id_distrito
+    ON DUPLICATE KEY UPDATE 
+        id_distrito = VALUES(id_distrito), 
+        prestamos_activos = VALUES(prestamos_activos), 
+        prestamos_mora = VALUES(prestamos_mora), 
+        saldo_activo = VALUES(saldo_activo), 
+        saldo_mora = VALUES(saldo_mora), 
+        mora_1_15 = VALUES(mora_1_15), 
+        mora_16_30 = VALUES(mora_16_30), 
+        mora_31_60 = VALUES(mora_31_60), 
+        mora_mas_60 = VALUES(mora_mas_60), 
+        fecha_actualizacion = VALUES(fecha_actualizacion)
+"""
+
+def actualizar_cartera_prestamos(ids_prestamos=None, id_grupo=None):
+    """Recalcular cartera_prestamo de los préstamos indicados (o de todo un grupo)"""
+    if ids_prestamos:
+        filtro = "p.id_prestamo IN (" + ", ".join(["%s"] * len(ids_prestamos)) + ")"
+        params = tuple(ids_prestamos)
+    elif id_grupo is not None:
+        filtro, params = "s.id_grupo = %s", (id_grupo,)
+    else:
+        filtro, params = "1 = 1", ()
+    
+    ejecutar_comando(QUERY_ACTUALIZAR_CARTERA_PRESTAMOS.format(filtro=filtro), params)
+
+def refrescar_cartera_diaria(fecha=None, id_grupo=None, id_distrito=None):
+    """Escribir (o reescribir) la foto de cartera en riesgo del día para los grupos activos"""
+    fecha = fecha or datetime.now().date()
+    filtro, params = "g.estado = 'ACTIVO'", ()
+    if id_grupo is not None:
+        filtro, params = "g.id_grupo = %s", (id_grupo,)
+    elif id_distrito is not None:
+        filtro, params = "g.estado = 'ACTIVO' AND g.id_distrito = %s", (id_distrito,)
+    
+    ejecutar_comando(
+        QUERY_REFRESCAR_CARTERA_DIARIA.format(filtro=filtro),
+        (fecha, fecha, fecha, fecha, fecha) + params
+    )
+
+def reconstruir_cartera(id_grupo=None):
+    """Reconstruir cartera_prestamo desde prestamo y detalles_pagos (todo o un grupo)"""
+    with transaccion():
+        if id_grupo is None:
+            ejecutar_comando("DELETE FROM cartera_prestamo")
+        else:
+            ejecutar_comando("DELETE FROM cartera_prestamo WHERE id_grupo = %s", (id_grupo,))
+        actualizar_cartera_prestamos(id_grupo=id_grupo)
+    
+    if id_grupo is None:
+        return ejecutar_consulta("SELECT COUNT(*) as total FROM cartera_prestamo")[0]['total']
+    return ejecutar_consulta("SELECT COUNT(*) as total FROM cartera_prestamo WHERE id_grupo = %s", (id_grupo,))[0]['total']
+
+def obtener_evolucion_mora(id_grupo=None, id_distrito=None, dias=90):
+    """Serie diaria de la cartera en riesgo de un grupo, o de un distrito (suma de sus grupos)"""
+    if id_grupo is not None:
+        filtro, valor = "id_grupo = %s", id_grupo
+    else:
+        filtro, valor = "id_distrito = %s", id_distrito
+    
+    evolucion = ejecutar_consulta(f"""
+        SELECT 
+            fecha,
+            SUM(prestamos_activos) as prestamos_activos,
+            SUM(prestamos_mora) as prestamos_mora,
+            SUM(saldo_activo) as saldo_activo,
+            SUM(saldo_mora) as saldo_mora,
+            SUM(mora_1_15) as mora_1_15,
+            SUM(mora_16_30) as mora_16_30,
+            SUM(mora_31_60) as mora_31_60,
+            SUM(mora_mas_60) as mora_mas_60
+        FROM cartera_mora_diaria
+        WHERE {filtro} AND fecha >= %s
+        GROUP BY fecha
+        ORDER BY fecha
+    """, (valor, datetime.now().date() - timedelta(days=dias))) or []
+    
+    return _calcular_tasas_evolucion(evolucion)
+
+def _calcular_tasas_evolucion(evolucion):
+    """Agregar la tasa de mora (% de préstamos activos en mora) a cada foto diaria"""
+    for dia in evolucion:
+        activos = dia['prestamos_activos'] or 0
+        dia['tasa_mora'] = (dia['prestamos_mora'] / activos * 100) if activos > 0 else 0
+    return evolucion
+
+def calcular_tendencia_mora(tasa_actual, evolucion):
+    """Comparar la tasa actual con la foto de hace DIAS_REFERENCIA_TENDENCIA días (o la más antigua)"""
+    hoy = datetime.now().date()
+    anteriores = [dia for dia in evolucion if dia['fecha'] < hoy]
+    if not anteriores:
+        return "SIN HISTORIAL"
+    
+    limite = hoy - timedelta(days=DIAS_REFERENCIA_TENDENCIA)
+    referencia = next((dia for dia in reversed(anteriores) if dia['fecha'] <= limite), anteriores[0])
+    
+    variacion = tasa_actual - referencia['tasa_mora']
+    if variacion >= VARIACION_TENDENCIA_MORA:
+        return "EN AUMENTO"
+    if variacion <= -VARIACION_TENDENCIA_MORA:
+        return "EN DESCENSO"
+    return "ESTABLE"
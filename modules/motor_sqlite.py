@@ -0,0 +1,279 @@
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector import Error
+
+# =============================================================================
+# MOTOR SQLITE (BASE LOCAL PARA PRUEBAS Y BENCHMARKS)
+# =============================================================================
+# Expone conexiones y cursores con la misma interfaz que usa modules/database.py
+# de mysql.connector (cursor(dictionary=True), lastrowid, rowcount, ping...),
+# traduce el SQL de MySQL que usa la app y convierte los errores a
+# mysql.connector.Error para que el manejo de errores existente no cambie.
+#
+# Diferencias conocidas con MySQL: la división entre enteros es entera y las
+# expresiones calculadas sobre fechas (MAX(fecha), etc.) se devuelven como texto.
+
+MEMORIA = ":memory:"
+_URI_MEMORIA = "file:sgi_memoria?mode=memory&cache=shared"
+
+_esquemas_creados = set()
+_anclas_memoria = {}
+_lock = threading.Lock()
+
+# -----------------------------------------------------------------------------
+# Tipos: fechas como texto ISO y DECIMAL como REAL
+# -----------------------------------------------------------------------------
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(" ", timespec="seconds"))
+sqlite3.register_adapter(time, lambda valor: valor.isoformat(timespec="seconds"))
+
+def _convertir_fecha(valor):
+    return date.fromisoformat(valor.decode()[:10])
+
+def _convertir_fecha_hora(valor):
+    texto = valor.decode()
+    if len(texto) == 10:
+        return datetime.fromisoformat(texto + " 00:00:00")
+    return datetime.fromisoformat(texto)
+
+sqlite3.register_converter("DATE", _convertir_fecha)
+sqlite3.register_converter("DATETIME", _convertir_fecha_hora)
+
+# -----------------------------------------------------------------------------
+# Funciones de MySQL usadas por la app
+# -----------------------------------------------------------------------------
+
+def _curdate():
+    return date.today().isoformat()
+
+def _now():
+    return datetime.now().isoformat(" ", timespec="seconds")
+
+def _a_fecha(valor):
+    if valor is None:
+        return None
+    return date.fromisoformat(str(valor)[:10])
+
+def _datediff(fin, inicio):
+    fin, inicio = _a_fecha(fin), _a_fecha(inicio)
+    if fin is None or inicio is None:
+        return None
+    return (fin - inicio).days
+
+def _concat(*valores):
+    # En MySQL CONCAT retorna NULL si algún argumento es NULL
+    if any(valor is None for valor in valores):
+        return None
+    return "".join(str(valor) for valor in valores)
+
+def _greatest(*valores):
+    return None if any(valor is None for valor in valores) else max(valores)
+
+def _least(*valores):
+    return None if any(valor is None for valor in valores) else min(valores)
+
+def _registrar_funciones(conn):
+    conn.create_function("CURDATE", 0, _curdate)
+    conn.create_function("NOW", 0, _now)
+    conn.create_function("DATEDIFF", 2, _datediff, deterministic=True)
+    conn.create_function("CONCAT", -1, _concat, deterministic=True)
+    conn.create_function("GREATEST", -1, _greatest, deterministic=True)
+    conn.create_function("LEAST", -1, _least, deterministic=True)
+
+# -----------------------------------------------------------------------------
+# Traducción de SQL
+# -----------------------------------------------------------------------------
+
+_RE_DATE_ADD = re.compile(
+    r"DATE_(ADD|SUB)\(\s*([^,]+?)\s*,\s*INTERVAL\s+(%s|\?|-?\d+)\s+(DAY|MONTH|YEAR)\s*\)",
+    re.IGNORECASE
+)
+_RE_MAS_INTERVALO = re.compile(
+    r"([\w.]+(?:\(\))?)\s*([+-])\s*INTERVAL\s+(-?\d+)\s+(DAY|MONTH|YEAR)",
+    re.IGNORECASE
+)
+_RE_VALUES_COLUMNA = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+_RE_INSERT_SIMPLE = re.compile(r"^\s*INSERT\s+INTO\b", re.IGNORECASE)
+_RE_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\b", re.IGNORECASE)
+
+def es_insert_simple(query):
+    """INSERT sin IGNORE ni ON DUPLICATE KEY: cada fila genera exactamente un ID nuevo"""
+    return bool(_RE_INSERT_SIMPLE.match(query)) and not _RE_ON_DUPLICATE.search(query)
+
+def _sustituir_date_add(coincidencia):
+    funcion, expresion, cantidad, unidad = coincidencia.groups()
+    signo = "-" if funcion.upper() == "SUB" else "+"
+    if cantidad in ("%s", "?"):
+        return f"date({expresion}, '{signo}' || ? || ' {unidad.lower()}')"
+    return f"date({expresion}, '{signo}{cantidad} {unidad.lower()}')"
+
+def _sustituir_mas_intervalo(coincidencia):
+    expresion, signo, cantidad, unidad = coincidencia.groups()
+    return f"date({expresion}, '{signo}{cantidad} {unidad.lower()}')"
+
+@lru_cache(maxsize=512)
+def traducir_sql(query):
+    """Traducir una sentencia del dialecto MySQL usado por la app a SQLite"""
+    sql = _RE_DATE_ADD.sub(_sustituir_date_add, query)
+    sql = _RE_MAS_INTERVALO.sub(_sustituir_mas_intervalo, sql)
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", "ON CONFLICT DO UPDATE SET", sql, flags=re.IGNORECASE)
+    sql = _RE_VALUES_COLUMNA.sub(r"excluded.\1", sql)
+    # SQLite serializa las escrituras con el bloqueo de la base: sin bloqueo por fila
+    sql = re.sub(r"\bFOR\s+UPDATE\s*$", "", sql.rstrip(), flags=re.IGNORECASE)
+    return sql.replace("%s", "?")
+
+def traducir_ddl(ddl):
+    """Traducir el DDL de config/esquema.sql a sentencias SQLite idempotentes"""
+    sin_comentarios = "\n".join(
+        linea for linea in ddl.splitlines() if not linea.strip().startswith("--")
+    )
+    sentencias = []
+    for sentencia in sin_comentarios.split(";"):
+        sql = sentencia.strip()
+        if not sql:
+            continue
+        sql = re.sub(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", sql, flags=re.IGNORECASE)
+        sql = re.sub(r"\)\s*ENGINE\s*=.*$", ")", sql, flags=re.IGNORECASE | re.DOTALL)
+        sql = re.sub(r"^CREATE\s+TABLE\s+(?!IF)", "CREATE TABLE IF NOT EXISTS ", sql, flags=re.IGNORECASE)
+        sql = re.sub(r"^CREATE\s+(UNIQUE\s+)?INDEX\s+(?!IF)", r"CREATE \1INDEX IF NOT EXISTS ", sql, flags=re.IGNORECASE)
+        sentencias.append(sql)
+    return sentencias
+
+# -----------------------------------------------------------------------------
+# Conexión y cursor con la interfaz de mysql.connector
+# -----------------------------------------------------------------------------
+
+class CursorSQLite:
+    """Cursor SQLite con la interfaz de mysql.connector usada por la app"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._primer_id = None
+
+    @property
+    def lastrowid(self):
+        # Tras executemany se reporta el primer ID del lote, como mysql.connector
+        return self._primer_id if self._primer_id is not None else self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=()):
+        self._primer_id = None
+        try:
+            self._cursor.execute(traducir_sql(query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise Error(msg=str(e)) from e
+
+    def executemany(self, query, filas):
+        self._primer_id = None
+        try:
+            filas = [tuple(fila) for fila in filas]
+            self._cursor.executemany(traducir_sql(query), filas)
+            # Solo un INSERT simple garantiza un ID consecutivo por fila (escritor único)
+            if es_insert_simple(query) and self._cursor.rowcount == len(filas) > 0:
+                ultimo = self._cursor.connection.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self._primer_id = ultimo - self._cursor.rowcount + 1
+        except sqlite3.Error as e:
+            raise Error(msg=str(e)) from e
+
+    def _filas(self, filas):
+        if not self._dictionary:
+            return filas
+        columnas = [descripcion[0] for descripcion in self._cursor.description]
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+    def fetchall(self):
+        return self._filas(self._cursor.fetchall())
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        return self._filas([fila])[0] if fila is not None else None
+
+    def close(self):
+        self._cursor.close()
+
+class ConexionSQLite:
+    """Conexión SQLite con la interfaz de mysql.connector usada por la app"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False):
+        return CursorSQLite(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def ping(self, reconnect=True, attempts=1, delay=0):
+        pass
+
+    def reconnect(self, attempts=1, delay=0):
+        pass
+
+    def is_connected(self):
+        return True
+
+def _abrir(ruta):
+    """Abrir una conexión sqlite3 configurada para la app"""
+    en_memoria = ruta == MEMORIA
+    conn = sqlite3.connect(
+        _URI_MEMORIA if en_memoria else ruta,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False,
+        timeout=10,
+        uri=en_memoria
+    )
+    _registrar_funciones(conn)
+    if not en_memoria:
+        conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def conectar_sqlite(ruta=MEMORIA, ruta_esquema=None):
+    """Abrir una conexión a la base SQLite creando el esquema la primera vez.
+
+    Con ruta ":memory:" todas las conexiones del proceso comparten la misma base.
+    """
+    try:
+        with _lock:
+            if ruta == MEMORIA and ruta not in _anclas_memoria:
+                # Mantener una conexión abierta para que la base en memoria no se descarte
+                _anclas_memoria[ruta] = _abrir(ruta)
+
+            conn = _abrir(ruta)
+            if ruta not in _esquemas_creados and ruta_esquema:
+                crear_esquema_sqlite(conn, ruta_esquema)
+                _esquemas_creados.add(ruta)
+    except sqlite3.Error as e:
+        raise Error(msg=str(e)) from e
+
+    return ConexionSQLite(conn)
+
+def crear_esquema_sqlite(conn, ruta_esquema):
+    """Ejecutar config/esquema.sql (traducido) sobre una conexión sqlite3 si la base está vacía.
+
+    Una base existente se pone al día con las migraciones (modules/migraciones.py),
+    igual que en MySQL.
+    """
+    if conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]:
+        return
+    with open(ruta_esquema, encoding="utf-8") as archivo:
+        for sentencia in traducir_ddl(archivo.read()):
+            conn.execute(sentencia)
+    conn.commit()
@@ -1,5 +1,6 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, en_transaccion, transaccion
+from modules.moras import actualizar_cartera_prestamos
 from datetime import datetime
 import pandas as pd
 
@@ -310,16 +311,22 @@ def procesar_pago_cuota(id_pago, info_prestamo):
         WHERE id_pago = %s
     """
     
-    if ejecutar_comando(query, (datetime.now(), id_pago)):
-        st.success("✅ Cuota pagada exitosamente")
-        
-        # Registrar movimiento en caja
-        registrar_movimiento_caja_pago(info_prestamo['id_prestamo'])
-        
-        # Verificar si el préstamo está completamente pagado
-        verificar_prestamo_pagado(info_prestamo['id_prestamo'])
-        
-        st.rerun()
+    try:
+        # Pago, movimiento de caja y cambio de estado en un solo commit
+        with transaccion():
+            ejecutar_comando(query, (datetime.now(), id_pago))
+            
+            # Registrar movimiento en caja
+            registrar_movimiento_caja_pago(info_prestamo['id_prestamo'])
+            
+            # Verificar si el préstamo está completamente pagado
+            verificar_prestamo_pagado(info_prestamo['id_prestamo'])
+    except Exception as e:
+        st.error(f"❌ Error procesando el pago: {e}")
+        return
+    
+    st.success("✅ Cuota pagada exitosamente")
+    st.rerun()
 
 def registrar_pago_manual(id_prestamo, monto_pago, tipo_pago, fecha_pago, observaciones):
     """Registrar pago manual (parcial o adelantado)"""
@@ -348,20 +355,29 @@ def registrar_pago_manual(id_prestamo, monto_pago, tipo_pago, fecha_pago, observ
         )
     """
     
-    return ejecutar_comando(
-        query,
-        (
-            id_prestamo,
-            fecha_pago,
-            capital_pagado,
-            interes_mensual,
-            id_prestamo,
-            interes_mensual,
-            fecha_pago,
-            monto_pago,
-            f"{tipo_pago} - {observaciones}"
-        )
-    )
+    try:
+        with transaccion():
+            id_pago = ejecutar_comando(
+                query,
+                (
+                    id_prestamo,
+                    fecha_pago,
+                    capital_pagado,
+                    interes_mensual,
+                    id_prestamo,
+                    interes_mensual,
+                    fecha_pago,
+                    monto_pago,
+                    f"{tipo_pago} - {observaciones}"
+                )
+            )
+            actualizar_cartera_prestamos([id_prestamo])
+        return id_pago
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error registrando el pago: {e}")
+        return None
 
 def registrar_movimiento_caja_pago(id_prestamo):
     """Registrar movimiento en caja por pago de préstamo"""
@@ -407,6 +423,9 @@ def verificar_prestamo_pagado(id_prestamo):
             "UPDATE prestamo SET id_estado_prestamo = 4 WHERE id_prestamo = %s",
             (id_prestamo,)
         )
+    
+    # Saldo (y estado, si quedó pagado) en la cartera
+    actualizar_cartera_prestamos([id_prestamo])
 
 def obtener_historial_pagos_grupo(id_grupo, fecha_inicio, fecha_fin):
     """Obtener historial de pagos del grupo"""
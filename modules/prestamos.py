@@ -1,6 +1,8 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, ejecutar_consulta_cacheada, ejecutar_lote, en_transaccion, transaccion
 from datetime import datetime, timedelta
+from modules.caja import obtener_saldo_grupo
+from modules.moras import actualizar_cartera_prestamos
 from utils.calculos_financieros import calcular_cuotas_prestamo, validar_capacidad_pago
 import pandas as pd
 from decimal import Decimal
@@ -390,13 +392,13 @@ def obtener_info_socio(id_socio):
 def obtener_tasa_interes_grupo(id_grupo):
     """Obtener tasa de interés del grupo"""
     query = "SELECT interes FROM reglas_grupo WHERE id_grupo = %s"
-    resultado = ejecutar_consulta(query, (id_grupo,))
+    resultado = ejecutar_consulta_cacheada(query, (id_grupo,))
     return resultado[0]['interes'] / 100 if resultado else 0.05  # 5% por defecto
 
 def obtener_limite_prestamo_grupo(id_grupo):
     """Obtener límite máximo de préstamo del grupo"""
     query = "SELECT montomax_prestamo FROM reglas_grupo WHERE id_grupo = %s"
-    resultado = ejecutar_consulta(query, (id_grupo,))
+    resultado = ejecutar_consulta_cacheada(query, (id_grupo,))
     return resultado[0]['montomax_prestamo'] if resultado else 5000.0
 
 def crear_solicitud_prestamo(id_socio, monto, plazo, proposito, id_grupo):
@@ -429,15 +431,7 @@ def obtener_solicitudes_pendientes(id_grupo):
             p.plazo_meses,
             p.proposito,
             p.fecha_solicitud,
-            COALESCE((
-                SELECT saldo_final 
-                FROM ahorro_detalle ad 
-                JOIN ahorro a ON ad.id_ahorro = a.id_ahorro 
-                JOIN sesion se ON a.id_sesion = se.id_sesion 
-                WHERE ad.id_socio = s.id_socio 
-                ORDER BY se.fecha_sesion DESC 
-                LIMIT 1
-            ), 0) as saldo_ahorro,
+            COALESCE(ss.saldo_actual, 0) as saldo_ahorro,
             (
                 SELECT COUNT(*) 
                 FROM prestamo 
@@ -446,6 +440,7 @@ def obtener_solicitudes_pendientes(id_grupo):
             ) as prestamos_activos
         FROM prestamo p
         JOIN socios s ON p.id_socio = s.id_socio
+        LEFT JOIN saldo_socio ss ON ss.id_socio = s.id_socio
         WHERE s.id_grupo = %s AND p.id_estado_prestamo = 1  -- Pendiente
         ORDER BY p.fecha_solicitud DESC
     """
@@ -477,11 +472,20 @@ def aprobar_prestamo(id_prestamo):
     fecha_desembolso = fecha_aprobacion
     fecha_vencimiento = fecha_aprobacion + timedelta(days=30 * plazo_meses)
     
-    # Crear el plan de pagos
-    if ejecutar_comando(query, (fecha_aprobacion, fecha_desembolso, fecha_vencimiento, id_prestamo)):
-        return crear_plan_pagos(id_prestamo)
-    
-    return False
+    try:
+        # Aprobación y plan de pagos en un solo commit
+        with transaccion():
+            ejecutar_comando(query, (fecha_aprobacion, fecha_desembolso, fecha_vencimiento, id_prestamo))
+            
+            # Crear el plan de pagos
+            if not crear_plan_pagos(id_prestamo):
+                raise ValueError("No se pudo crear el plan de pagos")
+            
+            actualizar_cartera_prestamos([id_prestamo])
+        return True
+    except Exception as e:
+        st.error(f"❌ Error aprobando préstamo: {e}")
+        return False
 
 def crear_plan_pagos(id_prestamo):
     """Crear plan de pagos para un préstamo aprobado"""
@@ -509,33 +513,38 @@ def crear_plan_pagos(id_prestamo):
     cuotas_info = calcular_cuotas_prestamo(monto, tasa_interes, plazo)
     cuota_mensual = cuotas_info['cuota_mensual']
     
-    # Crear registros de pagos programados
+    # Crear registros de pagos programados (un solo INSERT multi-fila)
+    query = """
+        INSERT INTO `detalles_pagos` (
+            id_prestamo, fecha_programada, capital_programado,
+            interes_programado, total_programado, cuota_mensual
+        ) VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    
+    filas = []
     for i in range(plazo):
         fecha_pago = fecha_inicio + timedelta(days=30 * (i + 1))
-        
-        query = """
-            INSERT INTO `detalles_pagos` (
-                id_prestamo, fecha_programada, capital_programado,
-                interes_programado, total_programado, cuota_mensual
-            ) VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        
         capital_cuota = cuotas_info['amortizacion'][i]['capital']
         interes_cuota = cuotas_info['amortizacion'][i]['interes']
         total_cuota = capital_cuota + interes_cuota
         
-        if not ejecutar_comando(
-            query, 
-            (id_prestamo, fecha_pago, capital_cuota, interes_cuota, total_cuota, cuota_mensual)
-        ):
-            return False
+        filas.append((id_prestamo, fecha_pago, capital_cuota, interes_cuota, total_cuota, cuota_mensual))
     
-    return True
+    return ejecutar_lote(query, filas) is not None
 
 def rechazar_prestamo(id_prestamo, motivo):
-    """Rechazar un préstamo"""
+    """Rechazar un préstamo (y actualizar su cartera, en la misma transacción)"""
     query = "UPDATE prestamo SET id_estado_prestamo = 3, motivo_rechazo = %s WHERE id_prestamo = %s"
-    return ejecutar_comando(query, (motivo, id_prestamo))
+    try:
+        with transaccion():
+            ejecutar_comando(query, (motivo, id_prestamo))
+            actualizar_cartera_prestamos([id_prestamo])
+        return True
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error rechazando préstamo: {e}")
+        return False
 
 def obtener_prestamos_activos_grupo(id_grupo):
     """Obtener préstamos activos del grupo"""
@@ -584,16 +593,7 @@ def obtener_prestamos_activos_grupo(id_grupo):
 
 def obtener_disponibilidad_caja(id_grupo):
     """Obtener disponibilidad de caja para préstamos"""
-    query = """
-        SELECT saldo_cierre 
-        FROM caja c
-        JOIN sesion s ON c.id_sesion = s.id_sesion
-        WHERE s.id_grupo = %s
-        ORDER BY s.fecha_sesion DESC
-        LIMIT 1
-    """
-    resultado = ejecutar_consulta(query, (id_grupo,))
-    return resultado[0]['saldo_cierre'] if resultado else 0
+    return obtener_saldo_grupo(id_grupo)['saldo_caja']
 
 def obtener_proxima_sesion(id_grupo):
     """Obtener la próxima sesión del grupo"""
@@ -922,7 +922,7 @@ def refinanciar_prestamo(id_prestamo):
                 st.error("❌ Error al refinanciar el préstamo")
 
 def actualizar_terminos_prestamo(id_prestamo, nuevo_plazo, nueva_tasa, nueva_cuota, motivo, condiciones, fecha_refinanciacion):
-    """Actualizar los términos del préstamo en la base de datos"""
+    """Actualizar los términos del préstamo en la base de datos (en una transacción)"""
     
     # Primero, crear un registro de refinanciación
     query_refin = """
@@ -932,12 +932,6 @@ def actualizar_terminos_prestamo(id_prestamo, nuevo_plazo, nueva_tasa, nueva_cuo
         ) VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
     
-    if not ejecutar_comando(
-        query_refin,
-        (id_prestamo, fecha_refinanciacion, nuevo_plazo, nueva_tasa, nueva_cuota, motivo, condiciones)
-    ):
-        return False
-    
     # Actualizar el préstamo principal
     query_update = """
         UPDATE prestamo 
@@ -949,7 +943,20 @@ def actualizar_terminos_prestamo(id_prestamo, nuevo_plazo, nueva_tasa, nueva_cuo
     
     nueva_fecha_vencimiento = fecha_refinanciacion + timedelta(days=30 * nuevo_plazo)
     
-    return ejecutar_comando(
-        query_update,
-        (nuevo_plazo, nueva_fecha_vencimiento, id_prestamo)
-    )
\ No newline at end of file
+    try:
+        with transaccion():
+            ejecutar_comando(
+                query_refin,
+                (id_prestamo, fecha_refinanciacion, nuevo_plazo, nueva_tasa, nueva_cuota, motivo, condiciones)
+            )
+            ejecutar_comando(
+                query_update,
+                (nuevo_plazo, nueva_fecha_vencimiento, id_prestamo)
+            )
+            actualizar_cartera_prestamos([id_prestamo])
+        return True
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error refinanciando préstamo: {e}")
+        return False
\ No newline at end of file
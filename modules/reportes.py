@@ -1,5 +1,5 @@
 import streamlit as st
-from modules.database import ejecutar_consulta
+from modules.database import ejecutar_consulta, ejecutar_consulta_memo
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -361,13 +361,12 @@ def obtener_tasa_mora_grupo():
         SELECT 
             CASE 
                 WHEN COUNT(*) = 0 THEN 0
-                ELSE SUM(CASE WHEN p.id_estado_prestamo = 5 THEN 1 ELSE 0 END) / COUNT(*) * 100
+                ELSE SUM(CASE WHEN id_estado_prestamo = 5 THEN 1 ELSE 0 END) / COUNT(*) * 100
             END as tasa
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo IN (2, 5)
+        FROM cartera_prestamo
+        WHERE id_grupo = %s AND id_estado_prestamo IN (2, 5)
     """
-    resultado = ejecutar_consulta(query, (st.session_state.id_grupo,))
+    resultado = ejecutar_consulta_memo(query, (st.session_state.id_grupo,))
     return resultado[0]['tasa'] if resultado else 0
 
 def obtener_asistencia_promedio():
@@ -377,7 +376,7 @@ def obtener_asistencia_promedio():
         FROM sesion
         WHERE id_grupo = %s AND total_presentes > 0
     """
-    resultado = ejecutar_consulta(query, (st.session_state.id_grupo, st.session_state.id_grupo))
+    resultado = ejecutar_consulta_memo(query, (st.session_state.id_grupo, st.session_state.id_grupo))
     return resultado[0]['promedio'] if resultado else 0
 
 def obtener_intereses_cobrados():
@@ -550,5 +549,5 @@ def obtener_info_ciclo_actual(id_grupo):
         FROM reglas_grupo
         WHERE id_grupo = %s
     """
-    resultado = ejecutar_consulta(query, (id_grupo,))
+    resultado = ejecutar_consulta_memo(query, (id_grupo,))
     return resultado[0] if resultado else None
\ No newline at end of file
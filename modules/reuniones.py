@@ -1,5 +1,6 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, en_transaccion, transaccion
+from modules.migraciones import exigir_migracion
 from datetime import datetime, timedelta
 import pandas as pd
 import tempfile
@@ -56,11 +57,6 @@ def nueva_reunion():
         submitted = st.form_submit_button("💾 Crear Reunión")
         
         if submitted:
-            # Debug: mostrar información antes de crear
-            st.write(f"🔍 **DEBUG ANTES DE CREAR:**")
-            st.write(f"id_grupo: {st.session_state.id_grupo} (tipo: {type(st.session_state.id_grupo)})")
-            st.write(f"fecha_sesion: {fecha_sesion} (tipo: {type(fecha_sesion)})")
-            
             id_sesion = crear_sesion(
                 st.session_state.id_grupo, 
                 fecha_sesion
@@ -110,36 +106,37 @@ def crear_sesion(id_grupo, fecha_sesion):
         0  # total_presentes inicializado en 0
     )
     
-    print(f"DEBUG - Query: {query}")
-    print(f"DEBUG - Params: {params}")
-    
     id_sesion = ejecutar_comando(query, params)
     
     return id_sesion
 
 def inicializar_asistencia(id_sesion, id_grupo):
-    """Inicializar registros de asistencia para todos los socios del grupo - FUNCIÓN CORREGIDA"""
-    
-    socios = obtener_socios_grupo(id_grupo)
+    """Inicializar registros de asistencia para todos los socios del grupo.
+
+    Un único INSERT ... SELECT desde socios; el índice UNIQUE (id_sesion, id_socio)
+    de asistencia hace que reinicializar solo agregue a los socios que falten.
+    """
     
-    if not socios:
+    if not obtener_total_socios_grupo(id_grupo):
         st.warning("⚠️ No hay socios en este grupo para inicializar asistencia")
         return False
     
-    for socio in socios:
-        query = """
-            INSERT INTO asistencia (id_sesion, id_socio, presencial)
-            VALUES (%s, %s, %s)
-        """
-        # Pasar 3 parámetros
-        params = (int(id_sesion), int(socio['id_socio']), 0)
-        resultado = ejecutar_comando(query, params)
-        
-        if not resultado:
-            st.error(f"❌ Error al inicializar asistencia para socio {socio['nombre']}")
-            return False
+    query = """
+        INSERT IGNORE INTO asistencia (id_sesion, id_socio, presencial)
+        SELECT %s, id_socio, 0
+        FROM socios
+        WHERE id_grupo = %s
+    """
     
-    return True
+    try:
+        # Sin la clave única, reinicializar duplicaría la asistencia
+        exigir_migracion('016_asistencia_unica')
+        with transaccion():
+            ejecutar_comando(query, (int(id_sesion), int(id_grupo)))
+        return True
+    except Exception as e:
+        st.error(f"❌ Error al inicializar la asistencia de los socios: {e}")
+        return False
 
 def registrar_asistencia():
     """Registro de asistencia para una reunión existente - CLAVES ÚNICAS"""
@@ -185,6 +182,8 @@ def registrar_asistencia():
             # Obtener lista de socios con su estado de asistencia
             asistencia_actual = obtener_asistencia_sesion(id_sesion)
             
+            cambios = {}
+            
             if asistencia_actual:
                 total_presentes = 0
                 
@@ -197,10 +196,12 @@ def registrar_asistencia():
                     if st.form_submit_button("✅ Marcar Todos como Presentes", 
                                            use_container_width=True,
                                            key=f"mark_all_{id_sesion}"):
-                        for asistencia in asistencia_actual:
-                            actualizar_asistencia(asistencia['id_asistencia'], True)
-                        st.success("Todos los socios marcados como presentes")
-                        st.rerun()
+                        if marcar_todos_presentes(id_sesion):
+                            # Descartar el estado de los checkboxes para que muestren lo guardado
+                            for asistencia in asistencia_actual:
+                                st.session_state.pop(f"asist_{asistencia['id_asistencia']}_{id_sesion}", None)
+                            st.success("Todos los socios marcados como presentes")
+                            st.rerun()
                 
                 for asistencia in asistencia_actual:
                     col1, col2, col3, col4 = st.columns([3, 1, 1, 2])
@@ -223,9 +224,9 @@ def registrar_asistencia():
                         else:
                             st.error("❌ Ausente")
                     
-                    # Actualizar inmediatamente cuando cambia
-                    if st.session_state.get(f"asist_{asistencia['id_asistencia']}_{id_sesion}") != bool(asistencia['presencial']):
-                        actualizar_asistencia(asistencia['id_asistencia'], presente)
+                    # Solo se guardan los cambios respecto a la base, al enviar el formulario
+                    if presente != bool(asistencia['presencial']):
+                        cambios[asistencia['id_asistencia']] = presente
                 
                 # Mostrar resumen
                 st.markdown("---")
@@ -242,14 +243,16 @@ def registrar_asistencia():
                 with col4:
                     porcentaje_asistencia = (total_presentes / total_socios) * 100 if total_socios > 0 else 0
                     st.metric("📊 Porcentaje", f"{porcentaje_asistencia:.1f}%")
-                
-                # Actualizar total en la sesión
-                actualizar_total_presentes(id_sesion, total_presentes)
             
             # Botón de guardar dentro del formulario
-            st.form_submit_button("💾 Guardar Cambios de Asistencia", 
-                                use_container_width=True,
-                                key=f"save_{id_sesion}")
+            if st.form_submit_button("💾 Guardar Cambios de Asistencia", 
+                                   use_container_width=True,
+                                   key=f"save_{id_sesion}"):
+                if not cambios:
+                    st.info("ℹ️ No hay cambios de asistencia para guardar")
+                elif guardar_cambios_asistencia(id_sesion, cambios):
+                    st.success(f"✅ Asistencia actualizada ({len(cambios)} cambio(s))")
+                    st.rerun()
         
         # BOTONES DE ACCIÓN FUERA DEL FORMULARIO (con claves únicas)
         st.markdown("---")
@@ -259,6 +262,14 @@ def registrar_asistencia():
                     key=f"multa_manual_{id_sesion}"):
             ingresar_multa_manual(st.session_state.id_grupo)     
         
+        if st.button("💸 Generar Multas por Inasistencia", 
+                    key=f"multas_inasistencia_{id_sesion}"):
+            multas_creadas = generar_multas_inasistencia(id_sesion)
+            if multas_creadas:
+                st.success(f"✅ {multas_creadas} multa(s) por inasistencia generadas")
+            elif multas_creadas == 0:
+                st.info("ℹ️ No hay ausencias sin justificar pendientes de multa en esta reunión")
+        
         if st.button("📄 Generar Acta de Asistencia", 
             key=f"acta_btn_{id_sesion}"):
             generar_acta_asistencia(id_sesion)
@@ -274,20 +285,10 @@ def timedelta_a_time(td):
         return (datetime.min + td).time()
     return td
 
-def obtener_siguiente_id_multa():
-    """Obtener el próximo ID disponible para la tabla multa"""
-    try:
-        resultado = ejecutar_consulta("SELECT MAX(id_multa) as max_id FROM multa")
-        if resultado and resultado[0]['max_id'] is not None:
-            return resultado[0]['max_id'] + 1
-        else:
-            return 1
-    except Exception as e:
-        print(f"Error obteniendo próximo ID multa: {e}")
-        return 1
+REUNIONES_POR_PAGINA = 20
 
 def historial_reuniones():
-    """Mostrar historial de reuniones del grupo - CORREGIDO CLAVES DUPLICADAS"""
+    """Mostrar historial de reuniones del grupo, paginado"""
     
     st.subheader("Historial de Reuniones")
     
@@ -295,58 +296,118 @@ def historial_reuniones():
         st.warning("⚠️ Solo la directiva de un grupo puede ver el historial")
         return
     
-    reuniones = obtener_reuniones_grupo(st.session_state.id_grupo)
+    id_grupo = st.session_state.id_grupo
     
-    if reuniones:
-        # ... (código de métricas existente)
-        
-        # Lista detallada
-        st.markdown("### 📋 Detalle de Reuniones")
-        
-        for i, reunion in enumerate(reuniones):
-            with st.expander(f"📅 Reunión - {reunion['fecha_sesion'].strftime('%d/%m/%Y')} - {reunion['total_presentes']} presentes"):
-                col1, col2, col3 = st.columns([2, 2, 1])
-                
-                with col1:
-                    st.write(f"**Fecha:** {reunion['fecha_sesion'].strftime('%d/%m/%Y')}")
-                    st.write(f"**Asistentes:** {reunion['total_presentes']}")
-                    
-                    total_socios = obtener_total_socios_grupo(st.session_state.id_grupo)
-                    if total_socios > 0:
-                        porcentaje = (reunion['total_presentes'] / total_socios) * 100
-                        st.write(f"**Porcentaje:** {porcentaje:.1f}%")
-                        
-                        if porcentaje >= 80:
-                            st.success("✅ Buena asistencia")
-                        elif porcentaje >= 60:
-                            st.warning("⚠️ Asistencia regular")
-                        else:
-                            st.error("❌ Baja asistencia")
-                
-                with col2:
-                    # Información adicional si existe
-                    if reunion.get('tipo_reunion'):
-                        st.write(f"**Tipo:** {reunion['tipo_reunion']}")
-                    if reunion.get('temas_agenda'):
-                        st.write(f"**Temas:** {reunion['temas_agenda'][:50]}...")
-                
-                with col3:
-                    # Botones de acción con claves únicas
-                    col_btn1, col_btn2 = st.columns(2)
-                    
-                    with col_btn1:
-                        if st.button("👁️", key=f"det_{reunion['id_sesion']}_{i}"):
-                            ver_detalle_reunion(reunion['id_sesion'])
-                    
-                    with col_btn2:
-                        if st.button("📄", key=f"acta_{reunion['id_sesion']}_{i}"):
-                            generar_acta_asistencia(reunion['id_sesion'])
-                    
-                    # Botón adicional para reportes
-                    if st.button("📊 Reporte", key=f"report_{reunion['id_sesion']}_{i}"):
-                        generar_reporte_asistencia(reunion['id_sesion'])
-    else:
+    # Pila de cursores (fecha_sesion, id_sesion) de las páginas visitadas
+    clave_cursores = f"historial_cursores_{id_grupo}"
+    cursores = st.session_state.setdefault(clave_cursores, [None])
+    
+    reuniones, hay_mas = obtener_historial_reuniones(id_grupo, despues_de=cursores[-1])
+    
+    if not reuniones and len(cursores) > 1:
+        # La página guardada quedó vacía (p. ej. se eliminaron reuniones): volver al inicio
+        st.session_state[clave_cursores] = cursores = [None]
+        reuniones, hay_mas = obtener_historial_reuniones(id_grupo)
+    
+    if not reuniones:
         st.info("ℹ️ No hay reuniones registradas para este grupo")
+        return
+    
+    st.markdown(f"### 📋 Detalle de Reuniones (página {len(cursores)})")
+    
+    df = pd.DataFrame(reuniones)
+    df['fecha_sesion'] = df['fecha_sesion'].apply(lambda f: f.strftime('%d/%m/%Y'))
+    df = df[['fecha_sesion', 'presentes', 'total_socios', 'porcentaje', 'multas_emitidas', 'monto_multas']]
+    df.columns = ['Fecha', 'Asistentes', 'Socios', 'Asistencia %', 'Multas', 'Monto Multas']
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    
+    col_ant, col_info, col_sig = st.columns([1, 2, 1])
+    with col_ant:
+        if st.button("⬅️ Más recientes", disabled=len(cursores) == 1, key=f"hist_ant_{id_grupo}"):
+            cursores.pop()
+            st.rerun()
+    with col_info:
+        st.caption(f"Mostrando {len(reuniones)} reuniones")
+    with col_sig:
+        if st.button("Más antiguas ➡️", disabled=not hay_mas, key=f"hist_sig_{id_grupo}"):
+            ultima = reuniones[-1]
+            cursores.append((ultima['fecha_sesion'], ultima['id_sesion']))
+            st.rerun()
+    
+    # Acciones sobre una reunión de la página
+    st.markdown("---")
+    reunion = st.selectbox(
+        "Reunión",
+        options=reuniones,
+        format_func=lambda r: f"📅 {r['fecha_sesion'].strftime('%d/%m/%Y')} - {r['presentes']} presentes ({r['porcentaje']:.1f}%)",
+        key=f"hist_reunion_{id_grupo}"
+    )
+    
+    if reunion['porcentaje'] >= 80:
+        st.success("✅ Buena asistencia")
+    elif reunion['porcentaje'] >= 60:
+        st.warning("⚠️ Asistencia regular")
+    else:
+        st.error("❌ Baja asistencia")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("👁️ Ver Detalle", key=f"det_{reunion['id_sesion']}"):
+            ver_detalle_reunion(reunion['id_sesion'])
+    with col2:
+        if st.button("📄 Acta", key=f"acta_{reunion['id_sesion']}"):
+            generar_acta_asistencia(reunion['id_sesion'])
+    with col3:
+        if st.button("📊 Reporte", key=f"report_{reunion['id_sesion']}"):
+            generar_reporte_asistencia(reunion['id_sesion'])
+
+def obtener_historial_reuniones(id_grupo, limite=REUNIONES_POR_PAGINA, despues_de=None):
+    """Página del historial con estadísticas de asistencia y multas (una consulta).
+
+    Paginación por cursor: despues_de es (fecha_sesion, id_sesion) de la última
+    reunión de la página anterior. Retorna (reuniones, hay_mas). El total de
+    socios es el de la sesión (filas de asistencia) o, si no tiene, el actual.
+    """
+    filtro_cursor = ""
+    params = [id_grupo]
+    if despues_de is not None:
+        filtro_cursor = "AND (s.fecha_sesion < %s OR (s.fecha_sesion = %s AND s.id_sesion < %s))"
+        params += [despues_de[0], despues_de[0], despues_de[1]]
+    params.append(limite + 1)
+    
+    query = f"""
+        SELECT 
+            p.id_sesion, p.fecha_sesion, p.presentes, p.total_socios,
+            CASE WHEN p.total_socios > 0 THEN ROUND(100.0 * p.presentes / p.total_socios, 1) ELSE 0 END as porcentaje,
+            p.multas_emitidas, p.monto_multas
+        FROM (
+            SELECT 
+                pag.id_sesion, pag.fecha_sesion,
+                COALESCE(
+                    (SELECT SUM(a.presencial) FROM asistencia a WHERE a.id_sesion = pag.id_sesion),
+                    pag.total_presentes
+                ) as presentes,
+                COALESCE(
+                    NULLIF((SELECT COUNT(*) FROM asistencia a WHERE a.id_sesion = pag.id_sesion), 0),
+                    (SELECT COUNT(*) FROM socios so WHERE so.id_grupo = pag.id_grupo)
+                ) as total_socios,
+                (SELECT COUNT(*) FROM multa m WHERE m.id_sesion = pag.id_sesion) as multas_emitidas,
+                (SELECT COALESCE(SUM(m.monto_a_pagar), 0) FROM multa m WHERE m.id_sesion = pag.id_sesion) as monto_multas
+            FROM (
+                SELECT s.id_sesion, s.id_grupo, s.fecha_sesion, s.total_presentes
+                FROM sesion s
+                WHERE s.id_grupo = %s {filtro_cursor}
+                ORDER BY s.fecha_sesion DESC, s.id_sesion DESC
+                LIMIT %s
+            ) pag
+        ) p
+        ORDER BY p.fecha_sesion DESC, p.id_sesion DESC
+    """
+    
+    reuniones = ejecutar_consulta(query, tuple(params)) or []
+    for reunion in reuniones:
+        reunion['porcentaje'] = float(reunion['porcentaje'])
+    return reuniones[:limite], len(reuniones) > limite
         
 # =============================================================================
 # FUNCIONES AUXILIARES - REUNIONES (TODAS IMPLEMENTADAS)
@@ -432,6 +493,54 @@ def actualizar_total_presentes(id_sesion, total):
     query = "UPDATE sesion SET total_presentes = %s WHERE id_sesion = %s"
     return ejecutar_comando(query, (total, id_sesion))
 
+def recalcular_total_presentes(id_sesion):
+    """Derivar total_presentes de la sesión desde asistencia"""
+    query = """
+        UPDATE sesion 
+        SET total_presentes = (
+            SELECT COUNT(*) FROM asistencia WHERE id_sesion = %s AND presencial = 1
+        ) 
+        WHERE id_sesion = %s
+    """
+    return ejecutar_comando(query, (id_sesion, id_sesion))
+
+def guardar_cambios_asistencia(id_sesion, cambios):
+    """Guardar solo las asistencias modificadas ({id_asistencia: presente}).
+
+    A lo sumo un UPDATE para los presentes y otro para los ausentes, más
+    total_presentes derivado de asistencia, en una sola transacción.
+    """
+    try:
+        with transaccion():
+            for presencial in (1, 0):
+                ids = [id_asistencia for id_asistencia, presente in cambios.items() if int(presente) == presencial]
+                if ids:
+                    ejecutar_comando(
+                        "UPDATE asistencia SET presencial = %s WHERE id_sesion = %s AND id_asistencia IN ("
+                        + ", ".join(["%s"] * len(ids)) + ")",
+                        (presencial, id_sesion, *ids)
+                    )
+            recalcular_total_presentes(id_sesion)
+        return True
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error guardando la asistencia: {e}")
+        return False
+
+def marcar_todos_presentes(id_sesion):
+    """Marcar a todos los socios de la sesión como presentes (un solo UPDATE)"""
+    try:
+        with transaccion():
+            ejecutar_comando("UPDATE asistencia SET presencial = 1 WHERE id_sesion = %s", (id_sesion,))
+            recalcular_total_presentes(id_sesion)
+        return True
+    except Exception as e:
+        if en_transaccion():
+            raise
+        st.error(f"❌ Error marcando la asistencia: {e}")
+        return False
+
 def obtener_reuniones_grupo(id_grupo):
     """Obtener todas las reuniones de un grupo"""
     query = """
@@ -504,7 +613,7 @@ def ingresar_multa_manual(id_grupo=None):
             motivo = st.selectbox(
                 "Motivo de la multa *",
                 options=[
-                    "Inasistencia a reunión",
+                    MOTIVO_MULTA_INASISTENCIA,
                     "Llegada tardía",
                     "Falta de pago oportuno",
                     "Incumplimiento de normas",
@@ -589,9 +698,6 @@ def aplicar_multa_manual(id_socio, monto, motivo, fecha_vencimiento, id_sesion=N
     """Aplicar multa manual a un socio - CORREGIDA"""
     
     try:
-        # Obtener el próximo ID de multa
-        id_multa = obtener_siguiente_id_multa()
-        
         # Si no se proporciona id_sesion, usar una sesión por defecto o crear una específica
         if id_sesion is None:
             # Buscar una sesión existente del grupo para hoy o crear una nueva
@@ -617,33 +723,37 @@ def aplicar_multa_manual(id_socio, monto, motivo, fecha_vencimiento, id_sesion=N
                     st.error("❌ Error al crear sesión para multa manual")
                     return False
         
-        # DEBUG: Mostrar información antes de insertar
-        st.write(f"🔍 DEBUG - Insertando multa:")
-        st.write(f"ID Multa: {id_multa}")
-        st.write(f"ID Sesión: {id_sesion}")
-        st.write(f"ID Socio: {id_socio}")
-        st.write(f"Monto: {monto}")
-        st.write(f"Fecha Vencimiento: {fecha_vencimiento}")
+        # Una sola multa por socio, sesión y motivo (clave única de multa)
+        duplicada = ejecutar_consulta(
+            "SELECT id_multa FROM multa WHERE id_sesion = %s AND id_socio = %s AND motivo = %s",
+            (int(id_sesion), int(id_socio), motivo)
+        )
+        if duplicada:
+            st.error(
+                f"❌ El socio ya tiene la multa #{duplicada[0]['id_multa']} por \"{motivo}\" en esta sesión; "
+                "use otro motivo o edite la existente"
+            )
+            return False
         
-        # Insertar la multa manual
+        # Insertar la multa manual (id_multa lo genera la base de datos)
         query = """
-            INSERT INTO multa (id_multa, id_sesion, id_socio, monto_a_pagar, monto_pagado, fecha_pago_real, fecha_vencimiento)
+            INSERT INTO multa (id_sesion, id_socio, monto_a_pagar, monto_pagado, fecha_pago_real, fecha_vencimiento, motivo)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
         
         params = (
-            int(id_multa),
             int(id_sesion),
             int(id_socio),
             float(monto),
             0.00,  # monto_pagado inicial
             None,   # fecha_pago_real (null inicialmente)
-            fecha_vencimiento
+            fecha_vencimiento,
+            motivo
         )
         
-        resultado = ejecutar_comando(query, params)
+        id_multa = ejecutar_comando(query, params)
         
-        if resultado:
+        if id_multa:
             st.success(f"✅ Multa manual #{id_multa} aplicada exitosamente")
             
             # Guardar el motivo en un log o tabla auxiliar (si existe)
@@ -672,6 +782,43 @@ def aplicar_multa_manual(id_socio, monto, motivo, fecha_vencimiento, id_sesion=N
         st.error(f"❌ Error aplicando multa manual: {str(e)}")
         return False
 
+MOTIVO_MULTA_INASISTENCIA = "Inasistencia a reunión"
+
+def generar_multas_inasistencia(id_sesion, monto=None, fecha_vencimiento=None):
+    """Multar a los ausentes sin justificación de la sesión con un único INSERT IGNORE ... SELECT.
+
+    El monto por defecto es reglas_grupo.cantidad_multa del grupo. Volver a
+    ejecutarlo no tiene efecto: la clave única (id_sesion, id_socio, motivo) de
+    multa omite a quien ya tiene la multa por inasistencia de esa sesión.
+    Retorna la cantidad de multas creadas o None si falla.
+    """
+    fecha_vencimiento = fecha_vencimiento or datetime.now().date() + timedelta(days=15)
+    
+    query = """
+        INSERT IGNORE INTO multa (id_sesion, id_socio, monto_a_pagar, monto_pagado, fecha_pago_real, fecha_vencimiento, motivo)
+        SELECT a.id_sesion, a.id_socio, COALESCE(%s, r.cantidad_multa), 0, NULL, %s, %s
+        FROM asistencia a
+        JOIN sesion se ON a.id_sesion = se.id_sesion
+        LEFT JOIN reglas_grupo r ON r.id_grupo = se.id_grupo
+        WHERE a.id_sesion = %s
+        AND a.presencial = 0
+        AND COALESCE(a.justificacion_ausencia, '') = ''
+        AND COALESCE(%s, r.cantidad_multa, 0) > 0
+    """
+    
+    try:
+        # Sin la clave única, repetir la generación duplicaría las multas
+        exigir_migracion('020_multa_unica')
+        with transaccion():
+            return ejecutar_comando(
+                query,
+                (monto, fecha_vencimiento, MOTIVO_MULTA_INASISTENCIA, id_sesion, monto),
+                contar_filas=True
+            )
+    except Exception as e:
+        st.error(f"❌ Error generando multas por inasistencia: {e}")
+        return None
+
 def ver_multas_pendientes(id_grupo=None):
     """Ver multas pendientes de pago - MEJORADA CON VERIFICACIÓN"""
     
@@ -738,11 +885,6 @@ def ver_multas_pendientes(id_grupo=None):
     
     multas = ejecutar_consulta(query, params)
     
-    # DEBUG: Mostrar información de la consulta
-    st.write(f"🔍 DEBUG - Consulta ejecutada: {query}")
-    st.write(f"🔍 DEBUG - Parámetros: {params}")
-    st.write(f"🔍 DEBUG - Multas encontradas: {len(multas) if multas else 0}")
-    
     if multas:
         total_pendiente = sum(float(multa['monto_a_pagar']) - float(multa['monto_pagado']) for multa in multas)
         multas_vencidas = [m for m in multas if m['fecha_vencimiento'] < datetime.now().date()]
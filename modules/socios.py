@@ -1,5 +1,5 @@
 import streamlit as st
-from modules.database import ejecutar_consulta, ejecutar_comando
+from modules.database import ejecutar_consulta, ejecutar_comando, ejecutar_consulta_cacheada
 from datetime import datetime
 import pandas as pd
 
@@ -521,7 +521,7 @@ def obtener_grupos_con_nombres():
 
 def obtener_distritos():
     """Obtener lista de distritos"""
-    resultado = ejecutar_consulta("SELECT id_distrito, nombre_distrito FROM distrito")
+    resultado = ejecutar_consulta_cacheada("SELECT id_distrito, nombre_distrito FROM distrito")
     if resultado:
         return [(row['id_distrito'], row['nombre_distrito']) for row in resultado]
     return []
@@ -529,15 +529,9 @@ def obtener_distritos():
 
 def obtener_saldo_ahorro_socio(id_socio):
     """Obtener saldo actual de ahorro del socio"""
-    query = """
-        SELECT saldo_final 
-        FROM ahorro_detalle 
-        WHERE id_socio = %s 
-        ORDER BY id_ahorrodetalle DESC 
-        LIMIT 1
-    """
+    query = "SELECT saldo_actual FROM saldo_socio WHERE id_socio = %s"
     resultado = ejecutar_consulta(query, (id_socio,))
-    return resultado[0]['saldo_final'] if resultado else 0
+    return resultado[0]['saldo_actual'] if resultado else 0
 
 def obtener_prestamos_activos_socio(id_socio):
     """Obtener número de préstamos activos del socio"""
@@ -175,15 +175,10 @@ def mostrar_detalles_grupo(grupo):
         
         # Ahorro total del grupo
         ahorro_total = ejecutar_consulta("""
-            SELECT COALESCE(SUM(ad.saldo_final), 0) as total 
-            FROM ahorro_detalle ad
-            WHERE ad.id_socio IN (SELECT id_socio FROM socios WHERE id_grupo = %s)
-            AND ad.id_ahorro_detalle IN (
-                SELECT MAX(ad2.id_ahorro_detalle)
-                FROM ahorro_detalle ad2
-                WHERE ad2.id_socio = ad.id_socio
-                GROUP BY ad2.id_socio
-            )
+            SELECT COALESCE(SUM(ss.saldo_actual), 0) as total 
+            FROM saldo_socio ss
+            JOIN socios s ON ss.id_socio = s.id_socio
+            WHERE s.id_grupo = %s
         """, (grupo['id_grupo'],))
         
         st.write(f"**Ahorro total:** ${ahorro_total[0]['total']:,.2f}" if ahorro_total else "**Ahorro total:** $0.00")
@@ -312,13 +307,10 @@ def mostrar_info_adicional_socio(id_socio):
     
     with col1:
         # Ahorro del socio
-        ahorro_socio = ejecutar_consulta("""
-            SELECT saldo_final 
-            FROM ahorro_detalle 
-            WHERE id_socio = %s 
-            ORDER BY id_ahorro_detalle DESC 
-            LIMIT 1
-        """, (id_socio,))
+        ahorro_socio = ejecutar_consulta(
+            "SELECT saldo_actual as saldo_final FROM saldo_socio WHERE id_socio = %s",
+            (id_socio,)
+        )
         
         if ahorro_socio and ahorro_socio[0]['saldo_final']:
             st.write(f"**Ahorro actual:** ${ahorro_socio[0]['saldo_final']:,.2f}")
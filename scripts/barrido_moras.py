@@ -0,0 +1,168 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+
+from modules.database import configurar_bd, ejecutar_consulta
+from modules.moras import detectar_moras_grupo, limpiar_alertas_resueltas, refrescar_cartera_diaria
+
+# =============================================================================
+# BARRIDO DE MORAS ENTRE GRUPOS (SIN STREAMLIT)
+# =============================================================================
+# Ejecuta la detección de moras (modules.moras.detectar_moras_grupo) en todos
+# los grupos activos, o en los de un distrito, con un pool de hilos. Cada
+# grupo corre en su propia transacción. Al terminar escribe la foto del día de
+# la cartera en riesgo (cartera_mora_diaria) de esos grupos, que alimenta la
+# evolución y la tendencia de la mora en los reportes, y borra en lotes las
+# alertas resueltas antiguas (fuera del horario de reuniones).
+#
+# El progreso se guarda en un archivo de control después de cada grupo: si el
+# proceso se interrumpe, la siguiente ejecución del mismo día retoma los grupos
+# pendientes. El control lleva la fecha del barrido: uno de otro día se ignora
+# (los préstamos vencen cada día, así que todos los grupos se vuelven a barrer).
+# Un barrido terminado queda marcado como completo y la siguiente ejecución
+# empieza uno nuevo.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m scripts.barrido_moras                      # usa st.secrets["db"]
+#   python -m scripts.barrido_moras --distrito 3 --hilos 4
+#   python -m scripts.barrido_moras --sqlite bench.db --reiniciar
+#
+# Ejemplo de cron (todos los días a las 02:00):
+#   0 2 * * * cd /ruta/al/proyecto && python -m scripts.barrido_moras >> barrido_moras.log 2>&1
+
+ARCHIVO_CONTROL = "barrido_moras.json"
+HILOS_DEFECTO = 4  # menor que el pool de conexiones (POOL_SIZE_DEFECTO)
+
+def obtener_grupos_a_barrer(id_distrito=None):
+    """IDs de los grupos activos (opcionalmente de un distrito)"""
+    query = "SELECT id_grupo FROM grupos WHERE estado = 'ACTIVO'"
+    params = ()
+    if id_distrito is not None:
+        query += " AND id_distrito = %s"
+        params = (id_distrito,)
+    query += " ORDER BY id_grupo"
+    return [fila['id_grupo'] for fila in ejecutar_consulta(query, params) or []]
+
+def cargar_control(ruta, id_distrito, reiniciar=False):
+    """Estado del barrido de hoy en curso, o uno nuevo si no hay nada que retomar"""
+    hoy = date.today().isoformat()
+    if not reiniciar and os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as archivo:
+            control = json.load(archivo)
+        if not control.get("completo") and control.get("distrito") == id_distrito:
+            if control.get("fecha") == hoy:
+                return control
+            print(
+                f"Barrido incompleto del {control.get('fecha') or control.get('inicio', '?')[:10]} ignorado: "
+                "se empieza uno nuevo", file=sys.stderr
+            )
+
+    return {
+        "fecha": hoy,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "distrito": id_distrito,
+        "completo": False,
+        "grupos": {}
+    }
+
+def guardar_control(control, ruta):
+    """Escribir el archivo de control de forma atómica"""
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(control, archivo, indent=2, ensure_ascii=False)
+        archivo.write("\n")
+    os.replace(temporal, ruta)
+
+def barrer_grupo(id_grupo):
+    """Detección de moras de un grupo con su tiempo; los errores quedan en el resultado"""
+    inicio = time.perf_counter()
+    try:
+        resumen = detectar_moras_grupo(id_grupo) or {}
+        resultado = {
+            "prestamos_mora": resumen.get("prestamos_mora", 0),
+            "multas_generadas": resumen.get("multas_generadas", 0)
+        }
+    except Exception as e:
+        resultado = {"error": str(e)}
+    resultado["ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resultado
+
+def barrido_moras(id_distrito=None, hilos=HILOS_DEFECTO, ruta_control=ARCHIVO_CONTROL, reiniciar=False):
+    """Barrer los grupos pendientes del barrido en curso; retorna el control final"""
+    control = cargar_control(ruta_control, id_distrito, reiniciar)
+    # Los grupos con error se reintentan al retomar
+    pendientes = [
+        id_grupo for id_grupo in obtener_grupos_a_barrer(id_distrito)
+        if str(id_grupo) not in control["grupos"] or "error" in control["grupos"][str(id_grupo)]
+    ]
+    print(f"{len(pendientes)} grupos pendientes ({len(control['grupos'])} ya procesados)", file=sys.stderr)
+
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        futuros = {pool.submit(barrer_grupo, id_grupo): id_grupo for id_grupo in pendientes}
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            id_grupo = futuros[futuro]
+            resultado = futuro.result()
+            with lock:
+                control["grupos"][str(id_grupo)] = resultado
+                guardar_control(control, ruta_control)
+            if "error" in resultado:
+                print(f"  grupo {id_grupo}: ERROR {resultado['error']}", file=sys.stderr)
+            elif n % 50 == 0 or n == len(pendientes):
+                print(f"  {n}/{len(pendientes)} grupos", file=sys.stderr)
+
+    # Foto diaria de la cartera en riesgo (se reescribe si ya existe la de hoy)
+    inicio = time.perf_counter()
+    refrescar_cartera_diaria(id_distrito=id_distrito)
+    print(f"cartera_mora_diaria actualizada en {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
+
+    # Alertas resueltas antiguas, en lotes acotados
+    if id_distrito is None:
+        eliminadas = limpiar_alertas_resueltas()
+    else:
+        eliminadas = sum(limpiar_alertas_resueltas(id_grupo) for id_grupo in obtener_grupos_a_barrer(id_distrito))
+    print(f"{eliminadas:,} alertas resueltas eliminadas", file=sys.stderr)
+
+    control["completo"] = not any("error" in r for r in control["grupos"].values())
+    control["fin"] = datetime.now().isoformat(timespec="seconds")
+    guardar_control(control, ruta_control)
+    return control
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detección de moras en todos los grupos activos")
+    parser.add_argument("--sqlite", metavar="RUTA", help="usar una base SQLite local (por defecto: st.secrets['db'])")
+    parser.add_argument("--distrito", type=int, help="solo los grupos activos de este distrito")
+    parser.add_argument("--hilos", type=int, default=HILOS_DEFECTO, help="grupos procesados en paralelo")
+    parser.add_argument("--control", default=ARCHIVO_CONTROL, help="archivo de control para retomar el barrido")
+    parser.add_argument("--reiniciar", action="store_true", help="ignorar el progreso guardado y empezar de nuevo")
+    args = parser.parse_args(argv)
+
+    # Fuera de "streamlit run" las llamadas a st.* solo generan advertencias
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    if args.sqlite:
+        configurar_bd(motor="sqlite", ruta=args.sqlite)
+
+    inicio = time.perf_counter()
+    control = barrido_moras(args.distrito, args.hilos, args.control, args.reiniciar)
+
+    resultados = list(control["grupos"].values())
+    errores = [r for r in resultados if "error" in r]
+    tiempos = sorted(r["ms"] for r in resultados)
+    print(f"Grupos:            {len(resultados):>8,}")
+    print(f"Préstamos en mora: {sum(r.get('prestamos_mora', 0) for r in resultados):>8,}")
+    print(f"Multas generadas:  {sum(r.get('multas_generadas', 0) for r in resultados):>8,}")
+    print(f"Errores:           {len(errores):>8,}")
+    if tiempos:
+        print(f"ms por grupo:      mediana {tiempos[len(tiempos) // 2]:.1f}, máximo {tiempos[-1]:.1f}")
+    print(f"Tiempo: {time.perf_counter() - inicio:.1f} s")
+
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+
+from modules.database import (
+    configurar_bd, ejecutar_comando, ejecutar_consulta, iniciar_ejecucion, iniciar_render,
+    invalidar_cache, obtener_metricas_render, transaccion
+)
+from scripts.generar_datos import generar_datos
+
+# =============================================================================
+# BENCHMARK DE LAS RUTAS FINANCIERAS CRÍTICAS
+# =============================================================================
+# Genera un conjunto de datos sintético en SQLite (en memoria, misma semilla en
+# cada corrida) y mide cada ruta: tiempo (mediana de N repeticiones), cantidad
+# de consultas y memoria pico de Python. Compara contra la línea base guardada
+# en scripts/benchmark_base.json.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m scripts.benchmark                   # medir y comparar con la base
+#   python -m scripts.benchmark --guardar-base    # medir y guardar como base
+#
+# Retorna código 1 si algún caso hace más consultas que la base o es más lento
+# que la tolerancia. Casi todos los casos tardan pocos milisegundos y su tiempo
+# varía de una corrida a otra más que la tolerancia: un aumento de tiempo solo
+# cuenta si además supera MS_MINIMO_REGRESION, y los tiempos solo se comparan
+# con al menos REPETICIONES_MINIMAS_TIEMPO repeticiones. Los casos que escriben
+# se ejecutan en una transacción que se revierte, para que todas las
+# repeticiones vean los mismos datos.
+
+RUTA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_base.json")
+
+PARAMETROS_DEFECTO = {
+    "grupos": 100,
+    "socios_por_grupo": 40,
+    "ciclos": 3,
+    "semilla": 42,
+}
+REPETICIONES_DEFECTO = 9
+REPETICIONES_MINIMAS_TIEMPO = 5  # con menos, los tiempos se informan pero no se comparan
+TOLERANCIA_DEFECTO = 25  # % de tiempo adicional permitido frente a la base
+MS_MINIMO_REGRESION = 2.0  # y además al menos estos ms más que la base
+
+class _Revertir(Exception):
+    """Señal para deshacer los cambios de un caso que escribe en la base"""
+
+@contextmanager
+def _aislado(revertir):
+    """Ejecutar el bloque en una transacción que se revierte al final"""
+    if not revertir:
+        yield
+        return
+    try:
+        with transaccion():
+            yield
+            raise _Revertir()
+    except _Revertir:
+        pass
+
+# =============================================================================
+# CASOS
+# =============================================================================
+# Cada caso tiene una función preparar(contexto) que retorna los argumentos (no
+# se mide) y la función a medir. "llamadas" repite funciones puras muy rápidas.
+
+def _seleccionar_grupo():
+    """Grupo con más préstamos vencidos (así la detección de moras tiene trabajo)"""
+    resultado = ejecutar_consulta("""
+        SELECT s.id_grupo, COUNT(*) as vencidos
+        FROM prestamo p
+        JOIN socios s ON p.id_socio = s.id_socio
+        WHERE p.id_estado_prestamo = 2 AND p.fecha_vencimiento < CURDATE()
+        GROUP BY s.id_grupo
+        ORDER BY vencidos DESC, s.id_grupo
+        LIMIT 1
+    """)
+    return resultado[0]['id_grupo'] if resultado else 1
+
+def _ultimo_ahorro(id_grupo):
+    return ejecutar_consulta("""
+        SELECT a.id_ahorro
+        FROM ahorro a
+        JOIN sesion s ON a.id_sesion = s.id_sesion
+        WHERE s.id_grupo = %s
+        ORDER BY s.fecha_sesion DESC
+        LIMIT 1
+    """, (id_grupo,))[0]['id_ahorro']
+
+def _ultimo_prestamo_aprobado(id_grupo):
+    return ejecutar_consulta("""
+        SELECT p.id_prestamo
+        FROM prestamo p
+        JOIN socios s ON p.id_socio = s.id_socio
+        WHERE s.id_grupo = %s AND p.id_estado_prestamo IN (2, 4) AND p.fecha_desembolso IS NOT NULL
+        ORDER BY p.id_prestamo DESC
+        LIMIT 1
+    """, (id_grupo,))[0]['id_prestamo']
+
+def _datos_cierre(id_grupo):
+    from modules.cierre_ciclo import (
+        calcular_datos_ciclo, calcular_distribucion_proporcional, obtener_info_grupo, obtener_socios_con_ahorro
+    )
+    datos_ciclo = calcular_datos_ciclo(id_grupo)
+    utilidades = float(datos_ciclo['intereses_cobrados']) + float(datos_ciclo['multas_cobradas'])
+    distribucion = calcular_distribucion_proporcional(obtener_socios_con_ahorro(id_grupo), utilidades)
+    return obtener_info_grupo(id_grupo), datos_ciclo, distribucion
+
+def _datos_reunion(id_grupo):
+    sesion = ejecutar_consulta("""
+        SELECT g.nombre_grupo, g.lugar_reunion, s.fecha_sesion, s.total_presentes,
+               (SELECT COUNT(*) FROM socios WHERE id_grupo = g.id_grupo) as total_socios,
+               (SELECT total_ingresos FROM ahorro WHERE id_sesion = s.id_sesion) as total_ahorro
+        FROM sesion s
+        JOIN grupos g ON s.id_grupo = g.id_grupo
+        WHERE s.id_grupo = %s
+        ORDER BY s.fecha_sesion DESC
+        LIMIT 1
+    """, (id_grupo,))[0]
+    temas = "Revisión de aportes de ahorro\nSolicitudes de préstamo\nSeguimiento de moras"
+    acuerdos = "Se aprueban las solicitudes presentadas\nSe recuerda la puntualidad en los pagos"
+    return sesion, temas, acuerdos
+
+def _datos_prestamo(id_grupo):
+    id_prestamo = _ultimo_prestamo_aprobado(id_grupo)
+    prestamo = ejecutar_consulta("""
+        SELECT g.nombre_grupo, p.fecha_aprobacion, s.nombre, s.apellido, s.telefono, s.direccion,
+               p.monto_solicitado, p.plazo_meses, p.fecha_vencimiento, r.interes as interes_anual,
+               (SELECT SUM(total_programado) FROM detalles_pagos WHERE id_prestamo = p.id_prestamo) as total_pagar
+        FROM prestamo p
+        JOIN socios s ON p.id_socio = s.id_socio
+        JOIN grupos g ON s.id_grupo = g.id_grupo
+        JOIN reglas_grupo r ON g.id_grupo = r.id_grupo
+        WHERE p.id_prestamo = %s
+    """, (id_prestamo,))[0]
+    return (prestamo,)
+
+def _preparar_estadisticas_mora(id_grupo):
+    from modules.moras import actualizar_cartera_prestamos
+    
+    # Con préstamos ya marcados en mora las estadísticas recorren todas sus ramas
+    ejecutar_comando("""
+        UPDATE prestamo SET id_estado_prestamo = 5
+        WHERE id_estado_prestamo = 2 AND fecha_vencimiento < CURDATE()
+        AND id_socio IN (SELECT id_socio FROM socios WHERE id_grupo = %s)
+    """, (id_grupo,))
+    actualizar_cartera_prestamos(id_grupo=id_grupo)
+    return (id_grupo,)
+
+def obtener_casos():
+    """Lista de casos del benchmark (nombre, preparar, función, revertir, llamadas)"""
+    from modules.ahorros import obtener_socios_con_saldo_actual
+    from modules.cierre_ciclo import calcular_datos_ciclo, calcular_distribucion_proporcional, obtener_socios_con_ahorro
+    from modules.moras import ejecutar_deteccion_moras, obtener_estadisticas_mora
+    from modules.prestamos import crear_plan_pagos, obtener_prestamos_activos_grupo
+    from utils.calculos_financieros import calcular_cuotas_prestamo
+    from utils.exportadores import generar_pdf_acta_cierre, generar_pdf_acta_prestamo, generar_pdf_acta_reunion
+
+    return [
+        {"nombre": "calcular_cuotas_prestamo x1000", "funcion": calcular_cuotas_prestamo,
+         "preparar": lambda g: (5000, 0.36, 12), "llamadas": 1000},
+        {"nombre": "crear_plan_pagos", "funcion": crear_plan_pagos,
+         "preparar": lambda g: (_ultimo_prestamo_aprobado(g),), "revertir": True},
+        {"nombre": "obtener_socios_con_saldo_actual", "funcion": obtener_socios_con_saldo_actual,
+         "preparar": lambda g: (g, _ultimo_ahorro(g))},
+        {"nombre": "ejecutar_deteccion_moras", "funcion": ejecutar_deteccion_moras,
+         "preparar": lambda g: (g,), "revertir": True},
+        {"nombre": "obtener_estadisticas_mora", "funcion": obtener_estadisticas_mora,
+         "preparar": _preparar_estadisticas_mora, "revertir": True},
+        {"nombre": "calcular_datos_ciclo", "funcion": calcular_datos_ciclo,
+         "preparar": lambda g: (g,)},
+        {"nombre": "calcular_distribucion_proporcional x100", "funcion": calcular_distribucion_proporcional,
+         "preparar": lambda g: (obtener_socios_con_ahorro(g), 1500.0), "llamadas": 100},
+        {"nombre": "obtener_prestamos_activos_grupo", "funcion": obtener_prestamos_activos_grupo,
+         "preparar": lambda g: (g,)},
+        {"nombre": "generar_pdf_acta_cierre", "funcion": generar_pdf_acta_cierre,
+         "preparar": _datos_cierre},
+        {"nombre": "generar_pdf_acta_reunion", "funcion": generar_pdf_acta_reunion,
+         "preparar": _datos_reunion},
+        {"nombre": "generar_pdf_acta_prestamo", "funcion": generar_pdf_acta_prestamo,
+         "preparar": _datos_prestamo},
+    ]
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+def _medir_una_vez(caso, id_grupo, memoria=False):
+    """Ejecutar el caso una vez; retorna (ms, consultas, memoria pico en KB)"""
+    with _aislado(caso.get("revertir", False)):
+        argumentos = caso["preparar"](id_grupo)
+
+        # Medición en frío: sin caché de proceso ni memo del rerun
+        invalidar_cache()
+        iniciar_ejecucion()
+        iniciar_render(caso["nombre"])
+        if memoria:
+            tracemalloc.start()
+
+        inicio = time.perf_counter()
+        for _ in range(caso.get("llamadas", 1)):
+            caso["funcion"](*argumentos)
+        ms = (time.perf_counter() - inicio) * 1000
+
+        pico_kb = 0
+        if memoria:
+            pico_kb = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+        consultas = obtener_metricas_render()['total_consultas']
+
+    return ms, consultas, pico_kb
+
+def ejecutar_benchmark(repeticiones=REPETICIONES_DEFECTO, casos=None, filtro=None):
+    """Medir todos los casos sobre la base configurada; retorna {nombre: resultado}"""
+    id_grupo = _seleccionar_grupo()
+    resultados = {}
+    for caso in casos or obtener_casos():
+        if filtro and filtro not in caso["nombre"]:
+            continue
+        tiempos = []
+        consultas = 0
+        try:
+            for _ in range(repeticiones):
+                ms, consultas, _ = _medir_una_vez(caso, id_grupo)
+                tiempos.append(ms)
+            # La memoria se mide en una pasada aparte: tracemalloc distorsiona los tiempos
+            _, _, pico_kb = _medir_una_vez(caso, id_grupo, memoria=True)
+        except Exception as e:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            resultados[caso["nombre"]] = {"error": str(e)}
+            continue
+        resultados[caso["nombre"]] = {
+            "ms": round(statistics.median(tiempos), 2),
+            "consultas": consultas,
+            "memoria_kb": round(pico_kb, 1),
+        }
+    return resultados
+
+# =============================================================================
+# LÍNEA BASE Y REPORTE
+# =============================================================================
+
+def cargar_base(ruta=RUTA_BASE):
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+def guardar_base(parametros, resultados, ruta=RUTA_BASE):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump({"parametros": parametros, "resultados": resultados}, archivo, indent=2, ensure_ascii=False)
+        archivo.write("\n")
+
+def comparar(resultados, base, tolerancia=TOLERANCIA_DEFECTO, ms_minimo=MS_MINIMO_REGRESION, comparar_tiempo=True):
+    """Filas del reporte y lista de regresiones frente a la base.
+
+    Consultas de más siempre son regresión; el tiempo, solo si comparar_tiempo
+    y el aumento supera la tolerancia (%) y ms_minimo (ms).
+    """
+    filas = []
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = (base or {}).get("resultados", {}).get(nombre)
+        if "error" in actual:
+            filas.append((nombre, None, None, None, f"ERROR: {actual['error']}"))
+            if anterior and "error" not in anterior:
+                regresiones.append(f"{nombre}: falla ({actual['error']})")
+            continue
+        cambio = ""
+        if anterior and "error" not in anterior:
+            variacion = (actual["ms"] - anterior["ms"]) / anterior["ms"] * 100 if anterior["ms"] else 0
+            cambio = f"{variacion:+.0f}% | {anterior['consultas']} -> {actual['consultas']} consultas"
+            if comparar_tiempo and variacion > tolerancia and actual["ms"] - anterior["ms"] > ms_minimo:
+                regresiones.append(f"{nombre}: {variacion:+.0f}% de tiempo")
+            if actual["consultas"] > anterior["consultas"]:
+                regresiones.append(f"{nombre}: {anterior['consultas']} -> {actual['consultas']} consultas")
+        filas.append((nombre, actual["ms"], actual["consultas"], actual["memoria_kb"], cambio))
+    return filas, regresiones
+
+def imprimir_reporte(filas, regresiones, salida=sys.stdout):
+    print(f"{'Caso':<42}{'ms':>10}{'Consultas':>11}{'Mem. KB':>10}   vs. base", file=salida)
+    print("-" * 100, file=salida)
+    for nombre, ms, consultas, memoria_kb, cambio in filas:
+        if ms is None:
+            print(f"{nombre:<42}{'-':>10}{'-':>11}{'-':>10}   {cambio}", file=salida)
+            continue
+        print(f"{nombre:<42}{ms:>10.2f}{consultas:>11}{memoria_kb:>10.1f}   {cambio}", file=salida)
+    if regresiones:
+        print("\nRegresiones:", file=salida)
+        for regresion in regresiones:
+            print(f"  - {regresion}", file=salida)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de las rutas financieras críticas")
+    parser.add_argument("--grupos", type=int, default=PARAMETROS_DEFECTO["grupos"])
+    parser.add_argument("--socios-por-grupo", type=int, default=PARAMETROS_DEFECTO["socios_por_grupo"])
+    parser.add_argument("--ciclos", type=int, default=PARAMETROS_DEFECTO["ciclos"])
+    parser.add_argument("--semilla", type=int, default=PARAMETROS_DEFECTO["semilla"])
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES_DEFECTO)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_DEFECTO, help="%% de tiempo extra permitido")
+    parser.add_argument("--ms-minimo", type=float, default=MS_MINIMO_REGRESION, help="ms extra mínimos para contar una regresión de tiempo")
+    parser.add_argument("--caso", help="medir solo los casos cuyo nombre contenga este texto")
+    parser.add_argument("--guardar-base", action="store_true", help="guardar los resultados como nueva línea base")
+    parser.add_argument("--base", default=RUTA_BASE, help="archivo de línea base")
+    args = parser.parse_args(argv)
+
+    # Fuera de "streamlit run" las llamadas a st.* solo generan advertencias
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    configurar_bd(motor="sqlite", ruta=":memory:")
+
+    parametros = {
+        "grupos": args.grupos, "socios_por_grupo": args.socios_por_grupo,
+        "ciclos": args.ciclos, "semilla": args.semilla
+    }
+    inicio = time.perf_counter()
+    generar_datos(
+        distritos=max(1, args.grupos // 50), promotores=max(1, args.grupos // 10), grupos=args.grupos,
+        socios_por_grupo=args.socios_por_grupo, ciclos=args.ciclos, semilla=args.semilla, hoy=date.today()
+    )
+    print(f"Datos generados en {time.perf_counter() - inicio:.1f} s ({parametros})", file=sys.stderr)
+
+    resultados = ejecutar_benchmark(args.repeticiones, filtro=args.caso)
+
+    base = cargar_base(args.base)
+    if base and base.get("parametros") != parametros:
+        print("⚠️ La línea base se midió con otros parámetros; no se compara", file=sys.stderr)
+        base = None
+
+    comparar_tiempo = args.repeticiones >= REPETICIONES_MINIMAS_TIEMPO
+    if base and not comparar_tiempo:
+        print(
+            f"⚠️ Menos de {REPETICIONES_MINIMAS_TIEMPO} repeticiones: solo se comparan las consultas",
+            file=sys.stderr
+        )
+    filas, regresiones = comparar(resultados, base, args.tolerancia, args.ms_minimo, comparar_tiempo)
+    imprimir_reporte(filas, regresiones)
+
+    if args.guardar_base:
+        if args.caso and base:
+            resultados = {**base["resultados"], **resultados}
+        guardar_base(parametros, resultados, args.base)
+        print(f"Línea base guardada en {args.base}", file=sys.stderr)
+        return 0
+
+    return 1 if regresiones else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
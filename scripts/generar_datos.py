@@ -0,0 +1,470 @@
+import argparse
+import bisect
+import logging
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from modules.ahorros import actualizar_saldos_socio
+from modules.caja import actualizar_saldo_grupo
+from modules.moras import actualizar_cartera_prestamos
+from modules.reuniones import MOTIVO_MULTA_INASISTENCIA
+from modules.database import configurar_bd, ejecutar_lote, inicializar_bd, transaccion
+from utils.calculos_financieros import calcular_cuotas_prestamo
+
+# =============================================================================
+# GENERADOR DE DATOS SINTÉTICOS (PRUEBAS DE ESCALA)
+# =============================================================================
+# Llena el esquema con un volumen realista y reproducible (misma semilla y misma
+# fecha de referencia = mismos datos): distritos, promotores, grupos con sus
+# reglas, socios, sesiones semanales con asistencia, multas, ahorro, caja,
+# préstamos con su plan de pagos y cierres de los ciclos ya terminados.
+#
+# Por defecto escribe en una base SQLite local (datos_sinteticos.db). Escribir
+# en la base de st.secrets["db"] (MySQL) exige --mysql --yes: nunca debe
+# apuntarse a la base de producción.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m scripts.generar_datos --sqlite bench.db --grupos 500 --socios-por-grupo 40
+#   python -m scripts.generar_datos --mysql --yes --grupos 50   # base de pruebas en st.secrets["db"]
+
+NOMBRES = [
+    "María", "José", "Ana", "Juan", "Rosa", "Carlos", "Lucía", "Luis", "Carmen", "Pedro",
+    "Marta", "Jorge", "Elena", "Miguel", "Sofía", "Francisco", "Isabel", "Manuel", "Teresa", "David",
+    "Gloria", "Óscar", "Patricia", "Raúl", "Dolores", "Mario", "Reina", "Santos", "Lidia", "Ramón"
+]
+APELLIDOS = [
+    "López", "Martínez", "Hernández", "García", "Rodríguez", "Flores", "Mejía", "Reyes", "Cruz", "Castillo",
+    "Díaz", "Sánchez", "Pérez", "Ramírez", "Rivera", "Gómez", "Zelaya", "Aguilar", "Ortiz", "Mendoza",
+    "Velásquez", "Romero", "Vásquez", "Torres", "Bonilla", "Murillo", "Ordóñez", "Paz", "Molina", "Maradiaga"
+]
+MUNICIPIOS = ["Tegucigalpa", "San Pedro Sula", "Choluteca", "La Ceiba", "Comayagua", "Juticalpa", "Danlí", "Santa Rosa"]
+DIAS_REUNION = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+JUSTIFICACIONES = ["Enfermedad", "Trabajo", "Viaje", "Cuidado de familiar"]
+PROPOSITOS = ["Capital de trabajo", "Compra de mercadería", "Mejoras a vivienda", "Educación", "Salud", "Siembra"]
+APORTES = [0, 5, 10, 10, 15, 20, 20, 25, 30, 50]
+
+PROB_ASISTENCIA = 0.88
+PROB_JUSTIFICADA = 0.3
+PROB_MULTA_PAGADA = 0.7
+PROB_SOLICITUD = 0.02
+PROB_RECHAZO = 0.05
+PROB_MOROSO = 0.1
+
+ARCHIVO_SQLITE_DEFECTO = "datos_sinteticos.db"
+
+DEFECTOS = {
+    "distritos": 10,
+    "promotores": 50,
+    "grupos": 500,
+    "socios_por_grupo": 40,
+    "ciclos": 3,
+    "meses_ciclo": 6,
+    "semilla": 42,
+}
+
+def _fechas_ciclos(rng, ciclos, meses_ciclo, hoy):
+    """Rangos (inicio, fin) de los ciclos de un grupo; el último sigue abierto"""
+    semanas_ciclo = round(meses_ciclo * 52 / 12)
+    # El ciclo actual va entre el 20% y el 90% de su duración
+    avance = timedelta(weeks=rng.randint(max(1, semanas_ciclo // 5), max(1, semanas_ciclo * 9 // 10)))
+    inicio_actual = hoy - avance
+    rangos = []
+    for i in range(ciclos):
+        inicio = inicio_actual - timedelta(weeks=semanas_ciclo * (ciclos - 1 - i))
+        rangos.append((inicio, inicio + timedelta(weeks=semanas_ciclo) - timedelta(days=1)))
+    return rangos
+
+def _crear_catalogos(rng, opciones, hoy):
+    """Insertar distritos, promotores, grupos y reglas; retorna la lista de grupos"""
+    ids_distritos = ejecutar_lote(
+        "INSERT INTO distrito (nombre_distrito, municipio) VALUES (%s, %s)",
+        [(f"Distrito {i + 1:03d}", rng.choice(MUNICIPIOS)) for i in range(opciones["distritos"])]
+    )
+
+    ids_promotores = ejecutar_lote(
+        "INSERT INTO promotores (nombre, apellido, tele, direccion, id_distrito, activo) VALUES (%s, %s, %s, %s, %s, 1)",
+        [
+            (rng.choice(NOMBRES), rng.choice(APELLIDOS), f"9{rng.randint(1000000, 9999999)}",
+             f"Colonia {rng.choice(APELLIDOS)}", rng.choice(ids_distritos))
+            for _ in range(opciones["promotores"])
+        ]
+    )
+
+    grupos = []
+    for i in range(opciones["grupos"]):
+        ciclos = _fechas_ciclos(rng, opciones["ciclos"], opciones["meses_ciclo"], hoy)
+        grupos.append({
+            "nombre_grupo": f"Grupo {i + 1:04d}",
+            "id_distrito": rng.choice(ids_distritos),
+            "id_promotor": rng.choice(ids_promotores),
+            "ciclos": ciclos,
+            "cantidad_multa": rng.choice([5, 10, 10, 15, 20, 25]),
+            "interes": rng.choice([2, 3, 3, 4, 5]),
+            "montomax_prestamo": rng.choice([1000, 2000, 3000, 5000]),
+            "n_socios": max(5, round(opciones["socios_por_grupo"] * rng.uniform(0.75, 1.25))),
+        })
+
+    ids_grupos = ejecutar_lote("""
+        INSERT INTO grupos (nombre_grupo, id_distrito, fecha_creacion, id_promotor, id_frecuencia,
+                            hora_reunion, lugar_reunion, dia_reunion, estado)
+        VALUES (%s, %s, %s, %s, 1, %s, %s, %s, 'ACTIVO')
+    """, [
+        (g["nombre_grupo"], g["id_distrito"], g["ciclos"][0][0], g["id_promotor"],
+         f"{rng.randint(7, 17):02d}:00:00", f"Casa comunal {rng.choice(APELLIDOS)}", rng.choice(DIAS_REUNION))
+        for g in grupos
+    ])
+    for grupo, id_grupo in zip(grupos, ids_grupos):
+        grupo["id_grupo"] = id_grupo
+
+    ejecutar_lote("""
+        INSERT INTO reglas_grupo (id_grupo, cantidad_multa, interes, montomax_prestamo, unprestamo_alavez,
+                                  fecha_inicio_ciclo, fecha_fin_ciclo, duracion_ciclo_meses)
+        VALUES (%s, %s, %s, %s, 1, %s, %s, %s)
+    """, [
+        (g["id_grupo"], g["cantidad_multa"], g["interes"], g["montomax_prestamo"],
+         g["ciclos"][-1][0], g["ciclos"][-1][1], opciones["meses_ciclo"])
+        for g in grupos
+    ])
+
+    return grupos
+
+def _generar_grupo(rng, grupo, hoy):
+    """Generar la historia completa de un grupo en una sola transacción"""
+    conteo = {}
+
+    with transaccion():
+        # Socios (~10% con mal historial de pago)
+        ids_socios = ejecutar_lote("""
+            INSERT INTO socios (nombre, apellido, telefono, direccion, id_grupo, id_distrito)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [
+            (rng.choice(NOMBRES), rng.choice(APELLIDOS), f"3{rng.randint(1000000, 9999999)}",
+             f"Barrio {rng.choice(APELLIDOS)}", grupo["id_grupo"], grupo["id_distrito"])
+            for _ in range(grupo["n_socios"])
+        ])
+        puntualidad = {id_socio: 0.5 if rng.random() < PROB_MOROSO else 0.95 for id_socio in ids_socios}
+        conteo["socios"] = len(ids_socios)
+
+        # Sesiones semanales de cada ciclo hasta la fecha de referencia
+        sesiones = []
+        for n_ciclo, (inicio, fin) in enumerate(grupo["ciclos"]):
+            fecha = inicio
+            primera = True
+            while fecha <= min(fin, hoy):
+                sesiones.append({"ciclo": n_ciclo, "fecha": fecha, "primera": primera})
+                primera = False
+                fecha += timedelta(weeks=1)
+
+        for sesion in sesiones:
+            sesion["asistencia"] = {}
+            for id_socio in ids_socios:
+                if rng.random() < PROB_ASISTENCIA:
+                    sesion["asistencia"][id_socio] = (1, None)
+                elif rng.random() < PROB_JUSTIFICADA:
+                    sesion["asistencia"][id_socio] = (0, rng.choice(JUSTIFICACIONES))
+                else:
+                    sesion["asistencia"][id_socio] = (0, None)
+
+        ids_sesiones = ejecutar_lote(
+            "INSERT INTO sesion (id_grupo, fecha_sesion, total_presentes) VALUES (%s, %s, %s)",
+            [
+                (grupo["id_grupo"], s["fecha"], sum(p for p, _ in s["asistencia"].values()))
+                for s in sesiones
+            ]
+        )
+        for sesion, id_sesion in zip(sesiones, ids_sesiones):
+            sesion["id_sesion"] = id_sesion
+            sesion["ingresos"] = []
+            sesion["egresos"] = []
+        fechas_sesiones = [s["fecha"] for s in sesiones]
+        conteo["sesiones"] = len(sesiones)
+
+        def sesion_de(fecha):
+            # Primera sesión en o después de la fecha (None si aún no ocurre)
+            posicion = bisect.bisect_left(fechas_sesiones, fecha)
+            return sesiones[posicion] if posicion < len(sesiones) else None
+
+        # Asistencia y multas por ausencia no justificada
+        filas_asistencia = []
+        filas_multas = []
+        for sesion in sesiones:
+            for id_socio, (presencial, justificacion) in sesion["asistencia"].items():
+                filas_asistencia.append((sesion["id_sesion"], id_socio, presencial, justificacion))
+                if presencial or justificacion:
+                    continue
+                vencimiento = sesion["fecha"] + timedelta(weeks=1)
+                pago = sesion_de(vencimiento) if rng.random() < PROB_MULTA_PAGADA else None
+                filas_multas.append((
+                    sesion["id_sesion"], id_socio, grupo["cantidad_multa"],
+                    grupo["cantidad_multa"] if pago else 0, pago["fecha"] if pago else None,
+                    vencimiento, MOTIVO_MULTA_INASISTENCIA
+                ))
+                if pago:
+                    pago["ingresos"].append((4, id_socio, grupo["cantidad_multa"], "Pago de multa"))
+
+        ejecutar_lote(
+            "INSERT INTO asistencia (id_sesion, id_socio, presencial, justificacion_ausencia) VALUES (%s, %s, %s, %s)",
+            filas_asistencia
+        )
+        ejecutar_lote("""
+            INSERT INTO multa (id_sesion, id_socio, monto_a_pagar, monto_pagado, fecha_pago_real, fecha_vencimiento, motivo)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, filas_multas)
+        conteo["asistencia"] = len(filas_asistencia)
+        conteo["multas"] = len(filas_multas)
+
+        # Préstamos: solicitudes de socios presentes sin préstamo vigente
+        prestamos = []
+        libre_desde = {}
+        ciclo_actual = len(grupo["ciclos"]) - 1
+        for sesion in sesiones:
+            for id_socio, (presencial, _) in sesion["asistencia"].items():
+                if not presencial or libre_desde.get(id_socio, date.min) > sesion["fecha"]:
+                    continue
+                if rng.random() >= PROB_SOLICITUD:
+                    continue
+
+                monto = rng.randrange(100, grupo["montomax_prestamo"] + 1, 50)
+                plazo = rng.choice([3, 4, 6, 6, 8, 10, 12])
+                if sesion["ciclo"] == ciclo_actual and (hoy - sesion["fecha"]).days < 14 and rng.random() < 0.5:
+                    estado = 1
+                elif rng.random() < PROB_RECHAZO:
+                    estado = 3
+                else:
+                    estado = 2
+                prestamos.append({
+                    "id_socio": id_socio, "sesion": sesion, "monto": monto, "plazo": plazo, "estado": estado
+                })
+                if estado == 2:
+                    libre_desde[id_socio] = sesion["fecha"] + timedelta(days=30 * plazo)
+
+        filas_prestamos = []
+        for prestamo in prestamos:
+            sesion = prestamo["sesion"]
+            desembolso = datetime.combine(sesion["fecha"], datetime.min.time()) if prestamo["estado"] == 2 else None
+            filas_prestamos.append((
+                prestamo["id_socio"], grupo["id_grupo"], sesion["fecha"], prestamo["monto"], prestamo["plazo"],
+                rng.choice(PROPOSITOS), prestamo["estado"], sesion["id_sesion"], desembolso, desembolso,
+                desembolso + timedelta(days=30 * prestamo["plazo"]) if desembolso else None,
+                "Capacidad de pago insuficiente" if prestamo["estado"] == 3 else None
+            ))
+        ids_prestamos = ejecutar_lote("""
+            INSERT INTO prestamo (id_socio, id_grupo, fecha_solicitud, monto_solicitado, plazo_meses, proposito,
+                                  id_estado_prestamo, id_sesion_aprobacion, fecha_aprobacion, fecha_desembolso,
+                                  fecha_vencimiento, motivo_rechazo)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, filas_prestamos)
+        conteo["prestamos"] = len(filas_prestamos)
+
+        # Plan de pagos (mismo cálculo que crear_plan_pagos) y pagos ya realizados
+        filas_pagos = []
+        prestamos_pagados = []
+        for prestamo, id_prestamo in zip(prestamos, ids_prestamos):
+            if prestamo["estado"] != 2:
+                continue
+            sesion = prestamo["sesion"]
+            sesion["egresos"].append((3, prestamo["id_socio"], prestamo["monto"], f"Desembolso préstamo #{id_prestamo}"))
+
+            cuotas = calcular_cuotas_prestamo(prestamo["monto"], grupo["interes"] / 100, prestamo["plazo"])
+            todas_pagadas = True
+            for i, cuota in enumerate(cuotas["amortizacion"]):
+                programada = sesion["fecha"] + timedelta(days=30 * (i + 1))
+                capital, interes = round(cuota["capital"], 2), round(cuota["interes"], 2)
+                pago = None
+                if programada <= hoy and rng.random() < puntualidad[prestamo["id_socio"]]:
+                    pago = sesion_de(programada + timedelta(days=rng.randint(-3, 5)))
+                if pago is None:
+                    todas_pagadas = False
+                    filas_pagos.append((
+                        id_prestamo, prestamo["id_socio"], programada, capital, interes, capital + interes,
+                        round(cuotas["cuota_mensual"], 2), 0, 0, None, 0
+                    ))
+                    continue
+                filas_pagos.append((
+                    id_prestamo, prestamo["id_socio"], programada, capital, interes, capital + interes,
+                    round(cuotas["cuota_mensual"], 2), capital, interes, pago["fecha"], capital + interes
+                ))
+                pago["ingresos"].append((1, None, capital + interes, f"Pago de préstamo #{id_prestamo}"))
+
+            # El cierre de ciclo archiva los préstamos abiertos como pagados
+            if todas_pagadas or sesion["ciclo"] < ciclo_actual:
+                prestamos_pagados.append((id_prestamo,))
+
+        ejecutar_lote("""
+            INSERT INTO detalles_pagos (id_prestamo, id_socio, fecha_programada, capital_programado, interes_programado,
+                                        total_programado, cuota_mensual, capital_pagado, interes_pagado,
+                                        fecha_pago, total_pagado)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, filas_pagos)
+        ejecutar_lote("UPDATE prestamo SET id_estado_prestamo = 4 WHERE id_prestamo = %s", prestamos_pagados)
+        conteo["detalles_pagos"] = len(filas_pagos)
+
+        # Ahorro: en la primera sesión del ciclo todos parten de cero
+        saldos = {}
+        filas_ahorro = []
+        detalle_por_sesion = []
+        for sesion in sesiones:
+            if sesion["primera"]:
+                saldos = {id_socio: 0 for id_socio in ids_socios}
+            apertura = sum(saldos.values())
+            detalle = []
+            for id_socio, (presencial, _) in sesion["asistencia"].items():
+                aporte = rng.choice(APORTES) if presencial else 0
+                otros = rng.choice([5, 10]) if presencial and rng.random() < 0.05 else 0
+                if not (aporte or otros or sesion["primera"]):
+                    continue
+                saldo_final = saldos[id_socio] + aporte + otros
+                detalle.append((id_socio, saldos[id_socio], aporte, otros, saldo_final))
+                saldos[id_socio] = saldo_final
+            ingresos = sum(fila[2] + fila[3] for fila in detalle)
+            if ingresos:
+                sesion["ingresos"].append((1, None, ingresos, "Aportes de ahorro"))
+            filas_ahorro.append((sesion["id_sesion"], apertura, ingresos, apertura + ingresos))
+            detalle_por_sesion.append(detalle)
+            sesion["saldos_ahorro"] = dict(saldos)
+
+        ids_ahorro = ejecutar_lote("""
+            INSERT INTO ahorro (id_sesion, saldo_apertura, total_ingresos, saldo_cierre, firma_tesorera, firma_presidenta)
+            VALUES (%s, %s, %s, %s, 'Tesorera', 'Presidenta')
+        """, filas_ahorro)
+        filas_detalle = [
+            (id_socio, id_ahorro, saldo_anterior, aporte, otros, saldo_final)
+            for id_ahorro, detalle in zip(ids_ahorro, detalle_por_sesion)
+            for id_socio, saldo_anterior, aporte, otros, saldo_final in detalle
+        ]
+        ejecutar_lote("""
+            INSERT INTO ahorro_detalle (id_socio, id_ahorro, saldo_ahorro, saldo_ingresado, otras_actividades, saldo_final)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, filas_detalle)
+        conteo["ahorro_detalle"] = len(filas_detalle)
+
+        # Caja: una por sesión con sus movimientos (tipos como en modules/caja.py)
+        saldo_caja = 0
+        filas_caja = []
+        for sesion in sesiones:
+            if rng.random() < 0.1:
+                sesion["egresos"].append((6, None, rng.choice([10, 20, 30]), "Gastos operativos"))
+            ingresos = sum(m[2] for m in sesion["ingresos"])
+            egresos = sum(m[2] for m in sesion["egresos"])
+            filas_caja.append((sesion["id_sesion"], saldo_caja, ingresos, egresos, saldo_caja + ingresos - egresos))
+            saldo_caja += ingresos - egresos
+            sesion["saldo_caja"] = saldo_caja
+
+        ids_caja = ejecutar_lote("""
+            INSERT INTO caja (id_sesion, saldo_apertura, total_ingresos, total_egresos, saldo_cierre, firma_tesorera, firma_presidenta)
+            VALUES (%s, %s, %s, %s, %s, 'Tesorera', 'Presidenta')
+        """, filas_caja)
+        filas_movimientos = [
+            (id_caja, tipo, id_socio, monto, descripcion,
+             datetime.combine(sesion["fecha"], datetime.min.time()) + timedelta(hours=rng.randint(8, 17)))
+            for sesion, id_caja in zip(sesiones, ids_caja)
+            for tipo, id_socio, monto, descripcion in sesion["ingresos"] + sesion["egresos"]
+        ]
+        ejecutar_lote("""
+            INSERT INTO movimiento_de_caja (id_caja, id_tipomovimiento, id_socio, monto, descripcion, hora_registro)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, filas_movimientos)
+        conteo["movimientos_caja"] = len(filas_movimientos)
+
+        # Cierres de los ciclos terminados con reparto proporcional al ahorro
+        for n_ciclo in range(ciclo_actual):
+            ultima = [s for s in sesiones if s["ciclo"] == n_ciclo][-1]
+            ahorro_total = sum(ultima["saldos_ahorro"].values())
+            ganancia = round(sum(
+                m[2] for s in sesiones if s["ciclo"] == n_ciclo
+                for m in s["ingresos"] if m[0] == 4
+            ) + sum(p["monto"] for p in prestamos if p["sesion"]["ciclo"] == n_ciclo and p["estado"] == 2) * grupo["interes"] / 100, 2)
+            id_ciclo = ejecutar_lote("""
+                INSERT INTO cierre_de_ciclo (id_grupo, fecha_cierre, total_ahorro_grupo, total_ganancia_grupo,
+                                             saldo_cierre_caja, firma_presidenta, firma_secretaria, firma_tesorera)
+                VALUES (%s, %s, %s, %s, %s, 'Presidenta', 'Secretaria', 'Tesorera')
+            """, [(grupo["id_grupo"], grupo["ciclos"][n_ciclo][1], ahorro_total, ganancia, ultima["saldo_caja"])])[0]
+
+            filas_cierre = []
+            for id_socio, saldo in ultima["saldos_ahorro"].items():
+                porcion = round(ganancia * saldo / ahorro_total, 2) if ahorro_total else 0
+                filas_cierre.append((id_ciclo, id_socio, saldo, porcion, saldo + porcion))
+            ejecutar_lote("""
+                INSERT INTO detalle_cierre_de_ciclo (id_ciclo, id_socio, saldo_final_ahorrado, porcion_fondo_grupo, retiro_final)
+                VALUES (%s, %s, %s, %s, %s)
+            """, filas_cierre)
+
+        actualizar_saldos_socio(id_grupo=grupo["id_grupo"])
+        actualizar_saldo_grupo(id_grupo=grupo["id_grupo"])
+        actualizar_cartera_prestamos(id_grupo=grupo["id_grupo"])
+
+    return conteo
+
+def generar_datos(distritos=DEFECTOS["distritos"], promotores=DEFECTOS["promotores"], grupos=DEFECTOS["grupos"],
+                  socios_por_grupo=DEFECTOS["socios_por_grupo"], ciclos=DEFECTOS["ciclos"],
+                  meses_ciclo=DEFECTOS["meses_ciclo"], semilla=DEFECTOS["semilla"], hoy=None, progreso=None):
+    """Generar el conjunto de datos sintético sobre la base configurada.
+
+    Retorna un diccionario con la cantidad de filas creadas por tabla.
+    """
+    hoy = hoy or date.today()
+    rng = random.Random(semilla)
+    opciones = {
+        "distritos": distritos, "promotores": promotores, "grupos": grupos,
+        "socios_por_grupo": socios_por_grupo, "ciclos": ciclos, "meses_ciclo": meses_ciclo
+    }
+
+    inicializar_bd()
+    with transaccion():
+        lista_grupos = _crear_catalogos(rng, opciones, hoy)
+
+    totales = {"distritos": distritos, "promotores": promotores, "grupos": grupos}
+    for n, grupo in enumerate(lista_grupos, 1):
+        # Una semilla por grupo: el contenido de cada grupo no depende de los demás
+        conteo = _generar_grupo(random.Random(f"{semilla}-{n}"), grupo, hoy)
+        for tabla, cantidad in conteo.items():
+            totales[tabla] = totales.get(tabla, 0) + cantidad
+        if progreso:
+            progreso(n, len(lista_grupos))
+
+    return totales
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos para pruebas de escala")
+    destino = parser.add_mutually_exclusive_group()
+    destino.add_argument("--sqlite", metavar="RUTA", default=ARCHIVO_SQLITE_DEFECTO,
+                         help=f"base SQLite local (por defecto: {ARCHIVO_SQLITE_DEFECTO})")
+    destino.add_argument("--mysql", action="store_true", help="escribir en la base de st.secrets['db'] (requiere --yes)")
+    parser.add_argument("--yes", action="store_true", help="confirmar que la base MySQL es de pruebas")
+    parser.add_argument("--distritos", type=int, default=DEFECTOS["distritos"])
+    parser.add_argument("--promotores", type=int, default=DEFECTOS["promotores"])
+    parser.add_argument("--grupos", type=int, default=DEFECTOS["grupos"])
+    parser.add_argument("--socios-por-grupo", type=int, default=DEFECTOS["socios_por_grupo"])
+    parser.add_argument("--ciclos", type=int, default=DEFECTOS["ciclos"], help="ciclos por grupo (el último queda abierto)")
+    parser.add_argument("--meses-ciclo", type=int, default=DEFECTOS["meses_ciclo"])
+    parser.add_argument("--semilla", type=int, default=DEFECTOS["semilla"])
+    parser.add_argument("--hoy", type=date.fromisoformat, default=None, help="fecha de referencia AAAA-MM-DD")
+    args = parser.parse_args(argv)
+    if args.mysql and not args.yes:
+        parser.error("--mysql escribe datos ficticios en la base de st.secrets['db']; confirme con --yes")
+
+    # Fuera de "streamlit run" las llamadas a st.* solo generan advertencias
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    if not args.mysql:
+        configurar_bd(motor="sqlite", ruta=args.sqlite)
+        print(f"Base SQLite: {args.sqlite}", file=sys.stderr)
+
+    def progreso(n, total):
+        if n % 50 == 0 or n == total:
+            print(f"  {n}/{total} grupos", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    totales = generar_datos(
+        distritos=args.distritos, promotores=args.promotores, grupos=args.grupos,
+        socios_por_grupo=args.socios_por_grupo, ciclos=args.ciclos, meses_ciclo=args.meses_ciclo,
+        semilla=args.semilla, hoy=args.hoy, progreso=progreso
+    )
+
+    for tabla, cantidad in totales.items():
+        print(f"{tabla:<18} {cantidad:>10,}")
+    print(f"Tiempo: {time.perf_counter() - inicio:.1f} s")
+
+if __name__ == "__main__":
+    main()
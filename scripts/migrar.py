@@ -0,0 +1,62 @@
+import argparse
+import logging
+import sys
+
+from modules.database import configurar_bd
+from modules.migraciones import MIGRACIONES, aplicar_migracion, migraciones_pendientes
+from scripts.reconstruir_saldos import reconstruir
+
+# =============================================================================
+# MIGRACIONES DEL ESQUEMA
+# =============================================================================
+# Pone al día una base existente con config/esquema.sql (ver
+# modules/migraciones.py) y llena las tablas materializadas que crea. Se
+# detiene en la primera migración bloqueada por los datos, con el motivo, y
+# sale con código 1.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m scripts.migrar                 # usa st.secrets["db"]
+#   python -m scripts.migrar --estado        # solo listar
+#   python -m scripts.migrar --sqlite bench.db
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aplicar las migraciones pendientes del esquema")
+    parser.add_argument("--sqlite", metavar="RUTA", help="usar una base SQLite local (por defecto: st.secrets['db'])")
+    parser.add_argument("--estado", action="store_true", help="listar las migraciones sin aplicarlas")
+    args = parser.parse_args(argv)
+
+    # Fuera de "streamlit run" las llamadas a st.* solo generan advertencias
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    if args.sqlite:
+        configurar_bd(motor="sqlite", ruta=args.sqlite)
+
+    pendientes = migraciones_pendientes()
+    if args.estado:
+        for migracion in MIGRACIONES:
+            estado = "pendiente" if migracion in pendientes else "aplicada"
+            print(f"{migracion['nombre']:<32} {estado:<10} {migracion['descripcion']}")
+        return 0
+
+    if not pendientes:
+        print("El esquema está al día")
+        return 0
+
+    codigo = 0
+    por_reconstruir = set()
+    for migracion in pendientes:
+        try:
+            aplicar_migracion(migracion)
+        except ValueError as e:
+            print(f"Migración bloqueada: {e}", file=sys.stderr)
+            codigo = 1
+            break
+        print(f"{migracion['nombre']}: aplicada")
+        por_reconstruir.update(migracion.get('reconstruir', []))
+
+    # También si otra quedó bloqueada: una tabla ya creada no se volvería a llenar
+    if por_reconstruir:
+        reconstruir(por_reconstruir)
+    return codigo
+
+if __name__ == "__main__":
+    sys.exit(main())
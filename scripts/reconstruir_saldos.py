@@ -0,0 +1,62 @@
+import argparse
+import logging
+import sys
+import time
+
+from modules.ahorros import reconstruir_saldos_socio
+from modules.caja import reconstruir_saldos_grupo
+from modules.database import configurar_bd
+from modules.migraciones import migraciones_pendientes
+from modules.moras import reconstruir_cartera
+
+# =============================================================================
+# RECONSTRUCCIÓN DE SALDOS MATERIALIZADOS
+# =============================================================================
+# Recalcula saldo_socio desde ahorro_detalle, saldo_grupo desde ahorro y caja,
+# y cartera_prestamo desde prestamo y detalles_pagos.
+# scripts.migrar lo ejecuta al crear esas tablas en una base existente; a mano
+# solo hace falta si se escribieron esas tablas por fuera de la aplicación.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m scripts.reconstruir_saldos                 # usa st.secrets["db"]
+#   python -m scripts.reconstruir_saldos --grupo 12
+#   python -m scripts.reconstruir_saldos --sqlite bench.db
+
+# Tabla -> (función de reconstrucción, qué cuenta el total)
+RECONSTRUCCIONES = {
+    'saldo_socio': (reconstruir_saldos_socio, "socios"),
+    'saldo_grupo': (reconstruir_saldos_grupo, "grupos"),
+    'cartera_prestamo': (reconstruir_cartera, "préstamos"),
+}
+
+def reconstruir(tablas=None, id_grupo=None):
+    """Reconstruir las tablas indicadas (todas por defecto), en orden, informando el avance"""
+    for tabla, (funcion, unidad) in RECONSTRUCCIONES.items():
+        if tablas is not None and tabla not in tablas:
+            continue
+        inicio = time.perf_counter()
+        total = funcion(id_grupo)
+        print(f"{tabla}: {total:,} {unidad} en {time.perf_counter() - inicio:.1f} s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconstruir las tablas saldo_socio, saldo_grupo y cartera_prestamo")
+    parser.add_argument("--sqlite", metavar="RUTA", help="usar una base SQLite local (por defecto: st.secrets['db'])")
+    parser.add_argument("--grupo", type=int, help="reconstruir solo este grupo")
+    args = parser.parse_args(argv)
+
+    # Fuera de "streamlit run" las llamadas a st.* solo generan advertencias
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    if args.sqlite:
+        configurar_bd(motor="sqlite", ruta=args.sqlite)
+
+    pendientes = migraciones_pendientes()
+    if pendientes:
+        nombres = ", ".join(migracion['nombre'] for migracion in pendientes)
+        print(f"Migraciones pendientes ({nombres}); ejecute primero: python -m scripts.migrar", file=sys.stderr)
+        return 1
+
+    reconstruir(id_grupo=args.grupo)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
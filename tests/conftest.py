@@ -0,0 +1,20 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# Las pruebas importan los módulos de la app desde la raíz del proyecto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.database import configurar_bd
+from scripts.generar_datos import generar_datos
+
+@pytest.fixture(scope="session")
+def base_sqlite(tmp_path_factory):
+    """Base SQLite con un conjunto de datos sintético pequeño (una vez por sesión)"""
+    # Fuera de "streamlit run" las llamadas a st.* solo generan advertencias
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    configurar_bd(motor="sqlite", ruta=str(tmp_path_factory.mktemp("bd") / "pruebas.db"))
+    generar_datos(distritos=2, promotores=2, grupos=3, socios_por_grupo=15, ciclos=2, semilla=7)
+    return True
@@ -0,0 +1,84 @@
+import pytest
+
+from modules.database import ejecutar_consulta, sin_n_mas_1
+
+# =============================================================================
+# LECTURAS SIN CONSULTAS N+1
+# =============================================================================
+# Las lecturas reescritas para resolver una página en pocas consultas no deben
+# volver a consultar por socio, préstamo o reunión. Con 15 socios por grupo un
+# N+1 repetiría la misma sentencia más veces que el umbral.
+
+UMBRAL = 3
+
+@pytest.fixture(scope="module")
+def id_grupo(base_sqlite):
+    """Grupo con más socios del conjunto de datos"""
+    return ejecutar_consulta("""
+        SELECT id_grupo FROM socios GROUP BY id_grupo ORDER BY COUNT(*) DESC, id_grupo LIMIT 1
+    """)[0]['id_grupo']
+
+def _ultimo_ahorro(id_grupo):
+    return ejecutar_consulta("""
+        SELECT a.id_ahorro
+        FROM ahorro a
+        JOIN sesion s ON a.id_sesion = s.id_sesion
+        WHERE s.id_grupo = %s
+        ORDER BY s.fecha_sesion DESC, a.id_ahorro DESC
+        LIMIT 1
+    """, (id_grupo,))[0]['id_ahorro']
+
+def _ultima_sesion(id_grupo):
+    return ejecutar_consulta(
+        "SELECT id_sesion FROM sesion WHERE id_grupo = %s ORDER BY fecha_sesion DESC LIMIT 1",
+        (id_grupo,)
+    )[0]['id_sesion']
+
+def test_socios_con_saldo_actual(id_grupo):
+    from modules.ahorros import obtener_socios_con_saldo_actual
+    
+    with sin_n_mas_1(UMBRAL):
+        socios = obtener_socios_con_saldo_actual(id_grupo, _ultimo_ahorro(id_grupo))
+    assert len(socios) > UMBRAL
+
+def test_historial_reuniones(id_grupo):
+    from modules.reuniones import obtener_historial_reuniones
+    
+    with sin_n_mas_1(UMBRAL):
+        reuniones, hay_mas = obtener_historial_reuniones(id_grupo, limite=10)
+        if hay_mas:
+            ultima = reuniones[-1]
+            obtener_historial_reuniones(id_grupo, limite=10, despues_de=(ultima['fecha_sesion'], ultima['id_sesion']))
+    assert reuniones
+
+def test_asistencia_sesion(id_grupo):
+    from modules.reuniones import obtener_asistencia_sesion
+    
+    with sin_n_mas_1(UMBRAL):
+        asistencia = obtener_asistencia_sesion(_ultima_sesion(id_grupo))
+    assert len(asistencia) > UMBRAL
+
+def test_estadisticas_mora(id_grupo):
+    from modules.moras import obtener_estadisticas_mora
+    
+    with sin_n_mas_1(UMBRAL):
+        stats = obtener_estadisticas_mora(id_grupo)
+    assert stats['tasa_mora'] >= 0
+
+def test_prestamos_y_cierre(id_grupo):
+    from modules.cierre_ciclo import calcular_datos_ciclo, obtener_socios_con_ahorro
+    from modules.prestamos import obtener_prestamos_activos_grupo
+    
+    with sin_n_mas_1(UMBRAL):
+        obtener_prestamos_activos_grupo(id_grupo)
+        calcular_datos_ciclo(id_grupo)
+        obtener_socios_con_ahorro(id_grupo)
+
+def test_detecta_un_n_mas_1(id_grupo):
+    """El detector sí falla cuando se consulta una vez por socio"""
+    socios = ejecutar_consulta("SELECT id_socio FROM socios WHERE id_grupo = %s", (id_grupo,))
+    
+    with pytest.raises(AssertionError, match="Consultas N\\+1"):
+        with sin_n_mas_1(UMBRAL):
+            for socio in socios:
+                ejecutar_consulta("SELECT nombre FROM socios WHERE id_socio = %s", (socio['id_socio'],))
@@ -0,0 +1,127 @@
+import pytest
+
+from modules.database import ejecutar_comando, ejecutar_consulta, transaccion
+
+# =============================================================================
+# ESCRITURAS TRANSACCIONALES
+# =============================================================================
+# Las funciones que escriben en varias tablas deben dejar la base consistente:
+# todo o nada dentro de la transacción del que las llama, y sin filas repetidas
+# cuando la misma operación se guarda dos veces.
+
+def _contar(query, params=()):
+    return ejecutar_consulta(query, params)[0]['total']
+
+def test_error_anidado_revierte_la_transaccion_exterior(base_sqlite):
+    """Un helper que atrapa sus errores los relanza si corre dentro de otra transacción"""
+    from modules.caja import actualizar_totales_caja
+
+    sesiones = _contar("SELECT COUNT(*) as total FROM sesion")
+    with pytest.raises(Exception):
+        with transaccion():
+            ejecutar_comando(
+                "INSERT INTO sesion (id_grupo, fecha_sesion, total_presentes) VALUES (%s, %s, 0)",
+                (1, '2099-01-01')
+            )
+            actualizar_totales_caja(-1)  # caja inexistente
+    assert _contar("SELECT COUNT(*) as total FROM sesion") == sesiones
+
+def test_guardar_aportes_lote_dos_veces(base_sqlite):
+    """Guardar la misma sesión dos veces actualiza el aporte en vez de duplicarlo"""
+    from modules.ahorros import crear_registro_ahorro, guardar_aportes_lote
+
+    socio = ejecutar_consulta("""
+        SELECT s.id_socio, s.id_grupo, COALESCE(ss.saldo_actual, 0) as saldo_actual
+        FROM socios s LEFT JOIN saldo_socio ss ON ss.id_socio = s.id_socio
+        ORDER BY s.id_grupo DESC, s.id_socio LIMIT 1
+    """)[0]
+    id_sesion = ejecutar_comando(
+        "INSERT INTO sesion (id_grupo, fecha_sesion, total_presentes) VALUES (%s, %s, 0)",
+        (socio['id_grupo'], '2099-02-01')
+    )
+    id_ahorro = crear_registro_ahorro(id_sesion, 100)
+    saldo = float(socio['saldo_actual'])
+
+    for aporte in (10, 25):
+        aportes = {socio['id_socio']: {
+            'saldo_anterior': saldo, 'aporte_ahorro': aporte, 'otros_ingresos': 0, 'saldo_final': saldo + aporte
+        }}
+        assert guardar_aportes_lote(id_ahorro, aportes, aporte, 100 + aporte)
+
+    assert _contar("SELECT COUNT(*) as total FROM ahorro_detalle WHERE id_ahorro = %s", (id_ahorro,)) == 1
+    encabezado = ejecutar_consulta("SELECT total_ingresos, saldo_cierre FROM ahorro WHERE id_ahorro = %s", (id_ahorro,))[0]
+    assert (float(encabezado['total_ingresos']), float(encabezado['saldo_cierre'])) == (25, 125)
+    saldo_socio = ejecutar_consulta("SELECT saldo_actual FROM saldo_socio WHERE id_socio = %s", (socio['id_socio'],))[0]
+    assert float(saldo_socio['saldo_actual']) == saldo + 25
+    saldo_grupo = ejecutar_consulta("SELECT saldo_ahorro FROM saldo_grupo WHERE id_grupo = %s", (socio['id_grupo'],))[0]
+    assert float(saldo_grupo['saldo_ahorro']) == 125
+
+def test_alerta_de_prestamo_se_actualiza_y_reabre(base_sqlite):
+    """Una alerta repetida del mismo préstamo y tipo actualiza la existente"""
+    from modules.moras import TIPO_ALERTA_MORA, generar_alerta_mora, resolver_alerta
+
+    id_prestamo = ejecutar_consulta("""
+        SELECT p.id_prestamo FROM prestamo p JOIN socios s ON p.id_socio = s.id_socio
+        WHERE s.id_grupo IS NOT NULL ORDER BY p.id_prestamo LIMIT 1
+    """)[0]['id_prestamo']
+    query = "SELECT id_alerta, nivel, resuelta FROM alertas WHERE id_prestamo = %s AND tipo = %s"
+
+    generar_alerta_mora(id_prestamo, 10)
+    resolver_alerta(ejecutar_consulta(query, (id_prestamo, TIPO_ALERTA_MORA))[0]['id_alerta'])
+    generar_alerta_mora(id_prestamo, 40)
+
+    alertas = ejecutar_consulta(query, (id_prestamo, TIPO_ALERTA_MORA))
+    assert len(alertas) == 1
+    assert (alertas[0]['nivel'], alertas[0]['resuelta']) == ('ALTO', 0)
+
+def test_limpiar_alertas_resueltas_en_lotes(base_sqlite):
+    """Borra todas las resueltas antiguas del grupo en lotes y conserva las recientes"""
+    from datetime import datetime, timedelta
+    from modules.moras import limpiar_alertas_resueltas
+
+    id_grupo = ejecutar_consulta("SELECT MIN(id_grupo) as id_grupo FROM grupos")[0]['id_grupo']
+    antigua, reciente = datetime.now() - timedelta(days=60), datetime.now()
+    for fecha in [antigua] * 7 + [reciente]:
+        ejecutar_comando(
+            "INSERT INTO alertas (id_grupo, titulo, fecha_alerta, resuelta) VALUES (%s, %s, %s, 1)",
+            (id_grupo, "Alerta de prueba", fecha)
+        )
+    query = "SELECT COUNT(*) as total FROM alertas WHERE id_grupo = %s AND resuelta = 1 AND fecha_alerta < %s"
+    antiguas = _contar(query, (id_grupo, datetime.now() - timedelta(days=30)))
+
+    assert limpiar_alertas_resueltas(id_grupo, lote=3) == antiguas
+    assert _contar(query, (id_grupo, datetime.now() - timedelta(days=30))) == 0
+    assert _contar(
+        "SELECT COUNT(*) as total FROM alertas WHERE id_grupo = %s AND resuelta = 1 AND fecha_alerta >= %s",
+        (id_grupo, reciente - timedelta(seconds=1))
+    ) == 1
+
+def test_multas_inasistencia_dos_veces(base_sqlite):
+    """Generar las multas de una sesión dos veces deja una multa por socio ausente"""
+    from modules.reuniones import MOTIVO_MULTA_INASISTENCIA, generar_multas_inasistencia
+
+    id_sesion = ejecutar_consulta("""
+        SELECT a.id_sesion FROM asistencia a
+        GROUP BY a.id_sesion ORDER BY COUNT(*) DESC, a.id_sesion LIMIT 1
+    """)[0]['id_sesion']
+    ejecutar_comando("""
+        UPDATE asistencia SET presencial = 0, justificacion_ausencia = NULL
+        WHERE id_sesion = %s AND id_asistencia IN (
+            SELECT id_asistencia FROM (
+                SELECT id_asistencia FROM asistencia WHERE id_sesion = %s ORDER BY id_asistencia LIMIT 3
+            ) primeras
+        )
+    """, (id_sesion, id_sesion))
+
+    assert generar_multas_inasistencia(id_sesion, monto=5) is not None
+    assert generar_multas_inasistencia(id_sesion, monto=5) == 0
+
+    multas_por_ausente = ejecutar_consulta("""
+        SELECT COUNT(m.id_multa) as multas
+        FROM asistencia a
+        LEFT JOIN multa m ON m.id_sesion = a.id_sesion AND m.id_socio = a.id_socio AND m.motivo = %s
+        WHERE a.id_sesion = %s AND a.presencial = 0 AND COALESCE(a.justificacion_ausencia, '') = ''
+        GROUP BY a.id_socio
+    """, (MOTIVO_MULTA_INASISTENCIA, id_sesion))
+    assert len(multas_por_ausente) >= 3
+    assert {fila['multas'] for fila in multas_por_ausente} == {1}
@@ -0,0 +1,23 @@
+from modules.migraciones import MIGRACIONES, migraciones_pendientes
+
+# =============================================================================
+# MIGRACIONES DEL ESQUEMA
+# =============================================================================
+# Una base creada desde config/esquema.sql ya incluye todas las migraciones: si
+# una aparece pendiente, esquema.sql y modules/migraciones.py no coinciden.
+
+def test_esquema_nuevo_sin_migraciones_pendientes(base_sqlite):
+    assert MIGRACIONES
+    assert [m['nombre'] for m in migraciones_pendientes()] == []
+
+def test_migracion_a_medias_se_retoma(base_sqlite):
+    """025 omite los pasos ya aplicados (en MySQL cada DDL confirma solo)"""
+    from modules.database import ejecutar_comando
+    from modules.migraciones import aplicar_migracion, obtener_migracion
+
+    migracion = obtener_migracion('025_alertas_prestamo')
+    ejecutar_comando("DROP INDEX idx_alertas_grupo_estado")  # columnas y clave única ya existen
+    assert not migracion['aplicada']()
+
+    aplicar_migracion(migracion)
+    assert migracion['aplicada']()
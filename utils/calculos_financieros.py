@@ -1,5 +1,5 @@
 import streamlit as st
-from modules.database import ejecutar_consulta
+from modules.database import ejecutar_consulta, ejecutar_consulta_cacheada
 
 def calcular_cuotas_prestamo(monto, tasa_interes_anual, plazo_meses):
     """
@@ -57,15 +57,7 @@ def validar_capacidad_pago(id_socio, monto_solicitado, plazo_meses, id_grupo):
     # Obtener información del socio
     query = """
         SELECT 
-            COALESCE((
-                SELECT saldo_final 
-                FROM ahorro_detalle ad 
-                JOIN ahorro a ON ad.id_ahorro = a.id_ahorro 
-                JOIN sesion se ON a.id_sesion = se.id_sesion 
-                WHERE ad.id_socio = s.id_socio 
-                ORDER BY se.fecha_sesion DESC 
-                LIMIT 1
-            ), 0) as saldo_ahorro,
+            COALESCE(ss.saldo_actual, 0) as saldo_ahorro,
             (
                 SELECT COUNT(*) 
                 FROM prestamo 
@@ -85,6 +77,7 @@ def validar_capacidad_pago(id_socio, monto_solicitado, plazo_meses, id_grupo):
                 ) as cuotas
             ) as cuotas_actuales
         FROM socios s
+        LEFT JOIN saldo_socio ss ON ss.id_socio = s.id_socio
         WHERE s.id_socio = %s
     """
     
@@ -139,7 +132,7 @@ def validar_capacidad_pago(id_socio, monto_solicitado, plazo_meses, id_grupo):
 def obtener_tasa_interes_grupo(id_grupo):
     """Obtener tasa de interés del grupo"""
     query = "SELECT interes FROM reglas_grupo WHERE id_grupo = %s"
-    resultado = ejecutar_consulta(query, (id_grupo,))
+    resultado = ejecutar_consulta_cacheada(query, (id_grupo,))
     return resultado[0]['interes'] / 100 if resultado else 0.05  # 5% por defecto
 
 def calcular_interes_mora(saldo_mora, dias_mora, tasa_mora_diaria=0.001):
@@ -1,5 +1,7 @@
 import streamlit as st
+from mysql.connector import Error
 from modules.database import ejecutar_consulta
+from modules.caja import obtener_saldo_grupo
 from datetime import datetime, timedelta
 import pandas as pd
 import plotly.express as px
@@ -28,8 +30,11 @@ def dashboard_directiva(id_grupo):
         st.metric("👥 Total Socios", total_socios)
     
     with col2:
-        ahorro_total = obtener_ahorro_actual(id_grupo)
-        st.metric("💰 Ahorro Actual", f"${ahorro_total:,.2f}")
+        try:
+            ahorro_total = obtener_ahorro_actual(id_grupo)
+            st.metric("💰 Ahorro Actual", f"${ahorro_total:,.2f}")
+        except Error as e:
+            st.error(f"❌ No se pudo obtener el ahorro del grupo: {e}")
     
     with col3:
         prestamos_activos = obtener_prestamos_activos(id_grupo)
@@ -165,17 +170,8 @@ def obtener_metricas_grupo(campo, tabla, id_grupo):
     return resultado[0]['valor'] if resultado else 0
 
 def obtener_ahorro_actual(id_grupo):
-    """Obtener ahorro actual del grupo"""
-    query = """
-        SELECT COALESCE(saldo_cierre, 0) as ahorro
-        FROM ahorro a
-        JOIN sesion s ON a.id_sesion = s.id_sesion
-        WHERE s.id_grupo = %s
-        ORDER BY s.fecha_sesion DESC
-        LIMIT 1
-    """
-    resultado = ejecutar_consulta(query, (id_grupo,))
-    return resultado[0]['ahorro'] if resultado else 0
+    """Obtener ahorro actual del grupo (el mismo saldo que muestran caja y ahorros)"""
+    return obtener_saldo_grupo(id_grupo)['saldo_ahorro']
 
 def obtener_prestamos_activos(id_grupo):
     """Obtener número de préstamos activos"""
@@ -194,11 +190,10 @@ def obtener_tasa_mora(id_grupo):
         SELECT 
             CASE 
                 WHEN COUNT(*) = 0 THEN 0
-                ELSE SUM(CASE WHEN p.id_estado_prestamo = 5 THEN 1 ELSE 0 END) / COUNT(*) * 100
+                ELSE SUM(CASE WHEN id_estado_prestamo = 5 THEN 1 ELSE 0 END) / COUNT(*) * 100
             END as tasa
-        FROM prestamo p
-        JOIN socios s ON p.id_socio = s.id_socio
-        WHERE s.id_grupo = %s AND p.id_estado_prestamo IN (2, 5)
+        FROM cartera_prestamo
+        WHERE id_grupo = %s AND id_estado_prestamo IN (2, 5)
     """
     resultado = ejecutar_consulta(query, (id_grupo,))
     return resultado[0]['tasa'] if resultado else 0
@@ -4,6 +4,19 @@ from datetime import datetime
 import io
 import base64
 import json
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Frame, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 def generar_pdf_acta(tipo_acta, datos):
     """Función unificada para generar PDF de actas"""
@@ -38,10 +51,10 @@ def generar_pdf_acta_cierre(grupo_info, datos_ciclo, distribucion):
         
         # Información del grupo
         info_text = f"""
-        <b>Grupo:</b> {grupo_info['nombre_grupo']}<br/>
+        <b>Grupo:</b> {escape(str(grupo_info['nombre_grupo']))}<br/>
         <b>Fecha de Cierre:</b> {datetime.now().strftime('%d/%m/%Y')}<br/>
         <b>Período:</b> {datos_ciclo['fecha_inicio'].strftime('%d/%m/%Y')} - {datos_ciclo['fecha_fin'].strftime('%d/%m/%Y')}<br/>
-        <b>Lugar:</b> {grupo_info['lugar_reunion']}
+        <b>Lugar:</b> {escape(str(grupo_info['lugar_reunion']))}
         """
         info_paragraph = Paragraph(info_text, styles['Normal'])
         elements.append(info_paragraph)
@@ -156,9 +169,9 @@ def generar_pdf_acta_reunion(datos_reunion, temas, acuerdos):
         
         # Información de la reunión
         info_text = f"""
-        <b>Grupo:</b> {datos_reunion['nombre_grupo']}<br/>
+        <b>Grupo:</b> {escape(str(datos_reunion['nombre_grupo']))}<br/>
         <b>Fecha:</b> {datos_reunion['fecha_sesion'].strftime('%d/%m/%Y')}<br/>
-        <b>Lugar:</b> {datos_reunion['lugar_reunion']}<br/>
+        <b>Lugar:</b> {escape(str(datos_reunion['lugar_reunion']))}<br/>
         <b>Asistentes:</b> {datos_reunion['total_presentes']} de {datos_reunion['total_socios']} ({datos_reunion['total_presentes']/datos_reunion['total_socios']*100:.1f}%)<br/>
         <b>Ahorro registrado:</b> ${datos_reunion.get('total_ahorro', 0):,.2f}
         """
@@ -170,14 +183,14 @@ def generar_pdf_acta_reunion(datos_reunion, temas, acuerdos):
         # Temas tratados
         if temas:
             elements.append(Paragraph("TEMAS TRATADOS", styles['Heading2']))
-            temas_paragraph = Paragraph(temas.replace('\n', '<br/>'), styles['Normal'])
+            temas_paragraph = Paragraph(escape(temas).replace('\n', '<br/>'), styles['Normal'])
             elements.append(temas_paragraph)
             elements.append(Spacer(1, 12))
         
         # Acuerdos
         if acuerdos:
             elements.append(Paragraph("ACUERDOS Y DECISIONES", styles['Heading2']))
-            acuerdos_paragraph = Paragraph(acuerdos.replace('\n', '<br/>'), styles['Normal'])
+            acuerdos_paragraph = Paragraph(escape(acuerdos).replace('\n', '<br/>'), styles['Normal'])
             elements.append(acuerdos_paragraph)
         
         elements.append(Spacer(1, 30))
@@ -227,11 +240,11 @@ def generar_pdf_acta_prestamo(datos_prestamo):
         
         # Información del préstamo
         info_text = f"""
-        <b>Grupo:</b> {datos_prestamo['nombre_grupo']}<br/>
+        <b>Grupo:</b> {escape(str(datos_prestamo['nombre_grupo']))}<br/>
         <b>Fecha de Aprobación:</b> {datos_prestamo['fecha_aprobacion'].strftime('%d/%m/%Y')}<br/>
-        <b>Solicitante:</b> {datos_prestamo['nombre']} {datos_prestamo['apellido']}<br/>
-        <b>Teléfono:</b> {datos_prestamo['telefono']}<br/>
-        <b>Dirección:</b> {datos_prestamo['direccion']}
+        <b>Solicitante:</b> {escape(str(datos_prestamo['nombre']))} {escape(str(datos_prestamo['apellido']))}<br/>
+        <b>Teléfono:</b> {escape(str(datos_prestamo['telefono']))}<br/>
+        <b>Dirección:</b> {escape(str(datos_prestamo['direccion']))}
         """
         info_paragraph = Paragraph(info_text, styles['Normal'])
         elements.append(info_paragraph)
@@ -433,4 +446,175 @@ def exportar_json_completo(datos):
         data=json_str,
         file_name=f"reporte_completo_{datetime.now().strftime('%Y%m%d')}.json",
         mime="application/json"
-    )
\ No newline at end of file
+    )
+
+# =============================================================================
+# COMPROBANTES DE AHORRO (PDF)
+# =============================================================================
+# Los comprobantes se renderizan en un pool de procesos compartido por todas
+# las sesiones (a lo sumo COMPROBANTES_PROCESOS_MAX procesos, creado una vez)
+# y se escriben en el ZIP a medida que terminan, con a lo sumo
+# COMPROBANTES_EN_VUELO_POR_PROCESO PDFs por proceso esperando en memoria. El
+# consolidado dibuja una página por socio sobre un único canvas, sin armar la
+# lista completa de elementos.
+# Estas funciones no usan st.*: se ejecutan también en los procesos del pool.
+
+COMPROBANTES_PROCESOS_MAX = 2
+COMPROBANTES_EN_VUELO_POR_PROCESO = 4
+
+_pool_comprobantes = None
+_pool_comprobantes_lock = threading.Lock()
+
+def _procesos_comprobantes():
+    """Procesos del pool de comprobantes"""
+    return min(COMPROBANTES_PROCESOS_MAX, os.cpu_count() or 1)
+
+def _obtener_pool_comprobantes():
+    """Pool de procesos compartido para renderizar comprobantes (se crea la primera vez)"""
+    global _pool_comprobantes
+    with _pool_comprobantes_lock:
+        if _pool_comprobantes is None:
+            _pool_comprobantes = ProcessPoolExecutor(max_workers=_procesos_comprobantes())
+        return _pool_comprobantes
+
+def _descartar_pool_comprobantes(pool):
+    """Descartar el pool compartido si un proceso murió (se recrea en el próximo uso)"""
+    global _pool_comprobantes
+    with _pool_comprobantes_lock:
+        if _pool_comprobantes is pool:
+            _pool_comprobantes = None
+    pool.shutdown(wait=False)
+
+def _elementos_comprobante_ahorro(datos_sesion, socio, styles):
+    """Elementos (flowables) del comprobante de ahorro de un socio"""
+    elementos = [
+        Paragraph("COMPROBANTE DE AHORRO", styles['Heading1']),
+        Spacer(1, 12),
+        Paragraph(f"""
+        <b>Grupo:</b> {escape(str(datos_sesion['nombre_grupo']))}<br/>
+        <b>Fecha:</b> {datos_sesion['fecha_sesion'].strftime('%d/%m/%Y')}<br/>
+        <b>Socio:</b> {escape(str(socio['nombre']))} {escape(str(socio['apellido']))}
+        """, styles['Normal']),
+        Spacer(1, 20)
+    ]
+    
+    tabla = Table([
+        ['Concepto', 'Monto'],
+        ['Saldo Anterior', f"${socio['saldo_anterior']:,.2f}"],
+        ['Aporte Actual', f"${socio['aporte_actual']:,.2f}"],
+        ['Otros Ingresos', f"${socio['otros_ingresos']:,.2f}"],
+        ['TOTAL AHORRO ACTUAL', f"${socio['saldo_final']:,.2f}"]
+    ], colWidths=[300, 150])
+    tabla.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elementos.append(tabla)
+    
+    elementos.append(Spacer(1, 30))
+    elementos.append(Paragraph(f"""
+    _________________________<br/>
+    <b>Firma del Tesorero/a</b><br/><br/>
+    <i>Fecha de emisión: {datetime.now().strftime('%d/%m/%Y %H:%M')}</i>
+    """, styles['Normal']))
+    
+    return elementos
+
+def nombre_archivo_comprobante(socio):
+    """Nombre del PDF del comprobante de un socio dentro del ZIP"""
+    return f"comprobante_ahorro_{socio['apellido']}_{socio['nombre']}_{socio['id_socio']}.pdf".replace('/', '-')
+
+def generar_pdf_comprobante_ahorro(datos_sesion, socio):
+    """PDF (bytes) del comprobante de ahorro de un socio"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    doc.build(_elementos_comprobante_ahorro(datos_sesion, socio, getSampleStyleSheet()))
+    return buffer.getvalue()
+
+def _renderizar_comprobante(datos_sesion, socio):
+    """Tarea del pool: (nombre de archivo, PDF) de un socio"""
+    return nombre_archivo_comprobante(socio), generar_pdf_comprobante_ahorro(datos_sesion, socio)
+
+def generar_zip_comprobantes_ahorro(datos_sesion, socios, destino, procesos=None):
+    """Escribir en destino (ruta o archivo) un ZIP con un PDF por socio.
+
+    Con procesos=1 se renderiza en el proceso actual; por defecto se usa el
+    pool compartido. Devuelve la cantidad de comprobantes escritos.
+    """
+    total = 0
+    
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as archivo_zip:
+        if procesos == 1 or _procesos_comprobantes() == 1:
+            for socio in socios:
+                archivo_zip.writestr(*_renderizar_comprobante(datos_sesion, socio))
+                total += 1
+            return total
+        
+        pool = _obtener_pool_comprobantes()
+        limite = _procesos_comprobantes() * COMPROBANTES_EN_VUELO_POR_PROCESO
+        pendientes = deque()
+        try:
+            for socio in socios:
+                pendientes.append(pool.submit(_renderizar_comprobante, datos_sesion, socio))
+                if len(pendientes) >= limite:
+                    archivo_zip.writestr(*pendientes.popleft().result())
+                    total += 1
+            while pendientes:
+                archivo_zip.writestr(*pendientes.popleft().result())
+                total += 1
+        except BrokenProcessPool:
+            _descartar_pool_comprobantes(pool)
+            raise
+        finally:
+            # Si algo falló, no dejar trabajos de esta descarga ocupando el pool
+            for futuro in pendientes:
+                futuro.cancel()
+    
+    return total
+
+def generar_pdf_consolidado_comprobantes(datos_sesion, socios, destino):
+    """Escribir en destino (ruta o archivo) un PDF con todos los comprobantes.
+
+    Portada, una página por socio y una página de resumen; cada página se
+    dibuja y se cierra antes de pasar al siguiente socio.
+    """
+    ancho, alto = letter
+    styles = getSampleStyleSheet()
+    pdf = canvas.Canvas(destino, pagesize=letter, pageCompression=1)
+    
+    def dibujar_pagina(elementos):
+        Frame(inch, inch, ancho - 2 * inch, alto - 2 * inch).addFromList(elementos, pdf)
+        pdf.showPage()
+    
+    dibujar_pagina([
+        Paragraph("COMPROBANTES CONSOLIDADOS DE AHORRO", styles['Heading1']),
+        Spacer(1, 12),
+        Paragraph(f"""
+        <b>Grupo:</b> {escape(str(datos_sesion['nombre_grupo']))}<br/>
+        <b>Fecha de reunión:</b> {datos_sesion['fecha_sesion'].strftime('%d/%m/%Y')}<br/>
+        <b>Fecha de emisión:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}
+        """, styles['Normal'])
+    ])
+    
+    total_socios = 0
+    total_ahorro = 0
+    for socio in socios:
+        dibujar_pagina(_elementos_comprobante_ahorro(datos_sesion, socio, styles))
+        total_socios += 1
+        total_ahorro += socio['saldo_final']
+    
+    dibujar_pagina([
+        Paragraph("RESUMEN GENERAL", styles['Heading2']),
+        Spacer(1, 12),
+        Paragraph(f"""
+        <b>Total Socios:</b> {total_socios}<br/>
+        <b>Total Ahorro Grupo:</b> ${total_ahorro:,.2f}
+        """, styles['Normal'])
+    ])
+    
+    pdf.save()
+    return total_socios
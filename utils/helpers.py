@@ -1,5 +1,7 @@
 import streamlit as st
+from mysql.connector import Error
 from modules.database import ejecutar_consulta
+from modules.caja import obtener_saldo_grupo
 from datetime import datetime, timedelta
 
 def mostrar_dashboard_principal():
@@ -100,43 +102,13 @@ def mostrar_dashboard_directiva():
     # Información financiera del grupo
     st.subheader("💰 Estado Financiero del Grupo")
     
-    # Intentar obtener información de ahorros si existe
+    # Saldos actuales de ahorro y caja (saldo_grupo, o calculados si falta la fila)
     try:
-        # Último registro de ahorro del grupo
-        ultimo_ahorro = obtener_metricas("""
-            SELECT a.saldo_cierre 
-            FROM ahorro a 
-            JOIN sesion s ON a.id_sesion = s.id_sesion 
-            WHERE s.id_grupo = %s 
-            ORDER BY a.id_ahorro DESC 
-            LIMIT 1
-        """, (st.session_state.id_grupo,))
-        
-        if ultimo_ahorro and ultimo_ahorro[0]['saldo_cierre']:
-            st.metric("💵 Ahorro del Grupo", f"${ultimo_ahorro[0]['saldo_cierre']:,.2f}")
-        else:
-            st.metric("💵 Ahorro del Grupo", "$0.00")
-    except:
-        st.metric("💵 Ahorro del Grupo", "$0.00")
-    
-    # Intentar obtener información de caja si existe
-    try:
-        # Último registro de caja del grupo
-        ultima_caja = obtener_metricas("""
-            SELECT saldo_cierre 
-            FROM caja c 
-            JOIN sesion s ON c.id_sesion = s.id_sesion 
-            WHERE s.id_grupo = %s 
-            ORDER BY c.id_caja DESC 
-            LIMIT 1
-        """, (st.session_state.id_grupo,))
-        
-        if ultima_caja and ultima_caja[0]['saldo_cierre']:
-            st.metric("💳 Caja del Grupo", f"${ultima_caja[0]['saldo_cierre']:,.2f}")
-        else:
-            st.metric("💳 Caja del Grupo", "$0.00")
-    except:
-        st.metric("💳 Caja del Grupo", "$0.00")
+        saldos = obtener_saldo_grupo(st.session_state.id_grupo)
+        st.metric("💵 Ahorro del Grupo", f"${saldos['saldo_ahorro']:,.2f}")
+        st.metric("💳 Caja del Grupo", f"${saldos['saldo_caja']:,.2f}")
+    except Error as e:
+        st.error(f"❌ No se pudo obtener el saldo del grupo: {e}")
     
     # Acciones rápidas
     st.subheader("🚀 Acciones Rápidas")